@@ -0,0 +1,181 @@
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+
+epochs = ['Medieval', 'Renaissance', 'Baroque', 'Classical', 'Early Romantic', 'Romantic', 'Late Romantic', '20th Century']
+genres = ['Chamber', 'Keyboard', 'Orchestral', 'Stage', 'Vocal']
+
+
+def build_fixtures(num_composers=200, max_works=2000, seed=0):
+    """
+    Build deterministic fixtures shaped like OpenOpus API responses, keyed by url path (e.g. 'composer/list/pop.json').
+
+    Composer i gets a work list whose size grows with i, up to max_works, so the fixtures include a few
+    very large work lists like those of prolific composers.
+
+    """
+    rng = random.Random(seed)
+    status = {'success': 'true', 'source': 'db'}
+    composers = []
+    for index in range(num_composers):
+        name = f"{chr(ord('A') + index % 26)}{''.join(rng.choice('aeioulnrst') for _ in range(6))}"
+        birth = 1100 + index * 900 // max(1, num_composers)
+        composers.append({
+            'id': str(index + 1),
+            'name': name,
+            'complete_name': f'Johann {name}',
+            'birth': f'{birth}-01-01',
+            'death': f'{birth + rng.randint(30, 90)}-01-01',
+            'epoch': epochs[index * len(epochs) // max(1, num_composers)],
+            'portrait': f'https://assets.openopus.org/portraits/{index + 1}.jpg',
+        })
+
+    fixtures = {
+        'composer/list/pop.json': {'status': status, 'composers': composers[::7]},
+        'composer/list/rec.json': {'status': status, 'composers': composers[::5]},
+    }
+    for letter in {composer['name'][0] for composer in composers}:
+        fixtures[f'composer/list/name/{letter}.json'] = {
+            'status': status, 'composers': [composer for composer in composers if composer['name'][0] == letter]}
+    for epoch in epochs:
+        fixtures[f'composer/list/epoch/{epoch}.json'] = {
+            'status': status, 'composers': [composer for composer in composers if composer['epoch'] == epoch]}
+
+    work_id = 0
+    for index, composer in enumerate(composers):
+        num_works = max(1, (index + 1) ** 2 * max_works // num_composers ** 2)
+        works = []
+        for number in range(num_works):
+            work_id += 1
+            works.append({
+                'title': f'Work no. {number + 1} in {rng.choice("ABCDEFG")} major, Op. {rng.randint(1, 200)}',
+                'subtitle': rng.choice(['', '', 'Ballet', 'Tragédie lyrique']),
+                'searchterms': '',
+                'popular': '1' if rng.random() < 0.05 else '0',
+                'recommended': '1' if rng.random() < 0.1 else '0',
+                'id': str(work_id),
+                'genre': rng.choice(genres),
+            })
+
+        composer_genres = sorted({work['genre'] for work in works})
+        fixtures[f"genre/list/composer/{composer['id']}.json"] = {
+            'status': status, 'composer': composer, 'genres': ['Popular', 'Recommended'] + composer_genres}
+        fixtures[f"work/list/composer/{composer['id']}/genre/all.json"] = {
+            'status': status, 'composer': composer, 'works': works}
+        for genre in composer_genres:
+            fixtures[f"work/list/composer/{composer['id']}/genre/{genre}.json"] = {
+                'status': status, 'composer': composer, 'works': [work for work in works if work['genre'] == genre]}
+        fixtures[f"work/list/composer/{composer['id']}/genre/Popular.json"] = {
+            'status': status, 'composer': composer, 'works': [work for work in works if work['popular'] == '1']}
+        fixtures[f"work/list/composer/{composer['id']}/genre/Recommended.json"] = {
+            'status': status, 'composer': composer, 'works': [work for work in works if work['recommended'] == '1']}
+
+    fixtures['composer/list/search/.json'] = {'status': status, 'composers': composers}
+    return fixtures
+
+
+def load_fixtures(directory):
+    """Load recorded responses saved as <directory>/<url path>, e.g. <directory>/composer/list/pop.json"""
+    fixtures = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, encoding='utf-8') as fixture_file:
+                fixtures[os.path.relpath(path, directory).replace(os.sep, '/')] = json.load(fixture_file)
+    return fixtures
+
+
+class FakeOpenOpusServer:
+    """
+    Local HTTP server answering OpenOpus API paths from fixtures, with configurable latency.
+
+    Every response is delayed by latency seconds plus up to jitter seconds. Composer id lists
+    ('composer/list/ids/...') and composer searches are answered from the composer fixtures.
+    With compress, bodies are sent gzip compressed to clients accepting it, like the real API does.
+    Use as a context manager; url is the base url to pass as OpenOpys(api_url=...).
+
+    """
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, host='127.0.0.1', port=0, compress=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.compress = compress
+        self.requests = 0
+        self._bodies = {path: json.dumps(payload).encode('utf-8') for path, payload in fixtures.items()}
+        self._composers = {}
+        for path, payload in fixtures.items():
+            if path.startswith('composer/list/'):
+                for composer in payload.get('composers', []):
+                    self._composers[composer['id']] = composer
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, which Nagle's algorithm would delay on keep-alive connections
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.requests += 1
+                body = server._respond(unquote(urlsplit(self.path).path))
+                delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+                self.send_response(200)
+                self.send_header('content-type', 'application/json')
+                if server.compress and 'gzip' in self.headers.get('accept-encoding', ''):
+                    body = gzip.compress(body, compresslevel=6)
+                    self.send_header('content-encoding', 'gzip')
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, path):
+        path = '/'.join(filter(None, path.split('/')))
+        body = self._bodies.get(path)
+        if body is not None:
+            return body
+
+        status = {'success': 'true'}
+        if path.startswith('composer/list/ids/'):
+            ids = path[len('composer/list/ids/'):-len('.json')].split(',')
+            composers = [self._composers[composer_id] for composer_id in ids if composer_id in self._composers]
+            return json.dumps({'status': status, 'composers': composers}).encode('utf-8')
+        if path.startswith('composer/list/search/'):
+            query = path[len('composer/list/search/'):-len('.json')].lower()
+            composers = [composer for composer in self._composers.values() if composer['name'].lower().startswith(query)]
+            return json.dumps({'status': status, 'composers': composers}).encode('utf-8')
+        return json.dumps({'status': {'success': 'false', 'error': 'Not found'}}).encode('utf-8')
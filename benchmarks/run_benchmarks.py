@@ -0,0 +1,190 @@
+"""
+Benchmark OpenOpys against a local fake OpenOpus server.
+
+Measures throughput, p50/p99 latency and peak memory of the main query methods, called serially, from
+a thread pool and through the bulk API, with a cold and a warm cache. Results are written as JSON so
+runs can be compared between commits:
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json
+
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_openopus import FakeOpenOpusServer, build_fixtures, load_fixtures
+from src.openopys import Genre, MemoryCache, OpenOpys
+
+
+def _queries(num_composers):
+    largest = str(num_composers)
+    ids = [str(composer_id) for composer_id in range(1, num_composers + 1)]
+    return {
+        'list_popular_composers': lambda opys, index: opys.list_popular_composers(),
+        'list_composers_by_period': lambda opys, index: opys.list_composers_by_period('Baroque'),
+        'search_composers_by_name': lambda opys, index: opys.search_composers_by_name('a'),
+        'list_composers_by_id': lambda opys, index: opys.list_composers_by_id(ids),
+        'list_genres_by_composer_id': lambda opys, index: opys.list_genres_by_composer_id(ids[index % len(ids)]),
+        'list_works_by_composer_id': lambda opys, index: opys.list_works_by_composer_id(ids[index % len(ids)]),
+        'list_works_by_composer_id.largest': lambda opys, index: opys.list_works_by_composer_id(largest),
+        'list_works_by_composer_id_and_genre': lambda opys, index: opys.list_works_by_composer_id_and_genre(
+            ids[index % len(ids)], Genre.STAGE),
+    }
+
+
+def _percentile(latencies, percent):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def _summarize(name, mode, cache, latencies, elapsed, peak_memory):
+    return {
+        'name': name,
+        'mode': mode,
+        'cache': cache,
+        'calls': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else None,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def _timed(func, index):
+    started = time.perf_counter()
+    func(index)
+    return time.perf_counter() - started
+
+
+def _peak_memory(func):
+    tracemalloc.start()
+    try:
+        func(0)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _run_calls(func, calls, threads):
+    started = time.perf_counter()
+    if threads == 1:
+        latencies = [_timed(func, index) for index in range(calls)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = list(executor.map(lambda index: _timed(func, index), range(calls)))
+    return latencies, time.perf_counter() - started
+
+
+def run(fixtures, calls=50, threads=8, latency=0.0, jitter=0.0, queries=None):
+    """Run every scenario against a fake server serving fixtures, returning a list of result dicts"""
+    num_composers = sum(1 for path in fixtures if path.startswith('work/list/composer/') and path.endswith('/all.json'))
+    all_queries = _queries(max(1, num_composers))
+    results = []
+    with FakeOpenOpusServer(fixtures, latency=latency, jitter=jitter) as server:
+        for name, query in all_queries.items():
+            if queries and name not in queries:
+                continue
+
+            for mode, mode_threads in [('serial', 1), ('threaded', threads)]:
+                for cache in ['cold', 'warm']:
+                    openopys = OpenOpys(api_url=server.url, max_workers=threads,
+                                        cache=MemoryCache(max_entries=100000) if cache == 'warm' else None)
+                    func = lambda index: query(openopys, index)
+                    if cache == 'warm':
+                        _run_calls(func, calls, mode_threads)
+
+                    latencies, elapsed = _run_calls(func, calls, mode_threads)
+                    results.append(_summarize(name, mode, cache, latencies, elapsed, _peak_memory(func)))
+                    openopys.close()
+
+        if not queries or 'list_works_by_composer_ids' in queries:
+            ids = [str(composer_id) for composer_id in range(1, num_composers + 1)]
+            for cache in ['cold', 'warm']:
+                openopys = OpenOpys(api_url=server.url, max_workers=threads,
+                                    cache=MemoryCache(max_entries=100000) if cache == 'warm' else None)
+                func = lambda index: openopys.list_works_by_composer_ids(ids)
+                if cache == 'warm':
+                    func(0)
+
+                latencies, elapsed = _run_calls(func, max(1, calls // 10), 1)
+                result = _summarize('list_works_by_composer_ids', 'bulk', cache, latencies, elapsed, _peak_memory(func))
+                result['throughput'] = result['throughput'] * len(ids) if result['throughput'] else None
+                results.append(result)
+                openopys.close()
+
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """Return lines describing throughput and p99 changes between two benchmark reports"""
+    baseline_results = {(result['name'], result['mode'], result['cache']): result for result in baseline['results']}
+    lines = []
+    for result in current['results']:
+        key = (result['name'], result['mode'], result['cache'])
+        previous = baseline_results.get(key)
+        if previous is None or not previous['throughput'] or not previous['p99_ms']:
+            continue
+        lines.append(
+            f"{'/'.join(key):60} throughput x{result['throughput'] / previous['throughput']:.2f}  "
+            f"p99 x{result['p99_ms'] / previous['p99_ms']:.2f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help='directory of recorded responses (default: generated fixtures)')
+    parser.add_argument('--composers', type=int, default=200, help='number of composers in generated fixtures')
+    parser.add_argument('--max-works', type=int, default=2000, help='size of the largest generated work list')
+    parser.add_argument('--calls', type=int, default=50, help='calls per scenario')
+    parser.add_argument('--threads', type=int, default=8, help='threads for threaded and bulk scenarios')
+    parser.add_argument('--latency', type=float, default=0.0, help='server latency per response, in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='maximum random extra latency, in seconds')
+    parser.add_argument('--query', action='append', dest='queries', help='only run the named query (repeatable)')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    parser.add_argument('--compare', help='print throughput/p99 ratios against a previous JSON report')
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else build_fixtures(args.composers, args.max_works)
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {key: value for key, value in vars(args).items() if key not in ['output', 'compare']},
+        },
+        'results': run(fixtures, calls=args.calls, threads=args.threads, latency=args.latency, jitter=args.jitter,
+                       queries=args.queries),
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            for line in compare(json.load(baseline_file), report):
+                print(line, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import io
+import json
+from urllib.parse import unquote, urlsplit
+
+import pytest
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+
+class FakeOpenOpusAdapter(BaseAdapter):
+    """
+    Transport adapter answering requests from a dict of url path -> json payload, without network access.
+    Unknown paths are answered with an empty '{}' payload. Every request is recorded in self.requests.
+    If etag is set, it is sent with every response and matching conditional requests get a 304.
+    """
+
+    def __init__(self, payloads=None, content_type='application/json', etag=None):
+        BaseAdapter.__init__(self)
+        self.payloads = dict(payloads or {})
+        self.content_type = content_type
+        self.etag = etag
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        path = '/'.join(filter(None, unquote(urlsplit(request.url).path).split('/')))
+
+        response = Response()
+        response.url = request.url
+        response.request = request
+        if self.etag is not None:
+            response.headers['etag'] = self.etag
+            if request.headers.get('If-None-Match') == self.etag:
+                response.status_code = 304
+                response.raw = io.BytesIO(b'')
+                return response
+
+        response.status_code = 200
+        response.headers['content-type'] = self.content_type
+        response.raw = io.BytesIO(json.dumps(self.payloads.get(path, {})).encode('utf-8'))
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_api():
+    return FakeOpenOpusAdapter({
+        'composer/list/pop.json': {
+            'composers': [{'id': '87', 'name': 'Bach', 'epoch': 'Baroque'}]
+        },
+        'composer/list/rec.json': {
+            'composers': [{'id': '145', 'name': 'Beethoven', 'epoch': 'Early Romantic'}]
+        },
+        'genre/list/composer/178.json': {
+            'genres': ['Popular', 'Recommended', 'Stage']
+        },
+        'work/list/composer/178/genre/all.json': {
+            'works': [
+                {'title': 'Dardanus', 'popular': '1', 'recommended': '0', 'id': '1', 'genre': 'Stage'},
+                {'title': 'Hippolyte et Aricie', 'popular': '0', 'recommended': '1', 'id': '2', 'genre': 'Stage'},
+            ]
+        },
+    })
+
+
+catalog_composers = {
+    'A': [{'id': '1', 'name': 'Albéniz', 'complete_name': 'Isaac Albéniz', 'birth': '1860-01-01', 'death': '1909-01-01',
+           'epoch': 'Romantic', 'portrait': 'a.jpg'}],
+    'B': [{'id': '87', 'name': 'Bach', 'complete_name': 'Johann Sebastian Bach', 'birth': '1685-01-01',
+           'death': '1750-01-01', 'epoch': 'Baroque', 'portrait': 'b.jpg'}],
+}
+catalog_works = {
+    '1': [{'title': 'Iberia', 'subtitle': '', 'searchterms': '', 'popular': '1', 'recommended': '1', 'id': '10',
+           'genre': 'Keyboard'}],
+    '87': [
+        {'title': 'Mass in B minor', 'subtitle': 'BWV 232', 'searchterms': '', 'popular': '1', 'recommended': '0',
+         'id': '20', 'genre': 'Vocal'},
+        {'title': 'Goldberg Variations', 'subtitle': 'BWV 988', 'searchterms': '', 'popular': '0',
+         'recommended': '1', 'id': '21', 'genre': 'Keyboard'},
+    ],
+}
+
+
+@pytest.fixture
+def catalog_api():
+    payloads = {
+        f'composer/list/name/{letter}.json': {'composers': found} for letter, found in catalog_composers.items()}
+    payloads.update({
+        f'work/list/composer/{composer_id}/genre/all.json': {'works': found}
+        for composer_id, found in catalog_works.items()})
+    return FakeOpenOpusAdapter(payloads)
+
+
+def mount(openopys, adapter):
+    openopys.mount('https://', adapter)
+    openopys.mount('http://', adapter)
+    return openopys
@@ -0,0 +1,15 @@
+from .cache import BaseCache, MemoryCache, SqliteCache
+from .client import BulkResult, Content, Genre, OpenOpys, ResponseContentTypeError, ResultMode, _urljoin
+from .records import Composer, Work, WorkList
+from .aio import AsyncOpenOpys
+from .mirror import CatalogMirror
+from .search import CatalogSearch, SearchIndex
+from .transport import RateLimitedAdapter, TokenBucket
+from .failover import MirrorPool
+from .metrics import Metrics
+from .refresh import CacheRefresher
+from .export import CatalogExporter
+from .analytics import CatalogAnalytics
+from .typeahead import Typeahead
+from .planner import CatalogQuery, QueryPlanner
+from .cassette import Cassette, CassetteAdapter, CassetteMissError
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+from .cache import _MISSING
+from .coalesce import AsyncSingleFlight
+from .client import ResultMode, _OpenOpusEndpoints, _check_content_type, _conditional_headers, _escape_url
+from .decoding import accept_encoding, wire_size
+from .derived import WorkIndexes
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncOpenOpys(_OpenOpusEndpoints):
+    """
+    asyncio counterpart of OpenOpys, offering the same list_*/search_* methods as coroutines.
+
+    Requests go through a pooled httpx.AsyncClient and at most max_concurrency of them are in flight
+    at once. Any extra kwargs are passed to httpx.AsyncClient. Use as an async context manager, or call
+    aclose() when done.
+
+    """
+
+    def __init__(self, api_url='https://api.openopus.org', cache=None, max_concurrency=10, result_mode=ResultMode.DICT,
+                 metrics=None, derive_work_lists=False, json_loads=None, **kwargs):
+        if httpx is None:
+            raise ImportError("AsyncOpenOpys requires httpx. Install it with 'pip install httpx'")
+
+        self.api_url = api_url
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.result_mode = ResultMode(result_mode)
+        self.metrics = metrics
+        self.derive_work_lists = derive_work_lists
+        if json_loads is not None:
+            self.json_loads = json_loads
+        self._work_indexes = WorkIndexes()
+        kwargs.setdefault('limits', httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency))
+        self.client = httpx.AsyncClient(**kwargs)
+        self.client.headers['Accept-Encoding'] = accept_encoding()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._single_flight = AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get_json(self, url, **kwargs):
+        """
+        Async equivalent of OpenOpys.get_json, sharing its caching, request coalescing, metrics and
+        content-type checks.
+
+        Raises ResponseContentTypeError if content is not of type JSON
+        Raises JSONDecodeError if content cannot be parsed as JSON
+
+        """
+        escaped_url = _escape_url(url)
+
+        cached, stale = self._cache_lookup(escaped_url)
+        self._record_cache(url, cached)
+        if cached is not _MISSING:
+            return cached
+
+        if kwargs:
+            return await self._request_json(url, escaped_url, stale, **kwargs)
+        return await self._single_flight.do(escaped_url, lambda: self._request_json(url, escaped_url, stale))
+
+    async def _request_json(self, url, escaped_url, stale, **kwargs):
+        if stale is not None:
+            kwargs['headers'] = _conditional_headers(kwargs.get('headers'), stale[1])
+
+        try:
+            started = time.perf_counter()
+            async with self._semaphore:
+                response = await self.client.get(escaped_url, **kwargs)
+            transferred = time.perf_counter()
+
+            if stale is not None and response.status_code == 304:
+                self.cache.revalidate(escaped_url, endpoint=self._endpoint(url))
+                self._record_request(url, transferred - started, 0, 0)
+                return stale[0]
+
+            _check_content_type(response)
+
+            content = self._decode_json(response.content)
+            self._record_request(
+                url, transferred - started, time.perf_counter() - transferred, len(response.content),
+                wire_size(response), response.headers.get('content-encoding'))
+        except Exception as error:
+            self._record_error(url, error)
+            raise
+
+        self._cache_store(url, escaped_url, response.headers, content, len(response.content), response.content)
+        return content
+
+    async def _fetch(self, url, extract):
+        return extract(await self.get_json(url))
+
+    async def _gather(self, func, items, combine):
+        return combine(await asyncio.gather(*[func(item) for item in items]))
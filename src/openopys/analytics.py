@@ -0,0 +1,185 @@
+from .export import CatalogExporter
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+def _dates(values):
+    # 'YYYY-MM-DD' strings to datetime64[D], with NaT for missing or unparseable dates
+    values = ['NaT' if not value else value for value in values]
+    try:
+        return numpy.array(values, dtype='datetime64[D]')
+    except ValueError:
+        return numpy.array([_date(value) for value in values], dtype='datetime64[D]')
+
+
+def _date(value):
+    try:
+        return numpy.datetime64(value, 'D')
+    except ValueError:
+        return numpy.datetime64('NaT')
+
+
+def _concatenate(batches, column, dtype):
+    if not batches:
+        return numpy.array([], dtype=dtype)
+    return numpy.concatenate([numpy.asarray(batch[column], dtype=dtype) for batch in batches])
+
+
+class CatalogAnalytics:
+    """
+    Composer and work data held as NumPy arrays, with vectorized group-by aggregates.
+
+    Composers have id, birth and death (datetime64[D], NaT if unknown) and epoch columns; works have id,
+    composer (row of its composer), genre, popular and recommended (bool) columns. epoch and genre are int32
+    codes into the epochs and genres arrays. Build instances with from_source, which streams the catalog
+    through a CatalogExporter, or from_results for lists already fetched.
+
+    Aggregates are grouped by 'epoch', 'genre' or 'composer' (works are grouped by their composer's epoch)
+    and returned as dicts of group label (composer id for 'composer') -> value.
+
+    """
+
+    days_per_year = 365.2425
+
+    def __init__(self, composer_ids, births, deaths, epoch_codes, epochs, work_ids, work_composers, genre_codes,
+                 genres, popular, recommended):
+        if numpy is None:
+            raise ImportError("CatalogAnalytics requires numpy. Install it with 'pip install numpy'")
+
+        self.composer_ids = composer_ids
+        self.births = births
+        self.deaths = deaths
+        self.epoch_codes = epoch_codes
+        self.epochs = epochs
+        self.work_ids = work_ids
+        self.work_composers = work_composers
+        self.genre_codes = genre_codes
+        self.genres = genres
+        self.popular = popular
+        self.recommended = recommended
+
+    @classmethod
+    def from_source(cls, source, by='letter', batch_size=10000):
+        """Load the whole catalog from an OpenOpys session or a CatalogMirror"""
+        exporter = CatalogExporter(source, batch_size=batch_size, by=by)
+        composers = list(exporter.iter_batches('composers'))
+        works = list(exporter.iter_batches('works'))
+        return cls(
+            _concatenate(composers, 'id', numpy.int64),
+            _dates([value for batch in composers for value in batch['birth']]),
+            _dates([value for batch in composers for value in batch['death']]),
+            _concatenate(composers, 'epoch', numpy.int32),
+            numpy.array(exporter.categories['epoch'].values, dtype=object),
+            _concatenate(works, 'id', numpy.int64),
+            # composer_id codes were assigned in composer row order, so they are composer rows
+            _concatenate(works, 'composer_id', numpy.int32),
+            _concatenate(works, 'genre', numpy.int32),
+            numpy.array(exporter.categories['genre'].values if 'genre' in exporter.categories else [], dtype=object),
+            _concatenate(works, 'popular', numpy.bool_),
+            _concatenate(works, 'recommended', numpy.bool_))
+
+    @classmethod
+    def from_results(cls, composers, works):
+        """
+        Load composers (e.g. from list_composers_by_period) and works, a dict of composer id -> that
+        composer's works (e.g. from list_works_by_composer_id_and_genre). Works of unknown composers are ignored.
+        """
+        composer_rows = {str(composer['id']): row for row, composer in enumerate(composers)}
+        epochs, epoch_codes = numpy.unique(
+            numpy.array([composer.get('epoch') or '' for composer in composers], dtype=object), return_inverse=True)
+
+        work_items = [
+            (composer_rows[str(composer_id)], work)
+            for composer_id, composer_works in works.items() if str(composer_id) in composer_rows
+            for work in composer_works]
+        genres, genre_codes = numpy.unique(
+            numpy.array([work.get('genre') or '' for _, work in work_items], dtype=object), return_inverse=True)
+
+        return cls(
+            numpy.array([int(composer['id']) for composer in composers], dtype=numpy.int64),
+            _dates([composer.get('birth') for composer in composers]),
+            _dates([composer.get('death') for composer in composers]),
+            epoch_codes.astype(numpy.int32), epochs,
+            numpy.array([int(work['id']) for _, work in work_items], dtype=numpy.int64),
+            numpy.array([row for row, _ in work_items], dtype=numpy.int32),
+            genre_codes.astype(numpy.int32), genres,
+            numpy.array([work.get('popular') == '1' for _, work in work_items], dtype=numpy.bool_),
+            numpy.array([work.get('recommended') == '1' for _, work in work_items], dtype=numpy.bool_))
+
+    def lifespans(self):
+        """Return each composer's lifespan in years, NaN where birth or death is unknown"""
+        spans = self.deaths - self.births
+        years = spans.astype(numpy.float64) / self.days_per_year
+        years[numpy.isnat(spans)] = numpy.nan
+        return years
+
+    def _composer_groups(self, by):
+        if by == 'epoch':
+            return self.epoch_codes, self.epochs
+        if by == 'composer':
+            return numpy.arange(len(self.composer_ids)), self.composer_ids
+        raise ValueError(f"Cannot group composers by '{by}'. Must be 'epoch' or 'composer'")
+
+    def _work_groups(self, by):
+        if by == 'genre':
+            return self.genre_codes, self.genres
+        if by == 'composer':
+            return self.work_composers, self.composer_ids
+        if by == 'epoch':
+            return self.epoch_codes[self.work_composers], self.epochs
+        raise ValueError(f"Cannot group works by '{by}'. Must be 'genre', 'composer' or 'epoch'")
+
+    @staticmethod
+    def _aggregate(codes, labels, values=None, func='count'):
+        """Aggregate values per group code with bincount: 'count', 'sum' or 'mean' (ignoring NaN values)"""
+        size = len(labels)
+        if func == 'count':
+            result = numpy.bincount(codes, minlength=size)
+        else:
+            valid = ~numpy.isnan(values)
+            sums = numpy.bincount(codes[valid], weights=values[valid], minlength=size)
+            if func == 'sum':
+                result = sums
+            elif func == 'mean':
+                counts = numpy.bincount(codes[valid], minlength=size)
+                with numpy.errstate(invalid='ignore', divide='ignore'):
+                    result = sums / counts
+            else:
+                raise ValueError(f"Unknown aggregate '{func}'. Must be 'count', 'sum' or 'mean'")
+
+        return dict(zip(labels.tolist(), result.tolist()))
+
+    def composers_by(self, by='epoch'):
+        """Number of composers per group"""
+        codes, labels = self._composer_groups(by)
+        return self._aggregate(codes, labels)
+
+    def lifespan_by(self, by='epoch', func='mean'):
+        """Aggregate composer lifespans (in years) per group, ignoring unknown dates"""
+        codes, labels = self._composer_groups(by)
+        return self._aggregate(codes, labels, self.lifespans(), func)
+
+    def works_by(self, by='genre'):
+        """Number of works per group"""
+        codes, labels = self._work_groups(by)
+        return self._aggregate(codes, labels)
+
+    def flag_ratio_by(self, flag, by='genre'):
+        """Share of works per group flagged 'popular' or 'recommended'"""
+        if flag not in ['popular', 'recommended']:
+            raise ValueError(f"Unknown flag '{flag}'. Must be 'popular' or 'recommended'")
+
+        codes, labels = self._work_groups(by)
+        return self._aggregate(codes, labels, getattr(self, flag).astype(numpy.float64), 'mean')
+
+    def works_per_composer_and_genre(self):
+        """
+        Return a (composers x genres) matrix of work counts, with rows in composer_ids order and columns in
+        genres order.
+        """
+        size = len(self.composer_ids) * len(self.genres)
+        counts = numpy.bincount(self.work_composers * len(self.genres) + self.genre_codes, minlength=size)
+        return counts.reshape(len(self.composer_ids), len(self.genres))
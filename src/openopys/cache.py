@@ -0,0 +1,334 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from threading import RLock
+
+from .decoding import json_loads
+
+
+_MISSING = object()
+
+
+class BaseCache:
+    """
+    Interface for cache backends used by OpenOpys.get_json.
+
+    Entries are keyed by escaped URL and expire after a TTL chosen per endpoint. ttls maps endpoint
+    path prefixes (e.g. 'composer/list/pop', 'work') to seconds; the longest matching prefix wins and
+    default_ttl is used otherwise. A TTL of None never expires.
+
+    Backends that keep expired entries around can return them from get_stale along with their
+    ETag/Last-Modified validators, which lets OpenOpys revalidate them with a conditional request.
+
+    With compress, backends store entries as zlib compressed JSON bytes (at compress_level), preferably the
+    response body as received (passed to set as raw), and only parse them when they are read.
+
+    """
+
+    def __init__(self, default_ttl=3600, ttls=None, compress=False, compress_level=6):
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.compress = compress
+        self.compress_level = compress_level
+
+    def __contains__(self, key):
+        return self.get(key, default=_MISSING) is not _MISSING
+
+    def ttl_for(self, endpoint):
+        matches = [prefix for prefix in self.ttls if endpoint.startswith(prefix)]
+        if not matches:
+            return self.default_ttl
+        return self.ttls[max(matches, key=len)]
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, endpoint='', size=None, validators=None, raw=None):
+        """
+        Store value under key with the TTL configured for endpoint.
+
+        size should be the approximate number of bytes of value (e.g. the length of the raw response body).
+        validators is an optional dict with 'etag' and/or 'last_modified' response header values.
+        raw is the JSON response body value was parsed from, only passed to caches with compress set.
+
+        """
+        raise NotImplementedError
+
+    def get_with_expiry(self, key, grace=0, default=None):
+        """
+        Return (value, seconds until the entry expires) for an entry that expired at most grace seconds ago.
+
+        The seconds are negative once the entry has expired, and None if it never expires. Returns default
+        if there is no such entry. Backends that drop entries as soon as they expire can rely on this
+        default implementation, which never returns expired entries.
+
+        """
+        value = self.get(key, default=_MISSING)
+        return default if value is _MISSING else (value, None)
+
+    def get_stale(self, key):
+        """
+        Return (value, validators) for an expired entry that can be revalidated, or None.
+        """
+        return None
+
+    def revalidate(self, key, endpoint=''):
+        """
+        Renew the expiry of key after the server confirmed it is unchanged.
+        """
+        pass
+
+    def invalidate(self, key):
+        """Drop the entry for key, returning True if one was present"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def _expires_at(self, endpoint, now):
+        ttl = self.ttl_for(endpoint)
+        return None if ttl is None else now + ttl
+
+    def _compress(self, value, raw=None):
+        if raw is None:
+            raw = json.dumps(value).encode('utf-8')
+        return zlib.compress(raw, self.compress_level)
+
+    def _decompress(self, data):
+        return json_loads(zlib.decompress(data))
+
+
+class MemoryCache(BaseCache):
+    """
+    Thread-safe in-memory LRU cache for decoded get_json payloads.
+
+    The cache is bounded both by number of entries and by approximate size in bytes, evicting least
+    recently used entries first. Cached payloads are shared between callers and should be treated as read-only.
+
+    With compress, entries are held as compressed bytes and count with their compressed size, so several
+    times more of them fit in max_bytes, at the cost of decompressing and parsing a fresh copy on every read.
+
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, default_ttl=3600, ttls=None, compress=False,
+                 compress_level=6):
+        BaseCache.__init__(self, default_ttl=default_ttl, ttls=ttls, compress=compress, compress_level=compress_level)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """Approximate number of bytes held by the cache"""
+        return self._size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return default
+
+            self._entries.move_to_end(key)
+
+        return self._decompress(value) if isinstance(value, bytes) else value
+
+    def get_with_expiry(self, key, grace=0, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            value, expires_at, _ = entry
+            expires_in = None if expires_at is None else expires_at - time.monotonic()
+            if expires_in is not None and expires_in <= -grace:
+                self._remove(key)
+                return default
+
+            self._entries.move_to_end(key)
+
+        return self._decompress(value) if isinstance(value, bytes) else value, expires_in
+
+    def set(self, key, value, endpoint='', size=None, validators=None, raw=None):
+        if self.compress:
+            value = self._compress(value, raw)
+            size = len(value)
+        elif size is None:
+            size = len(json.dumps(value))
+
+        if size > self.max_bytes:
+            return
+
+        expires_at = self._expires_at(endpoint, time.monotonic())
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, expires_at, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return False
+
+            self._remove(key)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+
+class SqliteCache(BaseCache):
+    """
+    Persistent cache storing decoded get_json payloads in a local SQLite file.
+
+    The file can be shared by any number of processes on one host, so workers start with a warm cache.
+    Expired entries are kept (up to max_entries) so they can be revalidated with a conditional request
+    instead of being downloaded again. The number of entries is checked every max_entries / 100 writes, and
+    once it exceeds max_entries, the excess entries closest to expiry are dropped.
+
+    With compress, new entries are stored as compressed blobs; files can hold both kinds of entries.
+
+    """
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL,
+            etag TEXT,
+            last_modified TEXT
+        )
+    """
+    _index = 'CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)'
+
+    def __init__(self, path, max_entries=100000, default_ttl=3600, ttls=None, timeout=30, compress=False,
+                 compress_level=6):
+        BaseCache.__init__(self, default_ttl=default_ttl, ttls=ttls, compress=compress, compress_level=compress_level)
+        self.path = os.fspath(path)
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+        self._evict_every = max(1, max_entries // 100)
+        with self._connection() as connection:
+            connection.execute(self._schema)
+            connection.execute(self._index)
+
+    def __len__(self):
+        with self._connection() as connection:
+            return connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key, default=None):
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT value FROM responses WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (key, time.time())).fetchone()
+
+        if row is None:
+            return default
+        return self._load(row[0])
+
+    def get_with_expiry(self, key, grace=0, default=None):
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT value, expires_at FROM responses WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (key, now - grace)).fetchone()
+
+        if row is None:
+            return default
+        return self._load(row[0]), None if row[1] is None else row[1] - now
+
+    def set(self, key, value, endpoint='', size=None, validators=None, raw=None):
+        validators = validators or {}
+        value = self._compress(value, raw) if self.compress else json.dumps(value)
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO responses (key, value, expires_at, etag, last_modified) VALUES (?, ?, ?, ?, ?)',
+                (key, value, self._expires_at(endpoint, time.time()),
+                 validators.get('etag'), validators.get('last_modified')))
+            if next(self._writes) % self._evict_every == 0:
+                self._evict(connection)
+
+    def get_stale(self, key):
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT value, etag, last_modified FROM responses WHERE key = ? '
+                'AND (etag IS NOT NULL OR last_modified IS NOT NULL)',
+                (key,)).fetchone()
+
+        if row is None:
+            return None
+        return self._load(row[0]), {'etag': row[1], 'last_modified': row[2]}
+
+    def revalidate(self, key, endpoint=''):
+        with self._connection() as connection:
+            connection.execute(
+                'UPDATE responses SET expires_at = ? WHERE key = ?',
+                (self._expires_at(endpoint, time.time()), key))
+
+    def invalidate(self, key):
+        with self._connection() as connection:
+            return connection.execute('DELETE FROM responses WHERE key = ?', (key,)).rowcount > 0
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM responses')
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _evict(self, connection):
+        excess = connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return
+
+        # entries closest to expiry go first, through the expires_at index, and entries that never expire last
+        excess -= connection.execute(
+            'DELETE FROM responses WHERE key IN ('
+            'SELECT key FROM responses WHERE expires_at IS NOT NULL ORDER BY expires_at ASC LIMIT ?)',
+            (excess,)).rowcount
+        if excess > 0:
+            connection.execute(
+                'DELETE FROM responses WHERE key IN (SELECT key FROM responses WHERE expires_at IS NULL LIMIT ?)',
+                (excess,))
+
+    def _load(self, value):
+        # compressed entries are stored as blobs, others as JSON text
+        return self._decompress(value) if isinstance(value, bytes) else json.loads(value)
+
+    def _connection(self):
+        # sqlite connections cannot be shared between threads, so each thread opens its own
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
@@ -0,0 +1,223 @@
+import gzip
+import io
+import json
+import os
+import random
+import time
+from threading import Lock
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .transport import RateLimitedAdapter
+
+# response headers worth replaying; bodies are stored decoded, so content-encoding and length are left out
+_recorded_headers = ['content-type', 'etag', 'last-modified', 'cache-control', 'retry-after']
+
+
+class CassetteMissError(ConnectionError):
+    """Raised when replaying a request that the cassette has no recorded response for"""
+
+
+class Cassette:
+    """
+    Recorded responses indexed by (method, url), stored in a file of one JSON object per line.
+
+    The first line holds the format version, every other line one interaction with its status, headers
+    and decoded body. Files ending in '.gz' are gzip compressed. Recorded interactions are appended and
+    flushed one line at a time, so an interrupted recording keeps every complete interaction, and the
+    partial line it leaves is dropped before recording more; a later interaction for the same request
+    replaces an earlier one. Loaded bodies are kept as bytes in a dict,
+    so looking up a response takes constant time whatever the size of the cassette.
+
+    """
+
+    version = 1
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._responses = {}
+        self._file = None
+        self._complete = 0
+        self._damaged = False
+        self._lock = Lock()
+        if os.path.exists(self.path):
+            self.load()
+
+    def __len__(self):
+        return len(self._responses)
+
+    def __contains__(self, key):
+        return key in self._responses
+
+    def load(self):
+        responses = {}
+        complete = 0
+        damaged = False
+        with self._open('rb') as cassette_file:
+            try:
+                for number, line in enumerate(cassette_file):
+                    if not line.endswith(b'\n'):
+                        damaged = True
+                        break
+                    interaction = json.loads(line.decode('utf-8', 'surrogateescape'))
+                    complete += len(line)
+                    if number == 0:
+                        if interaction.get('version') != self.version:
+                            raise ValueError(
+                                f"Unsupported cassette version {interaction.get('version')} in '{self.path}'")
+                        continue
+                    responses[interaction['method'], interaction['url']] = (
+                        interaction['status'], interaction['headers'],
+                        interaction['body'].encode('utf-8', 'surrogateescape'))
+            except EOFError:
+                # gzip member cut short by an interrupted recording
+                damaged = True
+
+        with self._lock:
+            self._responses = responses
+            # size of the complete lines, which is all that is kept before recording after an interruption
+            self._complete = complete
+            self._damaged = damaged
+
+    def get(self, method, url):
+        """Return (status, headers, body) recorded for the request, or None"""
+        return self._responses.get((method, url))
+
+    def record(self, method, url, status, headers, body):
+        headers = {name: headers[name] for name in _recorded_headers if headers.get(name) is not None}
+        line = json.dumps({
+            'method': method, 'url': url, 'status': status, 'headers': headers,
+            'body': body.decode('utf-8', 'surrogateescape'),
+        }, ensure_ascii=False, separators=(',', ':'))
+
+        with self._lock:
+            if self._file is None:
+                new = not os.path.exists(self.path)
+                if self._damaged:
+                    self._repair()
+                    new = self._complete == 0
+                self._file = self._open('at')
+                if new:
+                    self._file.write(json.dumps({'version': self.version}) + '\n')
+            self._file.write(line + '\n')
+            self._file.flush()
+            self._responses[method, url] = (status, headers, body)
+
+    def clear(self):
+        """Drop every recorded interaction, including from the file"""
+        with self._lock:
+            self._close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._responses = {}
+            self._complete = 0
+            self._damaged = False
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _repair(self):
+        # drop the partial line left by an interrupted recording, so the next one starts on a line of its own
+        if not self.path.endswith('.gz'):
+            os.truncate(self.path, self._complete)
+        else:
+            # a cut short gzip member cannot be appended to, so the complete lines are written to a new file
+            with gzip.open(self.path, 'rb') as cassette_file:
+                try:
+                    data = cassette_file.read(self._complete)
+                except EOFError:
+                    data = b''
+            with gzip.open(self.path + '.tmp', 'wb') as cassette_file:
+                cassette_file.write(data)
+            os.replace(self.path + '.tmp', self.path)
+        self._damaged = False
+
+    def _open(self, mode):
+        directory = os.path.dirname(self.path)
+        if 'a' in mode and directory:
+            os.makedirs(directory, exist_ok=True)
+        if 'b' in mode:
+            return gzip.open(self.path, mode) if self.path.endswith('.gz') else open(self.path, mode)
+        # bodies that are not valid UTF-8 round trip through surrogate escapes
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode, encoding='utf-8', errors='surrogateescape')
+        return open(self.path, mode, encoding='utf-8', errors='surrogateescape')
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    Transport adapter recording responses into a Cassette, or replaying them without any network access.
+
+    Pass it as OpenOpys(adapter=...). cassette is a Cassette or a path to one. In mode 'replay', every
+    request is answered from the cassette and requests it has no response for raise CassetteMissError.
+    In 'record', the cassette is cleared and every request goes through adapter (by default a
+    RateLimitedAdapter without retries) and is recorded. 'once' replays recorded requests and records the
+    others.
+
+    Replayed responses can be delayed by latency seconds plus up to jitter seconds, drawn from a random
+    generator seeded with seed, to simulate a remote API deterministically.
+
+    """
+
+    modes = ('replay', 'record', 'once')
+
+    def __init__(self, cassette, mode='replay', adapter=None, latency=0.0, jitter=0.0, seed=None):
+        if mode not in self.modes:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Must be one of {', '.join(self.modes)}")
+
+        BaseAdapter.__init__(self)
+        self.cassette = cassette if isinstance(cassette, Cassette) else Cassette(cassette)
+        self.mode = mode
+        self.adapter = adapter
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._random_lock = Lock()
+        if mode == 'record':
+            self.cassette.clear()
+        if mode != 'replay' and self.adapter is None:
+            self.adapter = RateLimitedAdapter(max_retries=0)
+
+    def send(self, request, **kwargs):
+        recorded = None if self.mode == 'record' else self.cassette.get(request.method, request.url)
+        if recorded is not None:
+            return self._replay(request, *recorded)
+        if self.mode == 'replay':
+            raise CassetteMissError(f"No recorded response for {request.method} {request.url}", request=request)
+
+        response = self.adapter.send(request, **kwargs)
+        self.cassette.record(request.method, request.url, response.status_code, response.headers, response.content)
+        return response
+
+    def _replay(self, request, status, headers, body):
+        delay = self.latency
+        if self.jitter:
+            with self._random_lock:
+                delay += self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        response = Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.cassette.close()
+        if self.adapter is not None:
+            self.adapter.close()
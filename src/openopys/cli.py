@@ -0,0 +1,232 @@
+"""
+Run OpenOpys queries in bulk, streaming results as NDJSON.
+
+Queries are read one per line from files or stdin, either as JSON ({"method": "list_works_by_composer_id_and_genre",
+"args": ["178", "Stage"]}) or shell-like (list_works_by_composer_id_and_genre 178 Stage). Blank lines and lines
+starting with '#' are skipped. Queries run concurrently on a bounded worker pool sharing one session as
+soon as they are read, and each result is written as {"query": ..., "result": ...} (or "error") as soon
+as it finishes, with a progress summary on stderr. With --resume, queries already answered or rejected as
+invalid in the --output file are skipped and new results are appended to it.
+
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import SqliteCache
+from .client import OpenOpys
+from .transport import RateLimitedAdapter
+
+query_methods = frozenset(
+    name for name in dir(OpenOpys)
+    if name.startswith(('list_', 'search_', 'get_work_details')) and not name.endswith('_ids'))
+
+
+def parse_query(line):
+    """Parse a query line into {'method': name, 'args': [...]}, raising ValueError if it is not a valid query"""
+    if line.lstrip().startswith('{'):
+        query = json.loads(line)
+        method, args = query.get('method'), query.get('args', [])
+        if not isinstance(args, list):
+            raise ValueError(f"Query args must be a list, not {args!r}")
+    else:
+        method, *args = shlex.split(line)
+
+    if method not in query_methods:
+        raise ValueError(f"Unknown query method '{method}'")
+    return {'method': method, 'args': args}
+
+
+def query_key(query):
+    return json.dumps([query['method'], query['args']], separators=(',', ':'))
+
+
+def completed_keys(path):
+    """
+    Return the keys of queries answered without error in the NDJSON file at path, and the lines of invalid
+    queries reported in it.
+
+    A last line cut short by an interruption is removed from the file, so results can be appended to it.
+
+    """
+    keys = set()
+    if not os.path.exists(path):
+        return keys
+
+    with open(path, 'rb+') as output_file:
+        offset = 0
+        for line in output_file:
+            if not line.endswith(b'\n'):
+                output_file.truncate(offset)
+                break
+            offset += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'result' in record:
+                keys.add(query_key(record['query']))
+            elif isinstance(record.get('query'), str):
+                # invalid query lines are reported as is and would only fail again
+                keys.add(record['query'])
+    return keys
+
+
+def read_queries(lines, skip=()):
+    """Yield (key, query or None, error or None) for each query line, without keys in skip or repeats"""
+    seen = set(skip)
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        try:
+            query, error = parse_query(line), None
+            key = query_key(query)
+        except ValueError as parse_error:
+            key, query, error = line.strip(), None, parse_error
+
+        if key not in seen:
+            seen.add(key)
+            yield key, query, error
+
+
+class _Progress:
+
+    def __init__(self, stream, interval):
+        self.stream = stream
+        self.interval = interval
+        self.succeeded = 0
+        self.failed = 0
+        self.started = self._reported = time.monotonic()
+
+    def update(self, failed):
+        if failed:
+            self.failed += 1
+        else:
+            self.succeeded += 1
+        if self.interval is not None and time.monotonic() - self._reported >= self.interval:
+            self.report()
+
+    def report(self, final=False):
+        self._reported = time.monotonic()
+        elapsed = self._reported - self.started
+        done = self.succeeded + self.failed
+        rate = done / elapsed if elapsed else 0
+        prefix = 'finished' if final else 'progress'
+        print(f'{prefix}: {done} queries ({self.failed} failed) in {elapsed:.1f}s, {rate:.1f} queries/s',
+              file=self.stream, flush=True)
+
+
+def run_queries(openopys, queries, output, max_workers=None, progress=None):
+    """
+    Run (key, query, error) tuples from read_queries on openopys, writing each outcome to output as a
+    NDJSON line as soon as it is known. Returns the number of failed queries.
+
+    queries are consumed lazily: each query starts as soon as it is read, while at most twice max_workers
+    are submitted and unfinished.
+
+    """
+    progress = progress or _Progress(sys.stderr, None)
+    max_workers = max_workers or openopys.max_workers
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_workers * 2)
+
+    def report(record, failed):
+        with lock:
+            _write(output, record)
+            progress.update(failed=failed)
+
+    def finished(future, query):
+        try:
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                report({'query': query, 'error': f'{type(error).__name__}: {error}'}, True)
+            else:
+                report({'query': query, 'result': future.result()}, False)
+        finally:
+            slots.release()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for key, query, error in queries:
+            if error is not None:
+                report({'query': key, 'error': f'{type(error).__name__}: {error}'}, True)
+                continue
+
+            slots.acquire()
+            future = executor.submit(getattr(openopys, query['method']), *query['args'])
+            future.add_done_callback(lambda future, query=query: finished(future, query))
+    except BaseException:
+        # e.g. interrupted: drop the queries that have not started yet
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+
+    progress.report(final=True)
+    return progress.failed
+
+
+def _write(output, record):
+    # one complete line per write, flushed, so an interrupted run leaves at most one partial line
+    output.write(json.dumps(record, ensure_ascii=False, default=dict) + '\n')
+    output.flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='openopys', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='*', help="files of queries, one per line (default or '-': stdin)")
+    parser.add_argument('-o', '--output', help='write NDJSON results to this file instead of stdout')
+    parser.add_argument('--resume', action='store_true', help='skip queries already answered in --output')
+    parser.add_argument('--api-url', action='append', dest='api_urls',
+                        help='API base url; repeat to fail over between mirrors (default: the public API)')
+    parser.add_argument('-j', '--workers', type=int, default=8, help='number of concurrent queries')
+    parser.add_argument('--rate', type=float, help='maximum requests per second')
+    parser.add_argument('--retries', type=int, default=3, help='retries of failed requests')
+    parser.add_argument('--cache', help='SQLite file caching responses between runs')
+    parser.add_argument('--progress-interval', type=float, default=5,
+                        help='seconds between progress lines on stderr')
+    args = parser.parse_args(argv)
+    if args.resume and not args.output:
+        parser.error('--resume requires --output')
+    return args
+
+
+def _session(args):
+    return OpenOpys(
+        api_url=args.api_urls or 'https://api.openopus.org', max_workers=args.workers,
+        cache=SqliteCache(args.cache) if args.cache else None,
+        adapter=RateLimitedAdapter(rate=args.rate, max_retries=args.retries, pool_maxsize=max(10, args.workers)))
+
+
+def _lines(inputs):
+    for path in inputs or ['-']:
+        if path == '-':
+            yield from sys.stdin
+        else:
+            with open(path, encoding='utf-8') as input_file:
+                yield from input_file
+
+
+def run(args, openopys):
+    skip = completed_keys(args.output) if args.resume else ()
+    output = open(args.output, 'a' if args.resume else 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        failed = run_queries(openopys, read_queries(_lines(args.inputs), skip), output, max_workers=args.workers,
+                             progress=_Progress(sys.stderr, args.progress_interval))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with _session(args) as openopys:
+        return run(args, openopys)
@@ -0,0 +1,809 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from enum import Enum, auto
+from itertools import islice
+from json.decoder import JSONDecodeError
+
+from urllib.parse import quote
+from requests import Session
+from requests.exceptions import ConnectionError, JSONDecodeError as RequestsJSONDecodeError, Timeout
+from requests.models import ContentDecodingError
+
+from .cache import _MISSING
+from .coalesce import SingleFlight
+from .decoding import accept_encoding, json_loads, wire_size
+from .derived import WorkIndexes
+from .failover import MirrorPool
+from .metrics import endpoint_name
+from .records import Composer, Work, WorkList
+from .refresh import CacheRefresher
+from .streaming import iter_json_array
+from .transport import RateLimitedAdapter
+
+
+def _urljoin(*args):
+    trailing_slash = '/' if args[-1].endswith('/') else ''
+    return "/".join(map(lambda x: str(x).strip('/'), args)) + trailing_slash
+
+
+def _escape_url(url):
+    # use quote to handle converting any troublesome chars
+    # don't need to be more specific since the OpenOpus API doesn't make use of params
+    # the host (and port) is left as is, so only the path is quoted
+    split_url = url.split('://')
+    host, slash, path = '://'.join(split_url[1:]).partition('/')
+    escaped_content = host + slash + quote(path)
+    return '://'.join([split_url[0], escaped_content])
+
+
+def _conditional_headers(headers, validators):
+    headers = dict(headers or {})
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def _check_content_type(response):
+    # works with both requests and httpx responses, only looking at the headers
+    expected_type = 'application/json'
+    observed_type = response.headers.get('content-type')
+    if observed_type != expected_type:
+        raise ResponseContentTypeError(observed_type, expected_type)
+
+
+def _succeeded(outcome):
+    response, error = outcome
+    return error is None and response.status_code < 500
+
+
+def _discard(outcome):
+    if outcome is not None and outcome[0] is not None:
+        outcome[0].close()
+
+
+class Content(str, Enum):
+    COMPOSERS = 'composers'
+    WORKS = 'works'
+    GENRES = 'genres'
+    PERFORMERS = 'performers'
+
+
+class Genre(str, Enum):
+    ALL = 'all'
+    POPULAR = 'Popular'
+    ESSENTIAL = 'Recommended'
+    CHAMBER = 'Chamber'
+    KEYBOARD = 'Keyboard'
+    ORCHESTRAL = 'Orchestral'
+    STAGE = 'Stage'
+    VOCAL = 'Vocal'
+
+
+class ResultMode(str, Enum):
+    DICT = 'dict'
+    RECORDS = 'records'
+    COLUMNAR = 'columnar'
+
+
+class ResponseContentTypeError(Exception):
+
+    def __init__(self, observed, expected, *args, **kwargs):
+        Exception.__init__(
+            self, f"Response content is of type '{observed}'. Must be '{expected}'")
+
+
+class BulkResult(dict):
+    """
+    Results of a bulk query keyed by item (e.g. composer id), with per-item failures kept in errors.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.errors = {}
+
+
+class _OpenOpusEndpoints:
+    """
+    URL building, caching and result extraction shared by OpenOpys and AsyncOpenOpys.
+
+    Subclasses set api_url, cache, result_mode, metrics, derive_work_lists, json_loads and _work_indexes,
+    and implement _fetch(url, extract) to retrieve json content for url and return extract(content), and
+    _gather(func, items, combine) to call func on every item concurrently and return combine(results),
+    either directly or as an awaitable.
+
+    """
+
+    content_base_urls = {
+        Content.COMPOSERS: 'composer',
+        Content.WORKS: 'work',
+        Content.GENRES: 'genre',
+        Content.PERFORMERS: 'performer'
+    }
+
+    max_url_length = 2000
+    result_mode = ResultMode.DICT
+    metrics = None
+    derive_work_lists = False
+    stale_while_revalidate = 0
+    json_loads = staticmethod(json_loads)
+
+    @property
+    def coalesced_requests(self):
+        """Number of get_json calls answered by another concurrent call's request"""
+        return self._single_flight.coalesced
+
+    def invalidate(self, url):
+        """
+        Drop any cached content for url, returning True if an entry was removed.
+        """
+        if self.cache is None:
+            return False
+
+        return self.cache.invalidate(_escape_url(url))
+
+    def _endpoint(self, url):
+        # path relative to api_url (e.g. 'composer/list/pop.json'), used to pick per-endpoint settings
+        if url.startswith(self.api_url):
+            url = url[len(self.api_url):]
+
+        return url.strip('/')
+
+    def _cache_lookup(self, escaped_url, url=None):
+        # returns (cached content or _MISSING, stale (content, validators) pair or None)
+        if self.cache is None:
+            return _MISSING, None
+
+        if self._is_refreshing():
+            return _MISSING, self.cache.get_stale(escaped_url)
+
+        if self.stale_while_revalidate:
+            # content that expired within the grace window is served as is while url is refreshed
+            entry = self.cache.get_with_expiry(escaped_url, self.stale_while_revalidate, default=_MISSING)
+            if entry is not _MISSING:
+                cached, expires_in = entry
+                if url is not None and expires_in is not None and expires_in <= 0:
+                    self._refresh_in_background(url, escaped_url)
+                return cached, None
+
+        cached = self.cache.get(escaped_url, default=_MISSING)
+        if cached is not _MISSING:
+            return cached, None
+
+        return _MISSING, self.cache.get_stale(escaped_url)
+
+    def _refresh_in_background(self, url, escaped_url):
+        # subclasses supporting stale_while_revalidate re-fetch url into the cache without blocking the caller
+        pass
+
+    def _is_refreshing(self):
+        # subclasses supporting refreshing() ignore cached content while it is active
+        return False
+
+    def _record_cache(self, url, cached):
+        if self.metrics is not None and self.cache is not None:
+            self.metrics.record_cache(endpoint_name(self._endpoint(url)), cached is not _MISSING)
+
+    def _record_request(self, url, transfer_seconds, decode_seconds, size, wire_size=None, encoding=None):
+        if self.metrics is not None:
+            self.metrics.record_request(
+                endpoint_name(self._endpoint(url)), transfer_seconds, decode_seconds, size, wire_size, encoding)
+
+    def _record_error(self, url, error):
+        if self.metrics is not None:
+            self.metrics.record_error(endpoint_name(self._endpoint(url)), error)
+
+    def _cache_store(self, url, escaped_url, headers, content, size, raw=None):
+        if self.cache is None:
+            return
+
+        validators = {
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified')
+        }
+        kwargs = {}
+        if raw is not None and getattr(self.cache, 'compress', False):
+            # compressing caches store the response body as received rather than re-serializing content
+            kwargs['raw'] = raw
+        self.cache.set(escaped_url, content, endpoint=self._endpoint(url), size=size, validators=validators, **kwargs)
+
+    def _decode_json(self, content):
+        # raise requests' JSONDecodeError like Response.json() does, whichever decoder json_loads uses
+        try:
+            return self.json_loads(content)
+        except ValueError as error:
+            if isinstance(error, JSONDecodeError):
+                raise RequestsJSONDecodeError(error.msg, error.doc, error.pos) from error
+            raise RequestsJSONDecodeError(str(error), content.decode('utf-8', 'replace'), 0) from error
+
+    def _composer_results(self, composers):
+        if self.result_mode == ResultMode.DICT:
+            return composers
+        return [Composer.from_dict(composer) for composer in composers]
+
+    def _work_results(self, works):
+        if self.result_mode == ResultMode.RECORDS:
+            return [Work.from_dict(work) for work in works]
+        if self.result_mode == ResultMode.COLUMNAR:
+            return WorkList(works)
+        return works
+
+    def _join_items(self, items):
+        return ','.join(list(items))
+
+    def _list_url(self, data_type, list_by='', items=[]):
+        joined_items = self._join_items(items)
+        return _urljoin(self.api_url, self.content_base_urls[data_type], 'list', list_by, joined_items) + '.json'
+
+    def _plan_composers_by_id(self, ids):
+        """
+        Deduplicate ids and split those not already cached into chunks whose URLs stay under max_url_length.
+
+        Returns (deduplicated ids, dict of id -> cached composer or None, list of id chunks to fetch)
+
+        """
+        ids = list(dict.fromkeys(str(composer_id) for composer_id in ids))
+        found = {}
+        pending = []
+        for composer_id in ids:
+            url = self._list_url(Content.COMPOSERS, 'ids', [composer_id])
+            cached, _ = self._cache_lookup(_escape_url(url), url)
+            if cached is _MISSING:
+                pending.append(composer_id)
+            else:
+                found[composer_id] = next(iter(self._composer_results(cached.get(Content.COMPOSERS.value, []))), None)
+
+        chunks = []
+        base_length = url_length = len(_escape_url(self._list_url(Content.COMPOSERS, 'ids')))
+        for composer_id in pending:
+            # every id after the first in a chunk adds an escaped comma (%2C)
+            id_length = len(quote(composer_id)) + 3
+            if not chunks or url_length + id_length > self.max_url_length:
+                chunks.append([])
+                url_length = base_length
+            chunks[-1].append(composer_id)
+            url_length += id_length
+
+        return ids, found, chunks
+
+    def _merge_composers_by_id(self, ids, found, chunks, chunk_results):
+        # cache every fetched composer under its single-id url, so later lookups can skip it
+        for chunk, composers in zip(chunks, chunk_results):
+            composers_by_id = {composer.get('id'): composer for composer in composers}
+            for composer_id in chunk:
+                composer = composers_by_id.get(composer_id)
+                found[composer_id] = composer
+                url = self._list_url(Content.COMPOSERS, 'ids', [composer_id])
+                self._cache_store(
+                    url, _escape_url(url), {}, {Content.COMPOSERS.value: [] if composer is None else [dict(composer)]},
+                    None)
+
+        return [found[composer_id] for composer_id in ids if found.get(composer_id) is not None]
+
+    def _list_data(self, data_type, list_by='', items=[]):
+        """
+        """
+        target = self._list_url(data_type, list_by=list_by, items=items)
+        results = {Content.COMPOSERS: self._composer_results, Content.WORKS: self._work_results}.get(data_type, list)
+        return self._fetch(target, lambda content: results(content.get(data_type.value, [])))
+
+    def _list_composers(self, list_by='', items=[]):
+        """
+        """
+        target = self._list_url(Content.COMPOSERS, list_by=list_by, items=items)
+        return self._fetch(target, lambda content: self._composer_results(content.get(Content.COMPOSERS.value, [])))
+
+    def _list_works(self, list_by='', items=[]):
+        target = self._list_url(Content.WORKS, list_by=list_by, items=items)
+        return self._fetch(target, lambda content: self._work_results(content.get(Content.WORKS.value, [])))
+
+    def _list_genres(self, list_by='', items=[]):
+        target = self._list_url(Content.GENRES, list_by=list_by, items=items)
+        return self._fetch(target, lambda content: content.get(Content.GENRES, []))
+
+    def _detail_url(self, data_type, item):
+        return _urljoin(self.api_url, self.content_base_urls[data_type], 'detail', str(item)) + '.json'
+
+    def _shared_composer(self, composer, composers):
+        """
+        Return the single composer object for composer's id, taken from composers or the cache if present.
+
+        New composers are cached once under their single-id url (where list_composers_by_id finds them too)
+        and added to composers, so every work detail of a composer refers to the same object.
+
+        """
+        composer_id = str(composer.get('id'))
+        shared = composers.get(composer_id)
+        if shared is not None:
+            return shared
+
+        url = self._list_url(Content.COMPOSERS, 'ids', [composer_id])
+        cached, _ = self._cache_lookup(_escape_url(url))
+        if cached is not _MISSING and cached.get(Content.COMPOSERS.value):
+            composer = cached[Content.COMPOSERS.value][0]
+        else:
+            self._cache_store(url, _escape_url(url), {}, {Content.COMPOSERS.value: [composer]}, None)
+
+        return composers.setdefault(composer_id, (composer, self._composer_results([composer])[0]))
+
+    def _work_details(self, work_id, composers):
+        def extract(content):
+            composer = content.get('composer') or None
+            if composer is not None:
+                composer, result = self._shared_composer(composer, composers)
+                # point a memory-cached detail at the shared composer too, rather than keeping its own copy
+                content['composer'] = composer
+                composer = result
+            work = content.get('work') or None
+            return {'composer': composer, 'work': None if work is None else self._work_results([work])[0]}
+
+        return self._fetch(self._detail_url(Content.WORKS, work_id), extract)
+
+    def _derived_works(self, composer_id, genre, title=None):
+        # answer from the composer's full work list, fetched (and cached) once, filtered through its index
+        target = self._list_url(Content.WORKS, list_by=_urljoin('composer', composer_id, 'genre'), items=[Genre.ALL])
+        genre = genre.value if type(genre) == Genre else genre
+        return self._fetch(target, lambda content: self._work_results(
+            self._work_indexes.get(target, content.get(Content.WORKS.value, [])).filter(genre, title)))
+
+    def list_popular_composers(self):
+        items = ['pop']
+        return self._list_composers(items=items)
+
+    def list_essential_composers(self):
+        items = ['rec']
+        return self._list_composers(items=items)
+
+    def list_composers_by_first_letter(self, letter):
+        list_by = 'name'
+        items = [letter]
+        return self._list_composers(list_by=list_by, items=items)
+
+    def list_composers_by_period(self, period):
+        list_by = 'epoch'
+        items = [period]
+        return self._list_composers(list_by=list_by, items=items)
+
+    def search_composers_by_name(self, name):
+        list_by = 'search'
+        items = [name]
+        return self._list_data(Content.COMPOSERS, list_by=list_by, items=items)
+        # return self._list_composers(list_by=list_by, items=items)
+
+    def list_composers_by_id(self, ids):
+        """
+        List composers for ids, in the order given.
+
+        Duplicate ids are dropped and ids already in the cache are not requested again. The remaining ids
+        are split into chunks whose URLs stay under max_url_length, which are fetched concurrently.
+
+        """
+        list_by = 'ids'
+        items = [ids] if type(ids) == str else ids
+        items, found, chunks = self._plan_composers_by_id(items)
+        return self._gather(
+            lambda chunk: self._list_composers(list_by=list_by, items=chunk), chunks,
+            lambda chunk_results: self._merge_composers_by_id(items, found, chunks, chunk_results))
+
+    def list_genres_by_composer_id(self, composer_id):
+        list_by = 'composer'
+        items = [composer_id]
+        return self._list_genres(list_by=list_by, items=items)
+
+    def list_works_by_composer_id_and_genre(self, composer_id, genre):
+        if self.derive_work_lists:
+            return self._derived_works(composer_id, genre)
+
+        list_by = _urljoin('composer', composer_id, 'genre')
+        items = [genre]
+        return self._list_works(list_by=list_by, items=items)
+
+    def list_works_by_composer_id(self, composer_id):
+        return self.list_works_by_composer_id_and_genre(composer_id, Genre.ALL)
+
+    def list_popular_works_by_composer_id(self, composer_id):
+        return self.list_works_by_composer_id_and_genre(composer_id, Genre.POPULAR)
+
+    def list_essential_works_by_composer_id(self, composer_id):
+        return self.list_works_by_composer_id_and_genre(composer_id, Genre.ESSENTIAL)
+
+    def search_works_by_composer_id_title_and_genre(self, composer_id, title, genre):
+        if type(genre) == Genre:
+            genre = genre.value
+
+        if self.derive_work_lists:
+            return self._derived_works(composer_id, genre, title)
+
+        list_by = _urljoin('composer', composer_id, 'genre', genre, 'search')
+        items = [title]
+        return self._list_works(list_by=list_by, items=items)
+
+    def search_works_by_composer_id_and_title(self, composer_id, title):
+        return self.search_works_by_composer_id_title_and_genre(composer_id, title, Genre.ALL)
+
+    def get_work_details(self, work_id):
+        """
+        Return {'composer': composer, 'work': work} for work_id, either being None if the API has no such entry.
+        """
+        return self._work_details(work_id, {})
+
+
+class OpenOpys(_OpenOpusEndpoints, Session):
+
+    def __init__(self, api_url='https://api.openopus.org', cache=None, max_workers=8, result_mode=ResultMode.DICT,
+                 adapter=None, metrics=None, derive_work_lists=False, json_loads=None, stale_while_revalidate=0,
+                 hedge=False, **kwargs):
+        """
+        api_url may be a list of base urls of mirrors serving the same API. Requests then go to the fastest
+        healthy mirror (see MirrorPool) and fail over to the next one on connection errors, timeouts and 5xx
+        responses. With hedge, a second request is sent to the next mirror if the first one has not answered
+        within its recent p95 response time, and whichever answers first is used. Urls are built (and cached)
+        with the first mirror, so all mirrors share cache entries.
+
+        adapter is the transport adapter mounted for http(s) requests, e.g. a RateLimitedAdapter configured
+        with a rate limit and retries. By default, a RateLimitedAdapter without rate limit or retries is used,
+        with a connection pool large enough for max_workers threads.
+
+        metrics is an optional Metrics instance recording per-endpoint latency, sizes, errors and cache use.
+
+        With derive_work_lists, genre, popular and essential work lists and work title searches are answered
+        by filtering each composer's full work list, so only that one list is requested per composer. Pair it
+        with a cache, otherwise the full list is requested again on every call.
+
+        json_loads parses response bodies from bytes. By default orjson is used if installed, otherwise the
+        standard library's json.loads. A custom decoder should raise ValueError (e.g. json.JSONDecodeError) on
+        invalid content, which is raised as requests.exceptions.JSONDecodeError, like Response.json() does.
+
+        stale_while_revalidate is a grace window in seconds: cached content that expired less than that long
+        ago is returned immediately, and re-fetched into the cache by a background thread.
+
+        Responses are requested gzip or brotli compressed (see decoding.accept_encoding), and metrics record
+        their size on the wire along with their decoded size.
+        """
+        Session.__init__(self, **kwargs)
+        self.headers['Accept-Encoding'] = accept_encoding()
+        api_urls = [api_url] if isinstance(api_url, str) else list(api_url)
+        self.api_url = api_urls[0]
+        self.mirrors = MirrorPool(api_urls) if len(api_urls) > 1 else None
+        self.hedge = hedge
+        self.cache = cache
+        self.max_workers = max_workers
+        self.result_mode = ResultMode(result_mode)
+        self.metrics = metrics
+        self.derive_work_lists = derive_work_lists
+        if json_loads is not None:
+            self.json_loads = json_loads
+        self.stale_while_revalidate = stale_while_revalidate
+        self._work_indexes = WorkIndexes()
+        self._single_flight = SingleFlight()
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_executor = None
+        self._refreshers = []
+        self._hedge_executor = None
+
+        if adapter is None:
+            adapter = RateLimitedAdapter(max_retries=0, pool_maxsize=max(10, max_workers))
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def get_json(self, url, **kwargs):
+        """
+        Wrap standard get method with steps to retrieve and return parsed json content from response.
+
+        If a cache is configured, parsed content is cached under the escaped url and repeat calls
+        are answered from the cache without a request. Expired entries that the cache kept along with
+        their ETag/Last-Modified validators are revalidated with a conditional request, and reused if the
+        server answers 304 Not Modified.
+
+        With stale_while_revalidate, content that expired within the grace window is returned right away
+        and refreshed in the background. Inside a refreshing() block, cached content is ignored and re-fetched.
+
+        Concurrent calls for the same url without extra kwargs share a single request and all receive its
+        result (or exception). coalesced_requests counts the calls answered this way.
+
+        Raises ResponseContentTypeError if content is not of type JSON
+        Raises JSONDecodeError if content cannot be parsed as JSON
+
+        """
+        escaped_url = _escape_url(url)
+
+        cached, stale = self._cache_lookup(escaped_url, url)
+        self._record_cache(url, cached)
+        if cached is not _MISSING:
+            return cached
+
+        if kwargs:
+            return self._request_json(url, escaped_url, stale, **kwargs)
+        return self._single_flight.do(escaped_url, lambda: self._request_json(url, escaped_url, stale))
+
+    def _request_json(self, url, escaped_url, stale, **kwargs):
+        if stale is not None:
+            kwargs['headers'] = _conditional_headers(kwargs.get('headers'), stale[1])
+
+        try:
+            started = time.perf_counter()
+            response = self._get(escaped_url, **kwargs)
+            transferred = time.perf_counter()
+
+            if stale is not None and response.status_code == 304:
+                self.cache.revalidate(escaped_url, endpoint=self._endpoint(url))
+                self._record_request(url, transferred - started, 0, 0)
+                return stale[0]
+
+            _check_content_type(response)
+
+            content = self._decode_json(response.content)
+            self._record_request(
+                url, transferred - started, time.perf_counter() - transferred, len(response.content),
+                wire_size(response), response.headers.get('content-encoding'))
+        except Exception as error:
+            self._record_error(url, error)
+            raise
+
+        self._cache_store(url, escaped_url, response.headers, content, len(response.content), response.content)
+        return content
+
+    def _fetch(self, url, extract):
+        return extract(self.get_json(url))
+
+    def _get(self, escaped_url, **kwargs):
+        if self.mirrors is None:
+            return self.get(escaped_url, **kwargs)
+
+        path = escaped_url[len(_escape_url(self.api_url.rstrip('/'))):]
+        ranked = self.mirrors.ranked()
+        outcome = None
+        position = 0
+        if self.hedge and not kwargs.get('stream') and len(ranked) > 1:
+            outcome = self._hedged_get(ranked[0], ranked[1], path, kwargs)
+            position = 2
+
+        for base in ranked[position:]:
+            if outcome is not None and _succeeded(outcome):
+                break
+            _discard(outcome)
+            outcome = self._mirror_get(base, path, kwargs)
+
+        response, error = outcome
+        if error is not None:
+            raise error
+        return response
+
+    def _mirror_get(self, base, path, kwargs):
+        # returns (response, None) or (None, error), recording the outcome in the mirror's health
+        started = time.perf_counter()
+        try:
+            response = self.get(base.rstrip('/') + path, **kwargs)
+        except (ConnectionError, Timeout) as error:
+            self.mirrors.record(base, time.perf_counter() - started, failed=True)
+            return None, error
+
+        self.mirrors.record(base, time.perf_counter() - started, failed=response.status_code >= 500)
+        return response, None
+
+    def _hedged_get(self, first, second, path, kwargs):
+        with self._refresh_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=2 * self.max_workers, thread_name_prefix='openopys-hedge')
+            executor = self._hedge_executor
+
+        futures = [executor.submit(self._mirror_get, first, path, kwargs)]
+        done, _ = wait(futures, timeout=self.mirrors.hedge_delay(first))
+        if not done or not _succeeded(futures[0].result()):
+            futures.append(executor.submit(self._mirror_get, second, path, kwargs))
+
+        pending = set(futures)
+        outcome = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                _discard(outcome)
+                outcome = future.result()
+                if _succeeded(outcome):
+                    # the slower request still completes in the background, its response is dropped
+                    for other in pending:
+                        other.add_done_callback(lambda late: _discard(late.result()))
+                    return outcome
+        return outcome
+
+    @contextmanager
+    def refreshing(self):
+        """
+        Context manager in which query methods called from this thread bypass cached content, re-fetching
+        it and storing the new content in the cache.
+        """
+        previous = getattr(self._local, 'refreshing', False)
+        self._local.refreshing = True
+        try:
+            yield self
+        finally:
+            self._local.refreshing = previous
+
+    def _is_refreshing(self):
+        return getattr(self._local, 'refreshing', False)
+
+    def _refresh_in_background(self, url, escaped_url):
+        with self._refresh_lock:
+            if escaped_url in self._refreshing:
+                return
+            self._refreshing.add(escaped_url)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='openopys-refresh')
+            # submitted under the lock, so close() cannot shut the executor down in between
+            try:
+                self._refresh_executor.submit(self._refresh, url, escaped_url)
+            except RuntimeError:
+                # the executor was shut down anyway; the stale content is served and refreshed on a later read
+                self._refreshing.discard(escaped_url)
+
+    def _refresh(self, url, escaped_url):
+        try:
+            self._single_flight.do(
+                escaped_url, lambda: self._request_json(url, escaped_url, self.cache.get_stale(escaped_url)))
+        except Exception:
+            # the stale content keeps being served until the grace window ends; the error is in metrics
+            pass
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(escaped_url)
+
+    def refresh_ahead(self, queries, interval):
+        """
+        Start a CacheRefresher re-running queries every interval seconds, so their cached results are
+        renewed before they expire. Choose interval below the TTL of the queried endpoints.
+
+        queries are callables taking this session, e.g. OpenOpys.list_popular_composers or
+        lambda opys: opys.list_works_by_composer_id('178'). The refresher stops when the session is closed.
+
+        """
+        refresher = CacheRefresher(self, queries, interval)
+        self._refreshers.append(refresher)
+        refresher.start()
+        return refresher
+
+    def close(self):
+        for refresher in self._refreshers:
+            refresher.stop()
+        self._refreshers = []
+        with self._refresh_lock:
+            if self._refresh_executor is not None:
+                self._refresh_executor.shutdown(wait=False, cancel_futures=True)
+            self._refresh_executor = None
+            # cancelled refreshes never reach their finally, so their urls would never be refreshed again
+            self._refreshing.clear()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        self._hedge_executor = None
+        Session.close(self)
+
+    def iter_json(self, url, key, chunk_size=16 * 1024, **kwargs):
+        """
+        Stream the json object at url, yielding the items of its top-level array at key as they are parsed.
+
+        The response is read with stream=True in chunk_size pieces, so memory stays bounded by the largest
+        single item. Cached content is used if present, but streamed content is not added to the cache.
+
+        Raises ResponseContentTypeError if content is not of type JSON
+        Raises JSONDecodeError if content cannot be parsed as JSON
+
+        """
+        escaped_url = _escape_url(url)
+
+        cached, _ = self._cache_lookup(escaped_url)
+        if cached is not _MISSING:
+            yield from cached.get(key, [])
+            return
+
+        with self._get(escaped_url, stream=True, **kwargs) as response:
+            _check_content_type(response)
+            yield from iter_json_array(response.iter_content(chunk_size), key, response.encoding or 'utf-8')
+
+    def _gather(self, func, items, combine):
+        if len(items) <= 1:
+            return combine([func(item) for item in items])
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return combine(list(executor.map(func, items)))
+
+    def map_as_completed(self, func, keys, max_workers=None, window=None):
+        """
+        Call func(key) for each distinct key on a bounded thread pool, yielding (key, result, error) as each call finishes.
+
+        error is None on success, otherwise result is None and error is the raised exception. Calls share this
+        session and therefore its connection pool. Closing the generator early cancels calls that have not started.
+        With window, at most that many calls are started or finished but not yet yielded at any time, so results
+        wait in memory only as long as the consumer is slower than the calls.
+
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(max_workers or self.max_workers, len(keys)))
+        remaining = iter(keys)
+        try:
+            futures = {executor.submit(func, key): key for key in islice(remaining, window or len(keys))}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = futures.pop(future)
+                    futures.update((executor.submit(func, next_key), next_key) for next_key in islice(remaining, 1))
+                    error = future.exception()
+                    yield key, None if error is not None else future.result(), error
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _bulk(self, func, keys, max_workers=None):
+        results = BulkResult()
+        for key, result, error in self.map_as_completed(func, keys, max_workers=max_workers):
+            if error is not None:
+                results.errors[key] = error
+            else:
+                results[key] = result
+        return results
+
+    def list_works_by_composer_ids(self, composer_ids, genre=Genre.ALL, max_workers=None):
+        """
+        Concurrently list works of the given genre for each composer id.
+
+        Returns a BulkResult mapping composer id to its works, with failed ids and their exceptions in errors.
+        Use map_as_completed to process each composer as soon as its works arrive.
+
+        """
+        return self._bulk(
+            lambda composer_id: self.list_works_by_composer_id_and_genre(composer_id, genre),
+            composer_ids, max_workers=max_workers)
+
+    def list_genres_by_composer_ids(self, composer_ids, max_workers=None):
+        """
+        Concurrently list genres for each composer id.
+
+        Returns a BulkResult mapping composer id to its genres, with failed ids and their exceptions in errors.
+
+        """
+        return self._bulk(self.list_genres_by_composer_id, composer_ids, max_workers=max_workers)
+
+    def get_work_details_by_ids(self, work_ids, max_workers=None):
+        """
+        Concurrently get details for each work id, as get_work_details does.
+
+        Returns a BulkResult mapping work id to its {'composer': composer, 'work': work} details, with failed
+        ids and their exceptions in errors. Duplicate ids are requested once, and works by the same composer
+        share one composer object, which is also cached once rather than with every work.
+
+        """
+        composers = {}
+        return self._bulk(
+            lambda work_id: self._work_details(work_id, composers), [str(work_id) for work_id in work_ids],
+            max_workers=max_workers)
+
+    def _iter_data(self, data_type, list_by='', items=[]):
+        target = self._list_url(data_type, list_by=list_by, items=items)
+        records = {Content.COMPOSERS: Composer, Content.WORKS: Work}.get(data_type)
+        for item in self.iter_json(target, data_type.value):
+            yield item if self.result_mode == ResultMode.DICT or records is None else records.from_dict(item)
+
+    def iter_composers_by_first_letter(self, letter):
+        return self._iter_data(Content.COMPOSERS, list_by='name', items=[letter])
+
+    def iter_composers_by_period(self, period):
+        return self._iter_data(Content.COMPOSERS, list_by='epoch', items=[period])
+
+    def iter_works_by_composer_id_and_genre(self, composer_id, genre):
+        list_by = _urljoin('composer', composer_id, 'genre')
+        return self._iter_data(Content.WORKS, list_by=list_by, items=[genre])
+
+    def iter_works_by_composer_id(self, composer_id):
+        return self.iter_works_by_composer_id_and_genre(composer_id, Genre.ALL)
+
+    def iter_popular_works_by_composer_id(self, composer_id):
+        return self.iter_works_by_composer_id_and_genre(composer_id, Genre.POPULAR)
+
+    def iter_essential_works_by_composer_id(self, composer_id):
+        return self.iter_works_by_composer_id_and_genre(composer_id, Genre.ESSENTIAL)
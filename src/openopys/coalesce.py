@@ -0,0 +1,101 @@
+import asyncio
+from threading import Event, Lock
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing a key, so only the first runs and the others wait for its outcome.
+
+    Every waiting caller receives the same result object, or has the same exception raised.
+    coalesced counts the calls that were answered by another call's outcome.
+
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+
+class _AsyncCall:
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight, coalescing concurrent awaits of func() sharing a key.
+
+    func() runs in its own task, which every caller awaits through asyncio.shield, so cancelling one caller
+    (the first one included) does not affect the others. The task is cancelled once all its callers are.
+
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+
+    async def do(self, key, func):
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(func()))
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # every caller was cancelled, so nobody needs the outcome any more
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _finished(self, key, call):
+        self._forget(key, call)
+        # mark the exception as retrieved, in case nobody else was waiting for it
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
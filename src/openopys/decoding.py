@@ -0,0 +1,49 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+def json_loads(content):
+    """
+    Parse JSON response content straight from bytes, without first decoding it to text.
+
+    Uses orjson if it is installed and the standard library otherwise (which detects UTF-8/16/32 from the
+    bytes itself). Raises json.JSONDecodeError if content is not valid JSON; orjson's error subclasses it.
+
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def accept_encoding():
+    """
+    Return the Accept-Encoding header value for the content codings responses are decoded from: gzip and
+    deflate, preceded by brotli if the brotli (or brotlicffi) package is installed.
+    """
+    if brotli is not None:
+        return 'br, gzip, deflate'
+    return 'gzip, deflate'
+
+
+def wire_size(response):
+    """Return the number of body bytes received for a requests or httpx response, before content decoding"""
+    size = getattr(response, 'num_bytes_downloaded', None)
+    if size is None:
+        try:
+            # urllib3 counts the bytes read from the connection, which differ from the content if compressed
+            size = response.raw.tell()
+        except (AttributeError, OSError, ValueError):
+            size = None
+    return size or len(response.content)
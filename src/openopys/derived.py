@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from threading import Lock
+
+from .text import _fold
+
+_work_text_fields = ['title', 'subtitle', 'searchterms']
+_work_indexed_fields = ['id', 'genre', 'popular', 'recommended', *_work_text_fields]
+
+
+def _signature(works):
+    # everything a WorkIndex is derived from, so equal lists share an index whichever objects hold them
+    return len(works), hash(tuple(tuple(work.get(field) for field in _work_indexed_fields) for work in works))
+
+
+class WorkIndex:
+    """
+    Positions of a composer's works by genre and by popular/recommended flag.
+
+    Built once from the full ('all') work list, after which every genre, popular and essential list, and
+    title searches within them, are answered by filtering that list instead of requesting it from the API.
+
+    """
+
+    def __init__(self, works):
+        self.works = works
+        self.genres = {}
+        self.popular = []
+        self.recommended = []
+        self._search_text = None
+        for position, work in enumerate(works):
+            self.genres.setdefault(work.get('genre'), []).append(position)
+            if work.get('popular') == '1':
+                self.popular.append(position)
+            if work.get('recommended') == '1':
+                self.recommended.append(position)
+
+    def positions(self, genre):
+        """Return the positions of works in genre, where 'Popular' and 'Recommended' select by flag"""
+        if genre == 'all':
+            return range(len(self.works))
+        if genre == 'Popular':
+            return self.popular
+        if genre == 'Recommended':
+            return self.recommended
+        return self.genres.get(genre, [])
+
+    def filter(self, genre='all', title=None):
+        """
+        Return the works in genre, in API order, optionally restricted to those matching title.
+
+        Like the API search, title matches when each of its words occurs in the title, subtitle or search
+        terms of a work, ignoring case and accents.
+
+        """
+        positions = self.positions(genre)
+        words = _fold(title).split()
+        if words:
+            if self._search_text is None:
+                self._search_text = [
+                    _fold(' '.join(work.get(field) or '' for field in _work_text_fields))
+                    for work in self.works]
+            positions = [
+                position for position in positions if all(word in self._search_text[position] for word in words)]
+
+        return [self.works[position] for position in positions]
+
+
+class WorkIndexes:
+    """
+    Thread-safe LRU of WorkIndex per url, keeping at most max_size.
+
+    An index is reused for any list with the same works (by id, genre, flags and text), so caches handing
+    out a freshly decoded copy on every read (SqliteCache, compressed caches) do not rebuild it each time;
+    it is rebuilt whenever the works differ, e.g. after the cached list expired and changed upstream.
+
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._indexes = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, works):
+        with self._lock:
+            entry = self._indexes.get(key)
+        signature = None
+        if entry is not None and entry[1].works is not works:
+            signature = _signature(works)
+        if entry is not None and (signature is None or signature == entry[0]):
+            with self._lock:
+                if key in self._indexes:
+                    self._indexes.move_to_end(key)
+            return entry[1]
+
+        index = WorkIndex(works)
+        with self._lock:
+            self._indexes[key] = (signature or _signature(works), index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_size:
+                self._indexes.popitem(last=False)
+        return index
@@ -0,0 +1,316 @@
+import csv
+import os
+from array import array
+
+from .mirror import CatalogMirror
+from .records import WorkList
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+# (column, kind, category value kind) per table; category columns hold int32 codes into a shared dictionary
+_tables = {
+    'composers': [
+        ('id', 'int', None), ('name', 'text', None), ('complete_name', 'text', None), ('birth', 'text', None),
+        ('death', 'text', None), ('epoch', 'category', 'text'), ('portrait', 'text', None),
+    ],
+    'works': [
+        ('composer_id', 'category', 'int'), ('id', 'int', None), ('title', 'text', None), ('subtitle', 'text', None),
+        ('searchterms', 'text', None), ('genre', 'category', 'text'), ('popular', 'bool', None),
+        ('recommended', 'bool', None),
+    ],
+}
+
+_extensions = {'parquet': '.parquet', 'arrow': '.arrows', 'numpy': '.npz', 'csv': '.csv'}
+
+
+class _Categories:
+    """
+    Growing dictionary of category values; codes stay stable as values are added.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _new_column(kind):
+    return {'int': lambda: array('q'), 'bool': lambda: array('b'), 'category': lambda: array('i')}.get(kind, list)()
+
+
+class CatalogExporter:
+    """
+    Streams the composer and work catalog into columnar files for analytics.
+
+    source is an OpenOpys session or a CatalogMirror. Composers are listed by first letter (by='letter') or
+    by period (by='period'), then works are fetched per composer (concurrently if source has
+    map_as_completed) and converted into column batches of at most batch_size rows, each written out before
+    the next one is built, so the catalog is never held in memory as dicts.
+
+    In the works table composer_id is dictionary-encoded against the composers table, and genre (like epoch
+    for composers) is categorical. Formats are 'parquet' and 'arrow' (an Arrow IPC stream) with pyarrow,
+    'numpy' (a .npz of one array per column plus <column>_categories) with NumPy, and 'csv', which always
+    works and writes category values as is. The NumPy format can only be written whole, so it holds the full
+    column arrays in memory until the table is done.
+
+    """
+
+    def __init__(self, source, batch_size=10000, by='letter'):
+        self.source = source
+        self.batch_size = batch_size
+        self.by = by
+        self.categories = {}
+        self.errors = {}
+        self._composers = None
+
+    @staticmethod
+    def default_format():
+        """Return the best format available: 'parquet' with pyarrow, else 'numpy' with NumPy, else 'csv'"""
+        if pyarrow is not None:
+            return 'parquet'
+        if numpy is not None:
+            return 'numpy'
+        return 'csv'
+
+    def export(self, directory, format=None):
+        """
+        Write the composers and works tables to directory as composers.<ext> and works.<ext>.
+
+        Returns a dict of table name -> path. Failed work requests are skipped and kept in self.errors.
+
+        """
+        format = format or self.default_format()
+        if format not in _extensions:
+            raise ValueError(f"Cannot export to '{format}'. Must be one of {', '.join(_extensions)}")
+
+        os.makedirs(directory, exist_ok=True)
+        paths = {}
+        for table in _tables:
+            paths[table] = os.path.join(directory, table + _extensions[format])
+            writer = _writers[format](paths[table], _tables[table], self.categories)
+            try:
+                for batch in self.iter_batches(table):
+                    writer.write(batch)
+            finally:
+                writer.close()
+        return paths
+
+    def iter_batches(self, table):
+        """Yield batches of table ('composers' or 'works') as dicts of column name -> values"""
+        rows = self._iter_composer_rows() if table == 'composers' else self._iter_work_rows()
+        batch = None
+        for columns in rows:
+            start, count = 0, len(columns['id'])
+            while start < count:
+                if batch is None:
+                    batch = {column: _new_column(kind) for column, kind, _ in _tables[table]}
+                end = min(count, start + self.batch_size - len(batch['id']))
+                for column, values in columns.items():
+                    batch[column].extend(values[start:end])
+                start = end
+                if len(batch['id']) >= self.batch_size:
+                    yield batch
+                    batch = None
+
+        if batch is not None:
+            yield batch
+
+    def _category(self, column):
+        categories = self.categories.get(column)
+        if categories is None:
+            categories = self.categories[column] = _Categories()
+        return categories
+
+    def _list_composers(self):
+        if self._composers is None:
+            if self.by == 'letter':
+                lister, keys = self.source.list_composers_by_first_letter, CatalogMirror.letters
+            elif self.by == 'period':
+                lister, keys = self.source.list_composers_by_period, CatalogMirror.periods
+            else:
+                raise ValueError(f"Cannot list composers by '{self.by}'. Must be 'letter' or 'period'")
+
+            composers = {}
+            for key in keys:
+                for composer in lister(key):
+                    composers.setdefault(composer['id'], composer)
+            self._composers = list(composers.values())
+
+            composer_ids = self._category('composer_id')
+            for composer in self._composers:
+                composer_ids.code(int(composer['id']))
+
+        return self._composers
+
+    def _iter_composer_rows(self):
+        epochs = self._category('epoch')
+        for composer in self._list_composers():
+            yield {
+                'id': [int(composer['id'])], 'name': [composer['name']],
+                'complete_name': [composer.get('complete_name')], 'birth': [composer.get('birth')],
+                'death': [composer.get('death')], 'epoch': [epochs.code(composer.get('epoch'))],
+                'portrait': [composer.get('portrait')],
+            }
+
+    def _iter_works(self):
+        composer_ids = [composer['id'] for composer in self._list_composers()]
+        map_as_completed = getattr(self.source, 'map_as_completed', None)
+        if map_as_completed is None:
+            for composer_id in composer_ids:
+                yield composer_id, self.source.list_works_by_composer_id(composer_id)
+            return
+
+        # a bounded window keeps finished work lists from piling up while batches are written
+        window = 2 * self.source.max_workers
+        for composer_id, works, error in map_as_completed(
+                self.source.list_works_by_composer_id, composer_ids, window=window):
+            if error is not None:
+                self.errors[composer_id] = error
+            else:
+                yield composer_id, works
+
+    def _iter_work_rows(self):
+        genres = self._category('genre')
+        composer_codes = self._category('composer_id')
+        for composer_id, works in self._iter_works():
+            composer_code = composer_codes.code(int(composer_id))
+            if isinstance(works, WorkList):
+                # columnar results convert without building a record per work
+                columns = {field: works.column(field) for field in ['id', 'title', 'subtitle', 'searchterms']}
+                columns['genre'] = [genres.code(genre) for genre in works.column('genre')]
+                columns['popular'] = works.column('popular')
+                columns['recommended'] = works.column('recommended')
+            else:
+                columns = {
+                    'id': [int(work['id']) for work in works],
+                    'title': [work['title'] for work in works],
+                    'subtitle': [work.get('subtitle') for work in works],
+                    'searchterms': [work.get('searchterms') for work in works],
+                    'genre': [genres.code(work.get('genre')) for work in works],
+                    'popular': [work.get('popular') == '1' for work in works],
+                    'recommended': [work.get('recommended') == '1' for work in works],
+                }
+            columns['composer_id'] = [composer_code] * len(works)
+            yield columns
+
+
+class _ArrowWriter:
+
+    def __init__(self, path, columns, categories, stream=False):
+        if pyarrow is None:
+            raise ImportError("Arrow and Parquet export require pyarrow. Install it with 'pip install pyarrow'")
+
+        self.columns = columns
+        self.categories = categories
+        value_types = {'int': pyarrow.int64(), 'bool': pyarrow.bool_(), 'text': pyarrow.string()}
+        self.schema = pyarrow.schema([
+            (column, pyarrow.dictionary(pyarrow.int32(), value_types[value_kind]) if kind == 'category'
+             else value_types[kind])
+            for column, kind, value_kind in columns])
+        if stream:
+            # dictionaries only ever grow, so later batches can send just the new values
+            self._writer = pyarrow.ipc.new_stream(
+                path, self.schema, options=pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+        else:
+            self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, batch):
+        arrays = []
+        for (column, kind, _), field in zip(self.columns, self.schema):
+            if kind == 'category':
+                arrays.append(pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(batch[column], pyarrow.int32()),
+                    pyarrow.array(self.categories[column].values, field.type.value_type)))
+            elif kind == 'bool':
+                arrays.append(pyarrow.array(batch[column], pyarrow.int8()).cast(field.type))
+            else:
+                arrays.append(pyarrow.array(batch[column], field.type))
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class _NumpyWriter:
+    """
+    Writes a .npz, which can only be written whole: typed column arrays are kept until close, so unlike the
+    other formats the NumPy export holds every column of the table in memory, though never as dicts.
+    """
+
+    def __init__(self, path, columns, categories):
+        if numpy is None:
+            raise ImportError("NumPy export requires numpy. Install it with 'pip install numpy'")
+
+        self.path = path
+        self.columns = columns
+        self.categories = categories
+        self._batches = {column: [] for column, _, _ in columns}
+
+    def write(self, batch):
+        # only typed arrays are kept between batches, text columns as fixed width unicode
+        dtypes = {'int': numpy.int64, 'bool': numpy.bool_, 'category': numpy.int32, 'text': numpy.str_}
+        for column, kind, _ in self.columns:
+            values = batch[column]
+            if kind == 'text':
+                values = ['' if value is None else value for value in values]
+            self._batches[column].append(numpy.asarray(values, dtype=dtypes[kind]))
+
+    def close(self):
+        arrays = {column: numpy.concatenate(batches) for column, batches in self._batches.items() if batches}
+        for column, kind, value_kind in self.columns:
+            if kind == 'category':
+                values = self.categories[column].values
+                if value_kind == 'text':
+                    values = ['' if value is None else value for value in values]
+                arrays[column + '_categories'] = numpy.asarray(values)
+        with open(self.path, 'wb') as output_file:
+            numpy.savez(output_file, **arrays)
+
+
+class _CsvWriter:
+
+    def __init__(self, path, columns, categories):
+        self.columns = columns
+        self.categories = categories
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([column for column, _, _ in columns])
+
+    def write(self, batch):
+        columns = []
+        for column, kind, _ in self.columns:
+            values = batch[column]
+            if kind == 'category':
+                categories = self.categories[column].values
+                values = [categories[code] for code in values]
+            elif kind == 'bool':
+                values = [int(value) for value in values]
+            columns.append(values)
+        self._writer.writerows(zip(*columns))
+
+    def close(self):
+        self._file.close()
+
+
+_writers = {
+    'parquet': _ArrowWriter,
+    'arrow': lambda path, columns, categories: _ArrowWriter(path, columns, categories, stream=True),
+    'numpy': _NumpyWriter,
+    'csv': _CsvWriter,
+}
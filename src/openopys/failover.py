@@ -0,0 +1,81 @@
+import time
+from collections import deque
+from threading import Lock
+
+
+class _MirrorStats:
+
+    def __init__(self, window):
+        self.latency = None
+        self.error_rate = 0.0
+        self.failed_at = None
+        self.last_failed = False
+        self.requests = 0
+        self.latencies = deque(maxlen=window)
+
+
+class MirrorPool:
+    """
+    Thread-safe health tracking for several base URLs of the OpenOpus API.
+
+    Each mirror keeps an exponentially weighted moving average (weight alpha) of its successful response
+    times and of its error rate. ranked() orders mirrors fastest first, with mirrors that have not answered
+    yet tried before known ones. Mirrors whose latest request failed, or whose error rate is above
+    max_error_rate, are moved last until cooldown seconds have passed since their latest failure.
+
+    """
+
+    def __init__(self, urls, alpha=0.2, max_error_rate=0.5, cooldown=30, window=100, min_samples=20):
+        self.urls = list(urls)
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self._stats = {url: _MirrorStats(window) for url in self.urls}
+        self._lock = Lock()
+
+    def record(self, url, seconds, failed=False):
+        with self._lock:
+            stats = self._stats[url]
+            stats.requests += 1
+            stats.error_rate += self.alpha * ((1.0 if failed else 0.0) - stats.error_rate)
+            stats.last_failed = failed
+            if failed:
+                stats.failed_at = time.monotonic()
+                return
+
+            stats.latency = seconds if stats.latency is None else stats.latency + self.alpha * (seconds - stats.latency)
+            stats.latencies.append(seconds)
+
+    def healthy(self, url):
+        with self._lock:
+            stats = self._stats[url]
+            return not ((stats.last_failed or stats.error_rate > self.max_error_rate) and stats.failed_at is not None
+                        and time.monotonic() - stats.failed_at < self.cooldown)
+
+    def ranked(self):
+        """Return the urls, best first"""
+        health = {url: self.healthy(url) for url in self.urls}
+        with self._lock:
+            return sorted(self.urls, key=lambda url: (
+                not health[url], self._stats[url].latency or 0.0, self.urls.index(url)))
+
+    def hedge_delay(self, url, percentile=95):
+        """
+        Return the given percentile of url's recent response times, after which a hedged request is worth
+        sending, or None while there are fewer than min_samples of them.
+        """
+        with self._lock:
+            latencies = sorted(self._stats[url].latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def snapshot(self):
+        """Return {url: {'latency', 'error_rate', 'requests', 'healthy'}}"""
+        health = {url: self.healthy(url) for url in self.urls}
+        with self._lock:
+            return {
+                url: {'latency': stats.latency, 'error_rate': stats.error_rate, 'requests': stats.requests,
+                      'healthy': health[url]}
+                for url, stats in self._stats.items()}
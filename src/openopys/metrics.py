@@ -0,0 +1,175 @@
+import re
+from bisect import bisect_left
+from threading import Lock
+
+
+_endpoint_patterns = [
+    (re.compile(r'^composer/list/+pop\.json$'), 'composers.popular'),
+    (re.compile(r'^composer/list/+rec\.json$'), 'composers.essential'),
+    (re.compile(r'^composer/list/name/'), 'composers.by_letter'),
+    (re.compile(r'^composer/list/epoch/'), 'composers.by_period'),
+    (re.compile(r'^composer/list/search/'), 'composers.search'),
+    (re.compile(r'^composer/list/ids/'), 'composers.by_id'),
+    (re.compile(r'^genre/list/composer/'), 'genres.by_composer'),
+    (re.compile(r'^work/list/composer/[^/]+/genre/[^/]+/search/'), 'works.search'),
+    (re.compile(r'^work/list/composer/[^/]+/genre/'), 'works.by_composer_genre'),
+    (re.compile(r'^work/detail/'), 'works.details'),
+]
+
+
+def endpoint_name(endpoint):
+    """
+    Map an endpoint path relative to the API url (e.g. 'work/list/composer/178/genre/all.json') to a
+    logical endpoint name (e.g. 'works.by_composer_genre') suitable as a metrics label.
+    """
+    for pattern, name in _endpoint_patterns:
+        if pattern.match(endpoint):
+            return name
+    return '.'.join(endpoint.split('/')[:2]) or 'other'
+
+
+class Histogram:
+    """
+    Cumulative histogram over fixed bucket upper bounds, with running sum and count.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """Return (upper bound, number of observations <= upper bound) pairs, ending with ('+Inf', count)"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def to_dict(self):
+        return {'buckets': dict(self.cumulative_counts()), 'sum': self.sum, 'count': self.count}
+
+
+class _EndpointStats:
+
+    def __init__(self, time_buckets, size_buckets):
+        self.transfer_seconds = Histogram(time_buckets)
+        self.decode_seconds = Histogram(time_buckets)
+        self.response_bytes = Histogram(size_buckets)
+        self.wire_bytes = Histogram(size_buckets)
+        self.encodings = {}
+        self.errors = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def to_dict(self):
+        return {
+            'transfer_seconds': self.transfer_seconds.to_dict(),
+            'decode_seconds': self.decode_seconds.to_dict(),
+            'response_bytes': self.response_bytes.to_dict(),
+            'wire_bytes': self.wire_bytes.to_dict(),
+            'encodings': dict(self.encodings),
+            'errors': dict(self.errors),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+class Metrics:
+    """
+    Thread-safe in-process request statistics per logical endpoint.
+
+    Records transfer and JSON decode latency histograms, decoded response sizes and sizes on the wire
+    (smaller when compressed), responses by content encoding, error counts by exception type and cache
+    hits/misses. Pass an instance as OpenOpys(metrics=...); without one, nothing is recorded.
+
+    """
+
+    time_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    size_buckets = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+    def __init__(self):
+        self._lock = Lock()
+        self._endpoints = {}
+
+    def _stats(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = _EndpointStats(self.time_buckets, self.size_buckets)
+        return stats
+
+    def record_request(self, endpoint, transfer_seconds, decode_seconds, size, wire_size=None, encoding=None):
+        """
+        Record a response of size decoded bytes, received as wire_size bytes (size if None) in the content
+        encoding given by its Content-Encoding header ('identity' if None).
+        """
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.transfer_seconds.observe(transfer_seconds)
+            stats.decode_seconds.observe(decode_seconds)
+            stats.response_bytes.observe(size)
+            stats.wire_bytes.observe(size if wire_size is None else wire_size)
+            encoding = encoding or 'identity'
+            stats.encodings[encoding] = stats.encodings.get(encoding, 0) + 1
+
+    def record_error(self, endpoint, error):
+        with self._lock:
+            errors = self._stats(endpoint).errors
+            name = type(error).__name__
+            errors[name] = errors.get(name, 0) + 1
+
+    def record_cache(self, endpoint, hit):
+        with self._lock:
+            stats = self._stats(endpoint)
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+    def snapshot(self):
+        """Return a plain dict copy of the statistics, keyed by endpoint name"""
+        with self._lock:
+            return {endpoint: stats.to_dict() for endpoint, stats in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def to_prometheus(self, prefix='openopys'):
+        """Render the statistics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for metric in ['transfer_seconds', 'decode_seconds', 'response_bytes', 'wire_bytes']:
+            name = f'{prefix}_{metric}'
+            lines.append(f'# TYPE {name} histogram')
+            for endpoint, stats in snapshot.items():
+                histogram = stats[metric]
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram["sum"]}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram["count"]}')
+
+        lines.append(f'# TYPE {prefix}_responses_total counter')
+        for endpoint, stats in snapshot.items():
+            for encoding, count in stats['encodings'].items():
+                lines.append(f'{prefix}_responses_total{{endpoint="{endpoint}",encoding="{encoding}"}} {count}')
+
+        lines.append(f'# TYPE {prefix}_errors_total counter')
+        for endpoint, stats in snapshot.items():
+            for error, count in stats['errors'].items():
+                lines.append(f'{prefix}_errors_total{{endpoint="{endpoint}",error="{error}"}} {count}')
+
+        lines.append(f'# TYPE {prefix}_cache_requests_total counter')
+        for endpoint, stats in snapshot.items():
+            for result, count in [('hit', stats['cache_hits']), ('miss', stats['cache_misses'])]:
+                if count:
+                    lines.append(f'{prefix}_cache_requests_total{{endpoint="{endpoint}",result="{result}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
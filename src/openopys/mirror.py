@@ -0,0 +1,259 @@
+import gzip
+import json
+import os
+import string
+import time
+
+from .client import Genre
+from .search import CatalogSearch
+
+
+class CatalogMirror:
+    """
+    Local snapshot of the full OpenOpus catalog, answering OpenOpys query methods from memory.
+
+    crawl() lists every composer (by first letter, or by period) through the given OpenOpys session and
+    fetches genres and works for each of them with bounded parallelism. The snapshot is saved to path
+    (gzip compressed if path ends with '.gz') and loaded back on construction if the file exists.
+
+    refresh() re-lists composers and only re-fetches genres and works for composers that are new,
+    changed, or were fetched more than max_age seconds ago. Both bypass the session cache, storing the
+    fetched content in it.
+
+    Search methods use a CatalogSearch prefix index built on first use, with accent and case folding and
+    ranked results. Returned lists are shared with the mirror and should be treated as read-only.
+
+    """
+
+    letters = string.ascii_uppercase
+    periods = [
+        'Medieval', 'Renaissance', 'Baroque', 'Classical', 'Early Romantic', 'Romantic', 'Late Romantic',
+        '20th Century', 'Post-War', '21st Century'
+    ]
+    version = 1
+
+    def __init__(self, openopys, path, max_workers=None):
+        self.openopys = openopys
+        self.path = os.fspath(path)
+        self.max_workers = max_workers
+        self.errors = {}
+        self._snapshot = {
+            'version': self.version, 'crawled_at': None,
+            'composers': {}, 'popular': [], 'essential': [], 'genres': {}, 'works': {}, 'fetched_at': {}
+        }
+        if os.path.exists(self.path):
+            self.load()
+        else:
+            self._build_indexes()
+
+    def __len__(self):
+        return len(self._snapshot['composers'])
+
+    @property
+    def crawled_at(self):
+        return self._snapshot['crawled_at']
+
+    def load(self):
+        with self._open('rt') as snapshot_file:
+            snapshot = json.load(snapshot_file)
+
+        if snapshot.get('version') != self.version:
+            raise ValueError(f"Unsupported snapshot version {snapshot.get('version')} in '{self.path}'")
+
+        self._snapshot = snapshot
+        self._build_indexes()
+
+    def save(self):
+        # write to a temporary file first so readers never see a partially written snapshot
+        tmp_path = self.path + '.tmp'
+        with self._open('wt', tmp_path) as snapshot_file:
+            json.dump(self._snapshot, snapshot_file, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def crawl(self, by='letter'):
+        """
+        Fetch the whole catalog, replacing the current snapshot, and save it.
+
+        Composers are listed by first letter (by='letter') or by period (by='period').
+        Returns a dict of failed requests and their exceptions, also kept in self.errors.
+
+        """
+        return self.refresh(max_age=0, by=by)
+
+    def refresh(self, max_age=None, by='letter'):
+        """
+        Re-list composers and re-fetch genres and works only for composers that are new, changed, or were
+        fetched more than max_age seconds ago (None never considers data too old), then save the snapshot.
+
+        Returns a dict of failed requests and their exceptions, also kept in self.errors.
+
+        """
+        self.errors = {}
+        composers = self._list_all_composers(by)
+        previous = self._snapshot['composers']
+        fetched_at = self._snapshot['fetched_at']
+        now = time.time()
+        stale_ids = [
+            composer_id for composer_id, composer in composers.items()
+            if previous.get(composer_id) != composer or composer_id not in fetched_at
+            or (max_age is not None and now - fetched_at[composer_id] >= max_age)
+        ]
+
+        genres = self._fetch_for_composers(self._fresh(self.openopys.list_genres_by_composer_id), stale_ids, 'genres')
+        works = self._fetch_for_composers(self._fresh(self.openopys.list_works_by_composer_id), stale_ids, 'works')
+
+        snapshot = self._snapshot
+        for composer_id in set(previous) - set(composers):
+            for key in ['genres', 'works', 'fetched_at']:
+                snapshot[key].pop(composer_id, None)
+
+        for composer_id in stale_ids:
+            if composer_id in genres and composer_id in works:
+                snapshot['genres'][composer_id] = genres[composer_id]
+                snapshot['works'][composer_id] = works[composer_id]
+                snapshot['fetched_at'][composer_id] = now
+            else:
+                # keep serving previous data, but retry on the next refresh
+                snapshot['fetched_at'].pop(composer_id, None)
+
+        snapshot['composers'] = composers
+        snapshot['popular'] = self._list_ids(self._fresh(self.openopys.list_popular_composers), 'popular')
+        snapshot['essential'] = self._list_ids(self._fresh(self.openopys.list_essential_composers), 'essential')
+        snapshot['crawled_at'] = now
+        self._build_indexes()
+        self.save()
+        return self.errors
+
+    def _list_all_composers(self, by):
+        if by == 'letter':
+            lister, keys = self.openopys.list_composers_by_first_letter, self.letters
+        elif by == 'period':
+            lister, keys = self.openopys.list_composers_by_period, self.periods
+        else:
+            raise ValueError(f"Cannot list composers by '{by}'. Must be 'letter' or 'period'")
+
+        composers = {}
+        for key, result, error in self.openopys.map_as_completed(
+                self._fresh(lister), keys, max_workers=self.max_workers):
+            if error is not None:
+                self.errors[('composers', key)] = error
+                continue
+            for composer in result:
+                composers[composer['id']] = composer
+
+        # keep composers from lists that failed this time instead of treating them as removed
+        previous = self._snapshot['composers']
+        for key in [key for kind, key in self.errors if kind == 'composers']:
+            for composer_id, composer in previous.items():
+                if composer_id not in composers and self._composer_key(composer, by) == key:
+                    composers[composer_id] = composer
+
+        return dict(sorted(composers.items(), key=lambda item: item[1]['name']))
+
+    def _fresh(self, func):
+        # changes are detected against what the API returns now, never against the session cache; refreshing()
+        # only applies to the calling thread, so it is entered in each map_as_completed worker
+        def fetch(*args):
+            with self.openopys.refreshing():
+                return func(*args)
+
+        return fetch
+
+    def _fetch_for_composers(self, func, composer_ids, kind):
+        results = {}
+        for composer_id, result, error in self.openopys.map_as_completed(
+                func, composer_ids, max_workers=self.max_workers):
+            if error is not None:
+                self.errors[(kind, composer_id)] = error
+            else:
+                results[composer_id] = result
+        return results
+
+    def _list_ids(self, func, kind):
+        try:
+            return [composer['id'] for composer in func()]
+        except Exception as error:
+            self.errors[(kind, None)] = error
+            return self._snapshot[kind]
+
+    def _composer_key(self, composer, by):
+        return composer['name'][:1].upper() if by == 'letter' else composer['epoch']
+
+    def _build_indexes(self):
+        composers = self._snapshot['composers']
+        self._composers_by_letter = {}
+        self._composers_by_period = {}
+        for composer in composers.values():
+            self._composers_by_letter.setdefault(self._composer_key(composer, 'letter'), []).append(composer)
+            self._composers_by_period.setdefault(composer['epoch'], []).append(composer)
+
+        self._search = None
+        self._works_by_genre = {}
+        for composer_id, works in self._snapshot['works'].items():
+            index = {Genre.ALL.value: works}
+            for work in works:
+                index.setdefault(work['genre'], []).append(work)
+                if work.get('popular') == '1':
+                    index.setdefault(Genre.POPULAR.value, []).append(work)
+                if work.get('recommended') == '1':
+                    index.setdefault(Genre.ESSENTIAL.value, []).append(work)
+            self._works_by_genre[composer_id] = index
+
+    @property
+    def search(self):
+        if self._search is None:
+            self._search = CatalogSearch(self._snapshot['composers'].values(), self._snapshot['works'])
+        return self._search
+
+    def _open(self, mode, path=None):
+        path = path or self.path
+        if self.path.endswith('.gz'):
+            return gzip.open(path, mode, encoding='utf-8')
+        return open(path, mode, encoding='utf-8')
+
+    def _composers_for_ids(self, ids):
+        composers = self._snapshot['composers']
+        return [composers[composer_id] for composer_id in ids if composer_id in composers]
+
+    def list_popular_composers(self):
+        return self._composers_for_ids(self._snapshot['popular'])
+
+    def list_essential_composers(self):
+        return self._composers_for_ids(self._snapshot['essential'])
+
+    def list_composers_by_first_letter(self, letter):
+        return self._composers_by_letter.get(letter.upper(), [])
+
+    def list_composers_by_period(self, period):
+        return self._composers_by_period.get(period, [])
+
+    def search_composers_by_name(self, name):
+        return self.search.search_composers_by_name(name)
+
+    def list_composers_by_id(self, ids):
+        ids = [ids] if type(ids) == str else ids
+        return self._composers_for_ids(dict.fromkeys(str(composer_id) for composer_id in ids))
+
+    def list_genres_by_composer_id(self, composer_id):
+        return self._snapshot['genres'].get(str(composer_id), [])
+
+    def list_works_by_composer_id_and_genre(self, composer_id, genre):
+        if type(genre) == Genre:
+            genre = genre.value
+
+        return self._works_by_genre.get(str(composer_id), {}).get(genre, [])
+
+    def list_works_by_composer_id(self, composer_id):
+        return self.list_works_by_composer_id_and_genre(composer_id, Genre.ALL)
+
+    def list_popular_works_by_composer_id(self, composer_id):
+        return self.list_works_by_composer_id_and_genre(composer_id, Genre.POPULAR)
+
+    def list_essential_works_by_composer_id(self, composer_id):
+        return self.list_works_by_composer_id_and_genre(composer_id, Genre.ESSENTIAL)
+
+    def search_works_by_composer_id_title_and_genre(self, composer_id, title, genre):
+        return self.search.search_works_by_composer_id_title_and_genre(composer_id, title, genre)
+
+    def search_works_by_composer_id_and_title(self, composer_id, title):
+        return self.search_works_by_composer_id_title_and_genre(composer_id, title, Genre.ALL)
@@ -0,0 +1,198 @@
+import string
+
+from .cache import _MISSING
+from .client import Content, Genre, _escape_url, _urljoin
+from .text import _fold
+
+_work_text_fields = ['title', 'subtitle', 'searchterms']
+
+
+def _values(value):
+    # a single value or an iterable of them as a tuple of strings, or None for no restriction
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    return tuple(item.value if isinstance(item, Genre) else item for item in value)
+
+
+def _text_matches(item, fields, words):
+    text = _fold(' '.join(item.get(field) or '' for field in fields))
+    return all(word in text for word in words)
+
+
+class CatalogQuery:
+    """
+    Filters on composers and their works, each None for no restriction.
+
+    epochs and genres are a value or a list of values (e.g. 'Baroque', Genre.CHAMBER), popular and
+    recommended select works by flag when True or False, name matches composer names and title matches
+    work titles, subtitles and search terms, like the API searches: each word must occur, ignoring case
+    and accents.
+
+    """
+
+    def __init__(self, epochs=None, genres=None, popular=None, recommended=None, name=None, title=None):
+        self.epochs = _values(epochs)
+        self.genres = _values(genres)
+        self.popular = popular
+        self.recommended = recommended
+        self.name = name
+        self.title = title
+
+    def composer_calls(self):
+        """
+        Return the (method name, args) calls listing a superset of the matching composers: a name search,
+        one list per epoch, or else one list per first letter.
+        """
+        if self.name:
+            return [('search_composers_by_name', (self.name,))]
+        if self.epochs is not None:
+            return [('list_composers_by_period', (epoch,)) for epoch in self.epochs]
+        return [('list_composers_by_first_letter', (letter,)) for letter in string.ascii_uppercase]
+
+    def matches_composer(self, composer):
+        if self.epochs is not None and composer.get('epoch') not in self.epochs:
+            return False
+        return not self.name or _text_matches(composer, ['name', 'complete_name'], _fold(self.name).split())
+
+    def allows_genres(self, genres):
+        """Whether a composer with these genres (as listed by list_genres_by_composer_id) can have matching works"""
+        if self.genres is not None and not set(self.genres) & set(genres):
+            return False
+        if self.popular and Genre.POPULAR.value not in genres:
+            return False
+        return not self.recommended or Genre.ESSENTIAL.value in genres
+
+    def work_genre(self):
+        """Return the narrowest genre list holding every matching work"""
+        if self.genres is not None and len(self.genres) == 1:
+            return self.genres[0]
+        if self.popular:
+            return Genre.POPULAR.value
+        if self.recommended:
+            return Genre.ESSENTIAL.value
+        return Genre.ALL.value
+
+    def matches_work(self, work, searched=False):
+        """Whether work matches, where searched means the title was already matched by an API search"""
+        if self.genres is not None and work.get('genre') not in self.genres:
+            return False
+        for flag in ['popular', 'recommended']:
+            wanted = getattr(self, flag)
+            if wanted is not None and (work.get(flag) == '1') != wanted:
+                return False
+        return searched or not self.title or _text_matches(work, _work_text_fields, _fold(self.title).split())
+
+
+class QueryPlanner:
+    """
+    Answers a CatalogQuery with as few API calls as possible, streaming {'composer': composer, 'work': work}
+    records as each composer's works arrive.
+
+    Composers are listed through the narrowest listing (see CatalogQuery.composer_calls) and filtered. Each
+    remaining composer then costs at most one request for the narrowest work list or title search covering
+    the query, filtered locally, which is always fewer calls than looking up genres first. No request is made
+    at all when a cached genre list rules the composer out, or when that work list, the composer's full
+    work list or another cached superset of it is in the session cache. The remaining requests run
+    concurrently through map_as_completed.
+
+    source is an OpenOpys session or a CatalogMirror (queried sequentially, without cache lookups). After each
+    query, stats holds the number of 'composer_calls', 'work_calls', 'cached' and 'skipped' composers, and
+    errors maps composer ids to the exceptions of their failed work requests, whose works are left out.
+
+    """
+
+    def __init__(self, source, max_workers=None):
+        self.source = source
+        self.max_workers = max_workers
+        self.stats = {}
+        self.errors = {}
+
+    def select(self, **filters):
+        """Shorthand for run(CatalogQuery(**filters))"""
+        return self.run(CatalogQuery(**filters))
+
+    def run(self, query):
+        """Generate the joined records matching query, grouped by composer"""
+        self.stats = {'composer_calls': 0, 'work_calls': 0, 'cached': 0, 'skipped': 0}
+        self.errors = {}
+
+        composers = self._composers(query)
+        calls = {}
+        for composer_id, composer in composers.items():
+            works, searched = self._cached_works(composer_id, query)
+            if works is None:
+                calls[composer_id] = self._work_call(composer_id, query)
+            elif works:
+                yield from self._join(composer, works, query, searched)
+
+        for composer_id, works, error in self._map(lambda composer_id: calls[composer_id](), list(calls)):
+            if error is not None:
+                self.errors[composer_id] = error
+            else:
+                yield from self._join(composers[composer_id], works, query, bool(query.title))
+
+    def _map(self, func, keys):
+        map_as_completed = getattr(self.source, 'map_as_completed', None)
+        if map_as_completed is not None:
+            return map_as_completed(func, keys, max_workers=self.max_workers)
+        return ((key, func(key), None) for key in keys)
+
+    def _composers(self, query):
+        calls = query.composer_calls()
+        self.stats['composer_calls'] = len(calls)
+        listed = {}
+        for _, composers, error in self._map(lambda call: getattr(self.source, call[0])(*call[1]), calls):
+            if error is not None:
+                raise error
+            listed.update(
+                (str(composer.get('id')), composer) for composer in composers if query.matches_composer(composer))
+        return listed
+
+    def _cached(self, data_type, list_by, items):
+        cache_lookup = getattr(self.source, '_cache_lookup', None)
+        if cache_lookup is None:
+            return _MISSING
+        cached, _ = cache_lookup(_escape_url(self.source._list_url(data_type, list_by=list_by, items=items)))
+        return cached if cached is _MISSING else cached.get(data_type.value, [])
+
+    def _cached_works(self, composer_id, query):
+        """
+        Return (works, searched) from the cache, with [] if the composer's cached genres rule out any match,
+        or (None, False) if the works must be requested.
+        """
+        genres = self._cached(Content.GENRES, 'composer', [composer_id])
+        if genres is not _MISSING and not query.allows_genres(genres):
+            self.stats['skipped'] += 1
+            return [], False
+
+        genre = query.work_genre()
+        list_by = _urljoin('composer', composer_id, 'genre')
+        candidates = [(list_by, genre, False), (list_by, Genre.ALL.value, False)]
+        if query.title:
+            candidates.insert(0, (_urljoin(list_by, genre, 'search'), query.title, True))
+        if query.popular:
+            candidates.append((list_by, Genre.POPULAR.value, False))
+        if query.recommended:
+            candidates.append((list_by, Genre.ESSENTIAL.value, False))
+
+        for candidate_list_by, item, searched in candidates:
+            works = self._cached(Content.WORKS, candidate_list_by, [item])
+            if works is not _MISSING:
+                self.stats['cached'] += 1
+                return self.source._work_results(works), searched
+        return None, False
+
+    def _work_call(self, composer_id, query):
+        self.stats['work_calls'] += 1
+        genre = query.work_genre()
+        if query.title:
+            return lambda: self.source.search_works_by_composer_id_title_and_genre(composer_id, query.title, genre)
+        return lambda: self.source.list_works_by_composer_id_and_genre(composer_id, genre)
+
+    @staticmethod
+    def _join(composer, works, query, searched):
+        for work in works:
+            if query.matches_work(work, searched):
+                yield {'composer': composer, 'work': work}
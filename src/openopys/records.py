@@ -0,0 +1,193 @@
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from datetime import date
+
+
+def _parse_date(value):
+    # OpenOpus dates are 'YYYY-MM-DD'; keep anything else as given rather than losing it
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _format_date(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _format_int(value):
+    return None if value is None else str(value)
+
+
+def _identity(value):
+    return value
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Record(Mapping):
+    """
+    Base for compact __slots__ records with typed attributes and read-only dict-like access.
+
+    Attributes hold parsed values (e.g. composer.id == 87), while item access returns values as the
+    API sent them (e.g. composer['id'] == '87') so records can stand in for the original dicts.
+    Keys the record does not know about are kept in _extra.
+
+    """
+
+    __slots__ = ('_extra',)
+    _fields = {}
+
+    def __init__(self, **kwargs):
+        extra = {}
+        for key, value in kwargs.items():
+            if key in self._fields:
+                object.__setattr__(self, key, value)
+            else:
+                extra[key] = value
+
+        for key in self._fields:
+            if key not in kwargs:
+                object.__setattr__(self, key, None)
+        object.__setattr__(self, '_extra', extra or None)
+
+    @classmethod
+    def from_dict(cls, item):
+        return cls(**{key: cls._fields[key][0](value) if key in cls._fields else value for key, value in item.items()})
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return self._fields[key][1](getattr(self, key))
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._fields
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self._fields) + len(self._extra or ())
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} records are read-only")
+
+    def __repr__(self):
+        attributes = ', '.join(f'{key}={getattr(self, key)!r}' for key in self._fields)
+        return f'{type(self).__name__}({attributes})'
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class Composer(_Record):
+
+    __slots__ = ('id', 'name', 'complete_name', 'birth', 'death', 'epoch', 'portrait')
+    _fields = {
+        'id': (_parse_int, _format_int),
+        'name': (_identity, _identity),
+        'complete_name': (_identity, _identity),
+        'birth': (_parse_date, _format_date),
+        'death': (_parse_date, _format_date),
+        'epoch': (_intern, _identity),
+        'portrait': (_identity, _identity),
+    }
+
+
+class Work(_Record):
+
+    __slots__ = ('title', 'subtitle', 'searchterms', 'popular', 'recommended', 'id', 'genre')
+    _fields = {
+        'title': (_identity, _identity),
+        'subtitle': (_identity, _identity),
+        'searchterms': (_identity, _identity),
+        'popular': (lambda value: value == '1', lambda value: '1' if value else '0'),
+        'recommended': (lambda value: value == '1', lambda value: '1' if value else '0'),
+        'id': (_parse_int, _format_int),
+        'genre': (_intern, _identity),
+    }
+
+
+class WorkList(Sequence):
+    """
+    Columnar container for large work lists.
+
+    Ids, flags and genres are kept in typed arrays and text fields in plain lists, which takes a fraction
+    of the memory of one dict per work. Indexing builds Work records on demand, and column() returns a
+    whole field at once without building any records.
+
+    """
+
+    _text_fields = ('title', 'subtitle', 'searchterms')
+
+    def __init__(self, works=()):
+        self._text = {field: [] for field in self._text_fields}
+        self._ids = array('q')
+        self._popular = array('b')
+        self._recommended = array('b')
+        self._genre_codes = array('H')
+        self._genres = []
+        self._genre_index = {}
+        for work in works:
+            self.append(work)
+
+    def append(self, work):
+        record = work if isinstance(work, Work) else Work.from_dict(work)
+        for field in self._text_fields:
+            self._text[field].append(getattr(record, field))
+        self._ids.append(record.id)
+        self._popular.append(record.popular)
+        self._recommended.append(record.recommended)
+
+        genre_code = self._genre_index.get(record.genre)
+        if genre_code is None:
+            genre_code = self._genre_index[record.genre] = len(self._genres)
+            self._genres.append(record.genre)
+        self._genre_codes.append(genre_code)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return WorkList(self[position] for position in range(*index.indices(len(self))))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('WorkList index out of range')
+
+        return Work(
+            id=self._ids[index], popular=bool(self._popular[index]), recommended=bool(self._recommended[index]),
+            genre=self._genres[self._genre_codes[index]],
+            **{field: self._text[field][index] for field in self._text_fields})
+
+    def __repr__(self):
+        return f'WorkList({list(self)!r})'
+
+    def column(self, field):
+        """Return all values of field, e.g. column('id') for an array of work ids"""
+        if field in self._text:
+            return self._text[field]
+        if field == 'id':
+            return self._ids
+        if field == 'popular':
+            return [bool(flag) for flag in self._popular]
+        if field == 'recommended':
+            return [bool(flag) for flag in self._recommended]
+        if field == 'genre':
+            return [self._genres[code] for code in self._genre_codes]
+        raise KeyError(field)
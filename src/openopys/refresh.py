@@ -0,0 +1,44 @@
+import threading
+
+
+class CacheRefresher:
+    """
+    Daemon thread re-running hot queries of an OpenOpys session every interval seconds, bypassing the cache,
+    so their cached results are renewed before they expire and callers never wait on them.
+
+    queries are callables taking the session. Failed refreshes are counted in failures and otherwise
+    ignored, leaving the previous cached result in place.
+
+    """
+
+    def __init__(self, openopys, queries, interval):
+        self.openopys = openopys
+        self.queries = list(queries)
+        self.interval = interval
+        self.failures = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='openopys-refresh-ahead', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def refresh_now(self):
+        """Re-run every query once"""
+        for query in self.queries:
+            try:
+                with self.openopys.refreshing():
+                    query(self.openopys)
+            except Exception:
+                self.failures += 1
+
+    def _run(self):
+        # refresh right away, which also warms the cache for queries that were never run
+        while not self._stopped.is_set():
+            self.refresh_now()
+            self._stopped.wait(self.interval)
@@ -0,0 +1,124 @@
+from .client import Genre
+from .text import _tokenize
+
+
+class SearchIndex:
+    """
+    Prefix inverted index over records (dicts) with accent and case folding.
+
+    fields maps record keys to ranking weights. A record matches a query when every query word is a
+    prefix of some word in one of its fields. Matches are ranked by the summed weights of the fields that
+    matched each query word, with exact word matches and matches at the start of a field scoring higher.
+
+    """
+
+    def __init__(self, fields, max_prefix_length=12):
+        self.fields = dict(fields)
+        self.max_prefix_length = max_prefix_length
+        self._records = []
+        self._tokens = []
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        """Index record, returning its position in the index"""
+        position = len(self._records)
+        field_tokens = [(weight, _tokenize(record.get(field))) for field, weight in self.fields.items()]
+        self._records.append(record)
+        self._tokens.append(field_tokens)
+
+        for token in {token for _, tokens in field_tokens for token in tokens}:
+            for length in range(1, min(len(token), self.max_prefix_length) + 1):
+                self._postings.setdefault(token[:length], set()).add(position)
+
+        return position
+
+    def search(self, query, positions=None, limit=None):
+        """
+        Return records matching query, best matches first.
+
+        positions optionally restricts the search to a set of record positions (as returned by add).
+        An empty query matches every record, in insertion order.
+
+        """
+        words = _tokenize(query)
+        if not words:
+            candidates = range(len(self._records)) if positions is None else sorted(positions)
+            return [self._records[position] for position in candidates][:limit]
+
+        candidates = None if positions is None else set(positions)
+        for word in sorted(words, key=len, reverse=True):
+            postings = self._postings.get(word[:self.max_prefix_length], set())
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return []
+
+        ranked = []
+        for position in candidates:
+            score = self._score(words, self._tokens[position])
+            if score:
+                ranked.append((-score, position))
+
+        return [self._records[position] for _, position in sorted(ranked)][:limit]
+
+    def _score(self, words, field_tokens):
+        total = 0
+        for index, word in enumerate(words):
+            best = 0
+            for weight, tokens in field_tokens:
+                for token_index, token in enumerate(tokens):
+                    if not token.startswith(word):
+                        continue
+                    score = weight * (2 if token == word else 1)
+                    if token_index == index:
+                        score += weight
+                    best = max(best, score)
+            if not best:
+                return 0
+            total += best
+        return total
+
+
+class CatalogSearch:
+    """
+    Local search over composers and works, mirroring the OpenOpys search methods without any request.
+
+    composers is an iterable of composer dicts and works_by_composer_id maps composer ids to work lists,
+    e.g. the contents of a CatalogMirror snapshot.
+
+    """
+
+    composer_fields = {'name': 4, 'complete_name': 2}
+    work_fields = {'title': 4, 'searchterms': 2, 'subtitle': 1}
+
+    def __init__(self, composers, works_by_composer_id):
+        self.composers = SearchIndex(self.composer_fields)
+        for composer in composers:
+            self.composers.add(composer)
+
+        self.works = SearchIndex(self.work_fields)
+        self._works_by_composer_id = {}
+        for composer_id, works in works_by_composer_id.items():
+            self._works_by_composer_id[str(composer_id)] = {self.works.add(work) for work in works}
+
+    def search_composers_by_name(self, name, limit=None):
+        return self.composers.search(name, limit=limit)
+
+    def search_works_by_composer_id_title_and_genre(self, composer_id, title, genre, limit=None):
+        if type(genre) == Genre:
+            genre = genre.value
+
+        positions = self._works_by_composer_id.get(str(composer_id), set())
+        works = self.works.search(title, positions=positions)
+        if genre == Genre.POPULAR.value:
+            works = [work for work in works if work.get('popular') == '1']
+        elif genre == Genre.ESSENTIAL.value:
+            works = [work for work in works if work.get('recommended') == '1']
+        elif genre != Genre.ALL.value:
+            works = [work for work in works if work.get('genre') == genre]
+        return works[:limit]
+
+    def search_works_by_composer_id_and_title(self, composer_id, title, limit=None):
+        return self.search_works_by_composer_id_title_and_genre(composer_id, title, Genre.ALL, limit=limit)
@@ -0,0 +1,103 @@
+import codecs
+import json
+from json.decoder import JSONDecodeError
+
+
+_whitespace = ' \t\n\r'
+_delimiters = ',]}' + _whitespace
+
+
+class _Buffer:
+    """
+    Text buffer over an iterable of byte chunks, decoded incrementally and trimmed as values are consumed.
+    """
+
+    def __init__(self, chunks, encoding='utf-8'):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = ''
+        self.position = 0
+        self.exhausted = False
+
+    def read_more(self):
+        # drop everything already consumed, so only the value being parsed is kept in memory
+        self.text = self.text[self.position:]
+        self.position = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._decoder.decode(chunk)
+                return True
+
+        if not self.exhausted:
+            self.text += self._decoder.decode(b'', final=True)
+            self.exhausted = True
+            return True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it, or '' at the end of input"""
+        while True:
+            while self.position < len(self.text) and self.text[self.position] in _whitespace:
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.read_more():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise JSONDecodeError(f"Expecting '{char}'", self.text, self.position)
+        self.position += 1
+
+    def decode_value(self, decoder):
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.position)
+            except JSONDecodeError:
+                if self.read_more():
+                    continue
+                raise
+
+            # a number is only complete once a delimiter follows it, since it may continue in the next chunk
+            if isinstance(value, (int, float)) and not self.exhausted and (
+                    end == len(self.text) or self.text[end] not in _delimiters):
+                self.read_more()
+                continue
+
+            self.position = end
+            return value
+
+
+def iter_json_array(chunks, key, encoding='utf-8'):
+    """
+    Incrementally parse a JSON object from byte chunks, yielding the items of its top-level array at key.
+
+    Only one item is held in memory at a time. Yields nothing if the object has no such key.
+    Raises JSONDecodeError if the content is not valid JSON.
+
+    """
+    decoder = json.JSONDecoder()
+    buffer = _Buffer(chunks, encoding)
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        return
+
+    while True:
+        name = buffer.decode_value(decoder)
+        buffer.expect(':')
+        if name == key and buffer.peek() == '[':
+            buffer.expect('[')
+            if buffer.peek() == ']':
+                return
+
+            while True:
+                yield buffer.decode_value(decoder)
+                if buffer.peek() == ']':
+                    return
+                buffer.expect(',')
+
+        buffer.decode_value(decoder)
+        if buffer.peek() == '}':
+            return
+        buffer.expect(',')
@@ -0,0 +1,15 @@
+import re
+import unicodedata
+
+
+_token_pattern = re.compile(r'\w+')
+
+
+def _fold(text):
+    """Lowercase text and strip accents, so 'Dvořák' and 'dvorak' compare equal"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def _tokenize(text):
+    return _token_pattern.findall(_fold(text))
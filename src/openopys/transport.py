@@ -0,0 +1,126 @@
+import random
+import socket
+import time
+from email.utils import parsedate_to_datetime
+from threading import Lock
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+from urllib3.connection import HTTPConnection
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing rate requests per second on average, in bursts of up to capacity.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next seconds, e.g. after the server asked to slow down"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(response):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with client-side rate limiting, retries and a configurable connection pool.
+
+    Requests are limited to rate per second (in bursts of up to burst) by a token bucket shared by all
+    threads using the adapter; rate=None disables the limit. Idempotent requests failing with a connection
+    error, a timeout or one of retry_statuses are retried up to max_retries times with exponential backoff
+    and full jitter, capped at max_backoff seconds. A Retry-After header on the response takes precedence,
+    and on 429 the whole bucket pauses so other threads back off too; a response asking to wait more than
+    max_retry_after seconds is returned as is instead of blocking the caller (and the bucket) that long.
+
+    pool_maxsize should be at least the number of threads sharing the session. keepalive enables TCP
+    keep-alive probes on pooled connections so idle ones are not silently dropped.
+
+    """
+
+    retry_statuses = frozenset([429, 500, 502, 503, 504])
+    retry_methods = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+    def __init__(self, rate=None, burst=None, max_retries=3, backoff_factor=0.5, max_backoff=30,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, keepalive=True, max_retry_after=60):
+        self.bucket = None if rate is None else TokenBucket(rate, burst)
+        self.retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.keepalive = keepalive
+        HTTPAdapter.__init__(
+            self, pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keepalive:
+            kwargs.setdefault(
+                'socket_options', HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)])
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+
+    def send(self, request, **kwargs):
+        retries = self.retries if request.method in self.retry_methods else 0
+        for attempt in range(retries + 1):
+            if self.bucket is not None:
+                self.bucket.acquire()
+
+            try:
+                response = self._send(request, **kwargs)
+            except (ConnectionError, Timeout):
+                if attempt == retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in self.retry_statuses or attempt == retries:
+                return response
+
+            retry_after = _retry_after(response)
+            if retry_after is not None and retry_after > self.max_retry_after:
+                return response
+            if response.status_code == 429 and self.bucket is not None:
+                self.bucket.pause(self._backoff(attempt) if retry_after is None else retry_after)
+            response.close()
+            time.sleep(self._backoff(attempt) if retry_after is None else retry_after)
+
+    def _send(self, request, **kwargs):
+        return HTTPAdapter.send(self, request, **kwargs)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+from collections import OrderedDict
+
+from .cache import _MISSING
+from .client import Genre
+from .text import _fold
+
+
+def _normalize(query):
+    return ' '.join(_fold(query).split())
+
+
+def prefix_matcher(field):
+    """Match items whose field starts with the query, like the API's composer name search"""
+    return lambda item, query: _fold(item.get(field)).startswith(query)
+
+
+def words_matcher(*fields):
+    """Match items where each query word occurs in one of fields, like the API's work title search"""
+    def matches(item, query):
+        text = _fold(' '.join(item.get(field) or '' for field in fields))
+        return all(word in text for word in query.split())
+
+    return matches
+
+
+class Typeahead:
+    """
+    Autocomplete session answering growing queries from the results of shorter ones.
+
+    Each fetched result set is remembered (up to max_entries, least recently used dropped first), and a
+    query is answered by filtering the results of its longest remembered prefix with matches(item, query),
+    where query is lowercased, without accents and with single spaces. Only queries without such a prefix
+    are sent through fetch. matches must reproduce how the searched endpoint selects results, so that a
+    longer query never matches an item the endpoint would not return; see prefix_matcher and words_matcher.
+
+    fetch takes the query and returns its results, or an awaitable of them for asearch(), typically through
+    a search method of an OpenOpys or AsyncOpenOpys session; see composers() and works(). Queries shorter
+    than min_length return no results.
+
+    As-you-type input should go through submit() with an OpenOpys session or asearch() with an
+    AsyncOpenOpys session, which wait debounce seconds for typing to pause and drop superseded queries.
+
+    """
+
+    def __init__(self, fetch, matches, min_length=1, max_entries=256, debounce=0.15):
+        self.fetch = fetch
+        self.matches = matches
+        self.min_length = min_length
+        self.max_entries = max_entries
+        self.debounce = debounce
+        self.requests = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._timer = None
+        self._task = None
+
+    @classmethod
+    def composers(cls, openopys, **kwargs):
+        """Typeahead over search_composers_by_name, which matches names starting with the query"""
+        return cls(openopys.search_composers_by_name, prefix_matcher('name'), **kwargs)
+
+    @classmethod
+    def works(cls, openopys, composer_id, genre=Genre.ALL, **kwargs):
+        """Typeahead over the titles of a composer's works in genre"""
+        return cls(
+            lambda title: openopys.search_works_by_composer_id_title_and_genre(composer_id, title, genre),
+            words_matcher('title', 'subtitle', 'searchterms'), **kwargs)
+
+    def lookup(self, query):
+        """Return the results for query from remembered result sets, or None if they would need a request"""
+        key = _normalize(query)
+        if len(key) < self.min_length:
+            return []
+
+        with self._lock:
+            for length in range(len(key), 0, -1):
+                results = self._results.get(key[:length], _MISSING)
+                if results is not _MISSING:
+                    self._results.move_to_end(key[:length])
+                    break
+            else:
+                return None
+
+        if length == len(key):
+            return results
+
+        return [item for item in results if self.matches(item, key)]
+
+    def search(self, query):
+        """Return the results for query, fetching them if no remembered prefix covers it"""
+        results = self.lookup(query)
+        if results is None:
+            self.requests += 1
+            results = self._remember(query, self.fetch(query))
+        return results
+
+    async def asearch(self, query):
+        """
+        Coroutine returning the results for query after the debounce delay, for fetch returning awaitables.
+
+        A newer asearch() call cancels this one, which then raises asyncio.CancelledError, including while
+        its request is in flight.
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = asyncio.ensure_future(self._asearch(query))
+        return await self._task
+
+    async def _asearch(self, query):
+        results = self.lookup(query)
+        if results is not None:
+            return results
+
+        await asyncio.sleep(self.debounce)
+        self.requests += 1
+        return self._remember(query, await self.fetch(query))
+
+    def submit(self, query, callback):
+        """
+        Look up query debounce seconds from now, unless another query is submitted first, then call
+        callback(query, results, error) from a background thread.
+
+        Results of a query superseded while its request is in flight are remembered, but not passed to callback.
+        Queries answered from remembered results skip the delay and call back right away.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._timer is not None:
+                self._timer.cancel()
+
+        results = self.lookup(query)
+        if results is not None:
+            callback(query, results, None)
+            return
+
+        def run():
+            try:
+                results, error = self.search(query), None
+            except Exception as search_error:
+                results, error = None, search_error
+            if generation == self._generation:
+                callback(query, results, error)
+
+        with self._lock:
+            self._timer = threading.Timer(self.debounce, run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def _remember(self, query, results):
+        key = _normalize(query)
+        with self._lock:
+            self._results[key] = results
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return results
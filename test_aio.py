@@ -0,0 +1,107 @@
+import asyncio
+import json
+from urllib.parse import unquote
+
+import pytest
+import requests
+
+from conftest import mount
+from src.openopys import AsyncOpenOpys, Genre, MemoryCache, OpenOpys, ResponseContentTypeError
+
+httpx = pytest.importorskip('httpx')
+
+
+def _async_openopys(fake_api, **kwargs):
+    async def handler(request):
+        fake_api.requests.append(request)
+        await asyncio.sleep(0)
+        path = '/'.join(filter(None, unquote(request.url.path).split('/')))
+        return httpx.Response(
+            200, headers={'content-type': fake_api.content_type},
+            content=json.dumps(fake_api.payloads.get(path, {})).encode('utf-8'))
+
+    return AsyncOpenOpys(transport=httpx.MockTransport(handler), **kwargs)
+
+
+def _run(fake_api, query, **kwargs):
+    async def main():
+        async with _async_openopys(fake_api, **kwargs) as openopys:
+            return await query(openopys)
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('method, args', [
+    ('list_popular_composers', ()),
+    ('list_works_by_composer_id', ('178',)),
+    ('list_works_by_composer_id_and_genre', ('178', Genre.STAGE)),
+    ('list_genres_by_composer_id', ('178',)),
+    ('list_composers_by_id', (['178', '10', '178'],)),
+])
+def test_async_queries(fake_api, method, args):
+    fake_api.payloads.update({
+        'work/list/composer/178/genre/Stage.json': {'works': [{'title': 'Dardanus', 'id': '1', 'genre': 'Stage'}]},
+        'composer/list/ids/178,10.json': {
+            'composers': [{'id': '10', 'name': 'Chopin'}, {'id': '178', 'name': 'Rameau'}]},
+    })
+    expected = getattr(mount(OpenOpys(), fake_api), method)(*args)
+    sync_urls = [request.url for request in fake_api.requests]
+    fake_api.requests.clear()
+
+    assert expected
+    assert _run(fake_api, lambda opys: getattr(opys, method)(*args)) == expected
+    assert [str(request.url) for request in fake_api.requests] == sync_urls
+
+
+def test_async_urls_match_sync(fake_api):
+    _run(fake_api, lambda opys: opys.search_works_by_composer_id_title_and_genre('178', 'Dard', Genre.STAGE))
+    assert str(fake_api.requests[0].url) == 'https://api.openopus.org/work/list/composer/178/genre/Stage/search/Dard.json'
+
+
+def test_async_concurrency_and_cache(fake_api):
+    async def query(openopys):
+        return await asyncio.gather(*[openopys.list_essential_composers() for _ in range(5)])
+
+    results = _run(fake_api, query, cache=MemoryCache(), max_concurrency=1)
+    assert len(results) == 5
+    assert len(fake_api.requests) == 1
+
+
+def test_async_content_type_error(fake_api, capsys):
+    fake_api.content_type = 'text/html'
+    with pytest.raises(ResponseContentTypeError):
+        _run(fake_api, lambda opys: opys.list_popular_composers())
+    assert capsys.readouterr().out == ''
+
+
+def test_async_concurrent_calls_coalesce(fake_api):
+    async def query(openopys):
+        results = await asyncio.gather(*[openopys.list_essential_composers() for _ in range(5)])
+        return results, openopys.coalesced_requests
+
+    results, coalesced = _run(fake_api, query)
+    assert len(fake_api.requests) == 1 and coalesced == 4
+    assert all(result == results[0] for result in results)
+
+
+def test_async_derived_work_lists(fake_api):
+    async def query(openopys):
+        return (await openopys.list_popular_works_by_composer_id('178'),
+                await openopys.search_works_by_composer_id_and_title('178', 'aricie'))
+
+    popular, found = _run(fake_api, query, cache=MemoryCache(), derive_work_lists=True)
+    assert [work['id'] for work in popular] == ['1']
+    assert [work['id'] for work in found] == ['2']
+    assert len(fake_api.requests) == 1
+
+
+def test_async_decode_errors_are_requests_errors():
+    async def handler(request):
+        return httpx.Response(200, headers={'content-type': 'application/json'}, content=b'{"composers": [')
+
+    async def main():
+        async with AsyncOpenOpys(transport=httpx.MockTransport(handler)) as openopys:
+            return await openopys.list_popular_composers()
+
+    with pytest.raises(requests.exceptions.JSONDecodeError):
+        asyncio.run(main())
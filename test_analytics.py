@@ -0,0 +1,51 @@
+import math
+
+import pytest
+
+from conftest import catalog_composers, catalog_works, mount
+from src.openopys import CatalogAnalytics, OpenOpys
+
+numpy = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def analytics():
+    listed = catalog_composers['A'] + catalog_composers['B'] + [
+        {'id': '2', 'name': 'Anonymous', 'birth': None, 'death': '', 'epoch': 'Baroque'}]
+    return CatalogAnalytics.from_results(listed, dict(catalog_works, unknown=[{'id': '99', 'genre': 'Stage'}]))
+
+
+def test_arrays(analytics):
+    assert analytics.births.dtype == numpy.dtype('datetime64[D]')
+    assert numpy.isnat(analytics.births[2])
+    assert analytics.popular.dtype == numpy.bool_
+    assert list(analytics.work_ids) == [10, 20, 21]
+    assert list(analytics.composer_ids[analytics.work_composers]) == [1, 87, 87]
+
+
+def test_lifespans(analytics):
+    lifespans = analytics.lifespans()
+    assert round(lifespans[0]) == 49 and round(lifespans[1]) == 65 and math.isnan(lifespans[2])
+    assert {epoch: round(years) for epoch, years in analytics.lifespan_by('epoch').items()} == {
+        'Baroque': 65, 'Romantic': 49}
+    assert analytics.composers_by('epoch') == {'Baroque': 2, 'Romantic': 1}
+
+
+def test_work_aggregates(analytics):
+    assert analytics.works_by('genre') == {'Keyboard': 2, 'Vocal': 1}
+    assert analytics.works_by('composer') == {1: 1, 87: 2, 2: 0}
+    assert analytics.works_by('epoch') == {'Baroque': 2, 'Romantic': 1}
+    assert analytics.flag_ratio_by('popular', 'genre') == {'Keyboard': 0.5, 'Vocal': 1.0}
+    assert analytics.flag_ratio_by('recommended', 'composer')[87] == 0.5
+    assert analytics.works_per_composer_and_genre().tolist() == [[1, 0], [1, 1], [0, 0]]
+    with pytest.raises(ValueError):
+        analytics.works_by('title')
+
+
+def test_from_source(catalog_api):
+    analytics = CatalogAnalytics.from_source(mount(OpenOpys(), catalog_api))
+
+    assert list(analytics.composer_ids) == [1, 87]
+    assert analytics.works_by('composer') == {1: 1, 87: 2}
+    assert analytics.flag_ratio_by('recommended', 'epoch') == {'Romantic': 1.0, 'Baroque': 0.5}
+    assert analytics.deaths[1] == numpy.datetime64('1750-01-01')
@@ -0,0 +1,24 @@
+from benchmarks.fake_openopus import FakeOpenOpusServer, build_fixtures
+from benchmarks.run_benchmarks import compare, run
+from src.openopys import OpenOpys
+
+
+def test_fake_server_serves_fixtures():
+    fixtures = build_fixtures(num_composers=5, max_works=20)
+    with FakeOpenOpusServer(fixtures) as server:
+        openopys = OpenOpys(api_url=server.url)
+        assert openopys.list_popular_composers() == fixtures['composer/list/pop.json']['composers']
+        assert [composer['id'] for composer in openopys.list_composers_by_id(['2', '1'])] == ['2', '1']
+        assert len(openopys.list_works_by_composer_id('5')) == 20
+
+
+def test_run_and_compare():
+    results = run(build_fixtures(num_composers=5, max_works=20), calls=3, threads=2,
+                  queries=['list_popular_composers', 'list_works_by_composer_ids'])
+    assert {(result['name'], result['mode'], result['cache']) for result in results} == {
+        ('list_popular_composers', 'serial', 'cold'), ('list_popular_composers', 'serial', 'warm'),
+        ('list_popular_composers', 'threaded', 'cold'), ('list_popular_composers', 'threaded', 'warm'),
+        ('list_works_by_composer_ids', 'bulk', 'cold'), ('list_works_by_composer_ids', 'bulk', 'warm'),
+    }
+    assert all(result['p99_ms'] >= result['p50_ms'] for result in results)
+    assert len(compare({'results': results}, {'results': results})) == len(results)
@@ -0,0 +1,146 @@
+import json
+import time
+from urllib.parse import unquote
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import BulkResult, Genre, MemoryCache, OpenOpys
+
+
+class FailingAdapter(FakeOpenOpusAdapter):
+
+    def send(self, request, **kwargs):
+        response = FakeOpenOpusAdapter.send(self, request, **kwargs)
+        if '/-1' in request.url:
+            raise ConnectionError('connection reset')
+        return response
+
+
+@pytest.fixture
+def failing_api(fake_api):
+    return FailingAdapter(fake_api.payloads)
+
+
+def test_list_works_by_composer_ids(failing_api):
+    openopys = mount(OpenOpys(), failing_api)
+    result = openopys.list_works_by_composer_ids(['178', '10', '178', '-1'])
+
+    assert isinstance(result, BulkResult)
+    assert sorted(result) == ['10', '178']
+    assert len(result['178']) == 2 and result['10'] == []
+    assert list(result.errors) == ['-1'] and isinstance(result.errors['-1'], ConnectionError)
+    assert len(failing_api.requests) == 3
+
+
+@pytest.mark.parametrize('genre, expected_path', [
+    (Genre.ALL, '/work/list/composer/178/genre/all.json'),
+    (Genre.STAGE, '/work/list/composer/178/genre/Stage.json'),
+])
+def test_list_works_by_composer_ids_genre(fake_api, genre, expected_path):
+    mount(OpenOpys(), fake_api).list_works_by_composer_ids(['178'], genre=genre)
+    assert fake_api.requests[0].path_url == expected_path
+
+
+def test_list_genres_by_composer_ids(failing_api):
+    result = mount(OpenOpys(), failing_api).list_genres_by_composer_ids(['178', '-1'], max_workers=1)
+    assert result == {'178': ['Popular', 'Recommended', 'Stage']}
+    assert list(result.errors) == ['-1']
+
+
+def test_map_as_completed_streams_results(fake_api):
+    openopys = mount(OpenOpys(max_workers=2), fake_api)
+    streamed = list(openopys.map_as_completed(openopys.list_genres_by_composer_id, ['178', '10']))
+
+    assert sorted(streamed) == [('10', [], None), ('178', ['Popular', 'Recommended', 'Stage'], None)]
+    assert list(openopys.map_as_completed(openopys.list_genres_by_composer_id, [])) == []
+
+
+def test_map_as_completed_window():
+    started = []
+    results = OpenOpys(max_workers=2).map_as_completed(lambda key: started.append(key) or key, range(10), window=3)
+
+    for streamed, (key, result, error) in enumerate(results, 1):
+        time.sleep(0.01)
+        # calls started but not yet consumed never exceed the window
+        assert len(started) - streamed <= 3 and result == key and error is None
+    assert sorted(started) == list(range(10))
+
+
+class ComposersByIdAdapter(FakeOpenOpusAdapter):
+
+    def send(self, request, **kwargs):
+        response = FakeOpenOpusAdapter.send(self, request, **kwargs)
+        ids = unquote(request.path_url).split('/ids/')[-1][:-len('.json')].split(',')
+        # answer in reverse order to check results follow the order of the requested ids
+        composers = [{'id': composer_id, 'name': f'Composer {composer_id}'} for composer_id in reversed(ids)
+                     if not composer_id.startswith('-')]
+        response._content = json.dumps({'composers': composers}).encode('utf-8')
+        return response
+
+
+@pytest.mark.parametrize('max_url_length, expected_requests', [
+    (2000, 1),
+    (60, 4),
+])
+def test_list_composers_by_id_chunks(max_url_length, expected_requests):
+    adapter = ComposersByIdAdapter()
+    openopys = mount(OpenOpys(), adapter)
+    openopys.max_url_length = max_url_length
+    ids = ['178', '10', '-1', '204', '10', '5', '87', '145', '80']
+
+    result = openopys.list_composers_by_id(ids)
+
+    assert [composer['id'] for composer in result] == ['178', '10', '204', '5', '87', '145', '80']
+    assert len(adapter.requests) == expected_requests
+    assert all(len(request.url) <= max_url_length for request in adapter.requests)
+
+
+def test_list_composers_by_id_skips_cached_ids():
+    adapter = ComposersByIdAdapter()
+    openopys = mount(OpenOpys(cache=MemoryCache()), adapter)
+    openopys.list_composers_by_id(['178', '10', '-1'])
+
+    result = openopys.list_composers_by_id(['10', '204', '-1', '178'])
+
+    assert [composer['id'] for composer in result] == ['10', '204', '178']
+    assert adapter.requests[-1].path_url == '/composer/list/ids/204.json'
+    assert openopys.list_composers_by_id('178') == [{'id': '178', 'name': 'Composer 178'}]
+    assert len(adapter.requests) == 2
+
+
+@pytest.fixture
+def details_api():
+    rameau = {'id': '178', 'name': 'Rameau', 'epoch': 'Baroque'}
+    return FailingAdapter({
+        'work/detail/1.json': {'composer': dict(rameau), 'work': {'id': '1', 'title': 'Dardanus', 'genre': 'Stage'}},
+        'work/detail/2.json': {'composer': dict(rameau), 'work': {'id': '2', 'title': 'Hippolyte et Aricie'}},
+    })
+
+
+def test_get_work_details(details_api):
+    openopys = mount(OpenOpys(), details_api)
+
+    assert openopys.get_work_details(1) == {
+        'composer': {'id': '178', 'name': 'Rameau', 'epoch': 'Baroque'},
+        'work': {'id': '1', 'title': 'Dardanus', 'genre': 'Stage'},
+    }
+    assert openopys.get_work_details('3') == {'composer': None, 'work': None}
+    assert details_api.requests[0].url.endswith('/work/detail/1.json')
+
+
+def test_get_work_details_by_ids(details_api):
+    cache = MemoryCache()
+    openopys = mount(OpenOpys(cache=cache), details_api)
+    result = openopys.get_work_details_by_ids([1, '2', '1', '-1'])
+
+    assert sorted(result) == ['1', '2']
+    assert result['1']['work']['title'] == 'Dardanus' and result['2']['work']['title'] == 'Hippolyte et Aricie'
+    assert result['1']['composer'] is result['2']['composer']
+    assert list(result.errors) == ['-1']
+    assert len(details_api.requests) == 3
+
+    # the composer was cached once under its own url, so listing it needs no request
+    assert openopys.list_composers_by_id(['178']) == [result['1']['composer']]
+    assert len(details_api.requests) == 3
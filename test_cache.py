@@ -0,0 +1,147 @@
+import time
+
+import pytest
+
+from conftest import mount
+from src.openopys import MemoryCache, OpenOpys, SqliteCache
+
+
+def test_repeat_lookups_skip_network(fake_api):
+    openopys = mount(OpenOpys(cache=MemoryCache()), fake_api)
+
+    first = openopys.list_popular_composers()
+    second = openopys.list_popular_composers()
+
+    assert first == second == [{'id': '87', 'name': 'Bach', 'epoch': 'Baroque'}]
+    assert len(fake_api.requests) == 1
+
+
+def test_no_cache_by_default(fake_api):
+    openopys = mount(OpenOpys(), fake_api)
+    openopys.list_popular_composers()
+    openopys.list_popular_composers()
+    assert len(fake_api.requests) == 2
+
+
+def test_invalidate_and_clear(fake_api):
+    openopys = mount(OpenOpys(cache=MemoryCache()), fake_api)
+    openopys.list_popular_composers()
+    openopys.list_essential_composers()
+
+    assert openopys.invalidate(openopys.api_url + '/composer/list//pop.json')
+    assert not openopys.invalidate(openopys.api_url + '/composer/list//pop.json')
+    openopys.list_popular_composers()
+    openopys.list_essential_composers()
+    assert len(fake_api.requests) == 3
+
+    openopys.cache.clear()
+    assert len(openopys.cache) == 0 and openopys.cache.size == 0
+    openopys.list_essential_composers()
+    assert len(fake_api.requests) == 4
+
+
+@pytest.mark.parametrize('endpoint, expected_ttl', [
+    ('composer/list/pop.json', 60),
+    ('composer/list/name/a.json', 600),
+    ('work/list/composer/178/genre/all.json', 86400),
+    ('genre/list/composer/178.json', 1),
+])
+def test_ttl_for_longest_prefix(endpoint, expected_ttl):
+    cache = MemoryCache(default_ttl=1, ttls={'composer': 600, 'composer/list/pop': 60, 'work': 86400})
+    assert cache.ttl_for(endpoint) == expected_ttl
+
+
+def test_entries_expire():
+    cache = MemoryCache(default_ttl=0.01)
+    cache.set('a', [1], size=1)
+    assert cache.get('a') == [1]
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('max_entries, max_bytes, expected_keys', [
+    (2, 100, ['a', 'c']),
+    (10, 25, ['a', 'c']),
+    (10, 5, []),
+])
+def test_lru_eviction(max_entries, max_bytes, expected_keys):
+    cache = MemoryCache(max_entries=max_entries, max_bytes=max_bytes)
+    cache.set('a', 'a', size=10)
+    cache.set('b', 'b', size=10)
+    cache.get('a')
+    cache.set('c', 'c', size=10)
+
+    assert [key for key in ['a', 'b', 'c'] if key in cache] == expected_keys
+
+
+def test_sqlite_cache_survives_restart(tmp_path, fake_api):
+    path = tmp_path / 'cache.sqlite'
+    mount(OpenOpys(cache=SqliteCache(path)), fake_api).list_popular_composers()
+
+    restarted = mount(OpenOpys(cache=SqliteCache(path)), fake_api)
+    assert restarted.list_popular_composers() == [{'id': '87', 'name': 'Bach', 'epoch': 'Baroque'}]
+    assert len(fake_api.requests) == 1
+
+
+def test_sqlite_cache_bounded_by_entries(tmp_path):
+    cache = SqliteCache(tmp_path / 'cache.sqlite', max_entries=2, ttls={'short': 1})
+    cache.set('a', 1, endpoint='short')
+    cache.set('b', 2)
+    cache.set('c', 3)
+
+    assert len(cache) == 2
+    assert 'a' not in cache and cache.get('c') == 3
+    assert cache.invalidate('c') and not cache.invalidate('c')
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_evicts_excess_closest_to_expiry(tmp_path):
+    cache = SqliteCache(tmp_path / 'cache.sqlite', max_entries=200, default_ttl=None, ttls={'short': 60, 'long': 600})
+    cache.set('forever', 0)
+    for number in range(100):
+        cache.set(f'long{number}', number, endpoint='long')
+    for number in range(101):
+        cache.set(f'short{number}', number, endpoint='short')
+
+    assert len(cache) == 200
+    assert 'short1' not in cache and 'short2' in cache and 'forever' in cache
+    with cache._connection() as connection:
+        plan = connection.execute(
+            'EXPLAIN QUERY PLAN SELECT key FROM responses WHERE expires_at IS NOT NULL ORDER BY expires_at').fetchall()
+    assert 'responses_expires_at' in str(plan)
+
+
+@pytest.mark.parametrize('server_etag', ['"v1"', '"v2"'])
+def test_sqlite_cache_revalidates_expired_entries(tmp_path, fake_api, server_etag):
+    cache = SqliteCache(tmp_path / 'cache.sqlite', default_ttl=-1)
+    fake_api.etag = '"v1"'
+    openopys = mount(OpenOpys(cache=cache), fake_api)
+    openopys.list_popular_composers()
+
+    fake_api.etag = server_etag
+    assert openopys.list_popular_composers() == [{'id': '87', 'name': 'Bach', 'epoch': 'Baroque'}]
+    assert len(fake_api.requests) == 2
+    assert fake_api.requests[-1].headers['If-None-Match'] == '"v1"'
+
+
+@pytest.mark.parametrize('cache_type', ['memory', 'sqlite'])
+def test_compressed_entries(tmp_path, fake_api, cache_type):
+    if cache_type == 'memory':
+        cache = MemoryCache(compress=True)
+    else:
+        cache = SqliteCache(tmp_path / 'cache.sqlite', compress=True)
+    openopys = mount(OpenOpys(cache=cache), fake_api)
+
+    works = openopys.list_works_by_composer_id('178')
+    assert openopys.list_works_by_composer_id('178') == works
+    assert len(fake_api.requests) == 1
+
+    cache.set('large', {'works': [{'title': 'Dardanus', 'genre': 'Stage'}] * 1000})
+    assert cache.get('large')['works'][999] == {'title': 'Dardanus', 'genre': 'Stage'}
+    assert cache.get_with_expiry('large')[0]['works'][0]['title'] == 'Dardanus'
+    if cache_type == 'memory':
+        assert cache.size < 2000
+    else:
+        assert SqliteCache(tmp_path / 'cache.sqlite').get('large') == cache.get('large')
@@ -0,0 +1,112 @@
+import gzip
+import time
+
+import pytest
+
+from benchmarks.fake_openopus import FakeOpenOpusServer, build_fixtures
+from src.openopys import Cassette, CassetteAdapter, CassetteMissError, MemoryCache, OpenOpys, SqliteCache
+
+
+@pytest.fixture(scope='module')
+def fixtures():
+    return build_fixtures(num_composers=5, max_works=50)
+
+
+def _queries(openopys):
+    return [openopys.list_popular_composers(), openopys.list_works_by_composer_id('5'),
+            openopys.list_genres_by_composer_id('3')]
+
+
+@pytest.mark.parametrize('name', ['cassette.jsonl', 'cassette.jsonl.gz'])
+def test_record_and_replay(tmp_path, fixtures, name):
+    path = tmp_path / name
+    with FakeOpenOpusServer(fixtures, compress=True) as server:
+        adapter = CassetteAdapter(path, mode='record')
+        recorded = _queries(OpenOpys(api_url=server.url, adapter=adapter))
+        adapter.close()
+        assert server.requests == 3
+
+    assert len(Cassette(path)) == 3
+    openopys = OpenOpys(api_url=server.url, adapter=CassetteAdapter(path))
+    assert _queries(openopys) == recorded
+    assert openopys.list_works_by_composer_id('5') == recorded[1]
+
+    with pytest.raises(CassetteMissError):
+        openopys.list_essential_composers()
+
+
+def test_once_records_misses(tmp_path, fixtures):
+    path = tmp_path / 'cassette.jsonl'
+    with FakeOpenOpusServer(fixtures) as server:
+        openopys = OpenOpys(api_url=server.url, adapter=CassetteAdapter(path, mode='once'))
+        popular = openopys.list_popular_composers()
+        assert openopys.list_popular_composers() == popular
+        openopys.list_essential_composers()
+        assert server.requests == 2
+
+    replayed = OpenOpys(api_url=server.url, adapter=CassetteAdapter(path))
+    assert replayed.list_popular_composers() == popular
+    assert len(replayed.list_essential_composers()) == 1
+
+
+def test_replay_revalidates_with_sqlite_cache(tmp_path, fixtures):
+    path = tmp_path / 'cassette.jsonl'
+    with FakeOpenOpusServer(fixtures) as server:
+        url = server.url
+        OpenOpys(api_url=url, adapter=CassetteAdapter(path, mode='record')).list_popular_composers()
+
+    cache = SqliteCache(tmp_path / 'cache.sqlite')
+    openopys = OpenOpys(api_url=url, cache=cache, adapter=CassetteAdapter(path))
+    assert openopys.list_popular_composers() == fixtures['composer/list/pop.json']['composers']
+
+
+def test_latency_and_jitter(tmp_path):
+    cassette = Cassette(tmp_path / 'cassette.jsonl')
+    url = 'https://api.openopus.org/composer/list/pop.json'
+    cassette.record('GET', url, 200, {'content-type': 'application/json', 'content-length': '16'}, b'{"composers":[]}')
+
+    openopys = OpenOpys(cache=MemoryCache(), adapter=CassetteAdapter(cassette, latency=0.02, jitter=0.01, seed=1))
+    started = time.perf_counter()
+    assert openopys.get_json(url) == {'composers': []}
+    assert 0.02 <= time.perf_counter() - started < 1
+    assert cassette.get('GET', url)[1] == {'content-type': 'application/json'}
+
+
+def test_interrupted_recording(tmp_path):
+    path = tmp_path / 'cassette.jsonl'
+    cassette = Cassette(path)
+    cassette.record('GET', 'https://api.openopus.org/a.json', 200, {}, b'{}')
+    cassette.record('GET', 'https://api.openopus.org/b.json', 200, {}, 'déjà \xff'.encode('latin-1'))
+    cassette.close()
+    with open(path, 'ab') as cassette_file:
+        cassette_file.write(b'{"method": "GET", "url": "https://api.openop')
+
+    loaded = Cassette(path)
+    assert len(loaded) == 2
+    assert loaded.get('GET', 'https://api.openopus.org/b.json')[2] == 'déjà \xff'.encode('latin-1')
+    assert ('GET', 'https://api.openopus.org/c.json') not in loaded
+
+
+@pytest.mark.parametrize('name', ['cassette.jsonl', 'cassette.jsonl.gz'])
+def test_record_after_interrupted_recording(tmp_path, name):
+    path = tmp_path / name
+    cassette = Cassette(path)
+    cassette.record('GET', 'https://api.openopus.org/a.json', 200, {}, b'{}')
+    cassette.close()
+    partial = b'{"method": "GET", "url": "https://api.openop'
+    with open(path, 'ab') as cassette_file:
+        # a gzip member cut short, like the one left by an interrupted recording
+        cassette_file.write(gzip.compress(partial)[:-8] if name.endswith('.gz') else partial)
+
+    cassette = Cassette(path)
+    cassette.record('GET', 'https://api.openopus.org/b.json', 200, {}, b'[]')
+    cassette.close()
+
+    loaded = Cassette(path)
+    assert len(loaded) == 2
+    assert loaded.get('GET', 'https://api.openopus.org/b.json')[2] == b'[]'
+
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        CassetteAdapter(tmp_path / 'cassette.jsonl', mode='rewind')
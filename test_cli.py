@@ -0,0 +1,139 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import mount
+from src.openopys import OpenOpys
+from src.openopys.cli import completed_keys, parse_args, parse_query, read_queries, run, run_queries
+
+queries = '''# composers
+list_popular_composers
+{"method": "list_works_by_composer_id_and_genre", "args": ["178", "Stage"]}
+list_genres_by_composer_id 178
+list_genres_by_composer_id 178
+close
+'''
+
+
+def _records(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('list_popular_composers', {'method': 'list_popular_composers', 'args': []}),
+    ('list_composers_by_period "Early Romantic"', {'method': 'list_composers_by_period', 'args': ['Early Romantic']}),
+    ('{"method": "list_composers_by_id", "args": [["87", "145"]]}',
+     {'method': 'list_composers_by_id', 'args': [['87', '145']]}),
+])
+def test_parse_query(line, expected):
+    assert parse_query(line) == expected
+
+
+@pytest.mark.parametrize('line', ['close', 'list_works_by_composer_ids 178', '{"method": "get_json"}'])
+def test_parse_query_rejects(line):
+    with pytest.raises(ValueError):
+        parse_query(line)
+
+
+def test_run(tmp_path, fake_api, capsys):
+    (tmp_path / 'queries.txt').write_text(queries, encoding='utf-8')
+    args = parse_args([str(tmp_path / 'queries.txt'), '-o', str(tmp_path / 'out.ndjson'), '-j', '2'])
+
+    assert run(args, mount(OpenOpys(), fake_api)) == 1
+    records = _records((tmp_path / 'out.ndjson').read_text(encoding='utf-8'))
+    results = {record['query']['method']: record['result'] for record in records if 'result' in record}
+    assert results == {
+        'list_popular_composers': [{'id': '87', 'name': 'Bach', 'epoch': 'Baroque'}],
+        'list_works_by_composer_id_and_genre': [],
+        'list_genres_by_composer_id': ['Popular', 'Recommended', 'Stage'],
+    }
+    assert [record['query'] for record in records if 'error' in record] == ['close']
+    assert len(fake_api.requests) == 3
+    assert 'finished: 4 queries (1 failed)' in capsys.readouterr().err
+
+
+def test_resume(tmp_path, fake_api):
+    output = tmp_path / 'out.ndjson'
+    done = {'query': {'method': 'list_popular_composers', 'args': []}, 'result': []}
+    failed = {'query': {'method': 'list_genres_by_composer_id', 'args': ['178']}, 'error': 'ConnectionError: reset'}
+    output.write_text(json.dumps(done) + '\n' + json.dumps(failed) + '\n{"query": {"meth', encoding='utf-8')
+
+    assert completed_keys(output) == {'["list_popular_composers",[]]'}
+    assert output.read_text(encoding='utf-8').endswith('reset"}\n')
+
+    (tmp_path / 'queries.txt').write_text(queries.replace('close\n', ''), encoding='utf-8')
+    args = parse_args([str(tmp_path / 'queries.txt'), '-o', str(output), '--resume'])
+    assert run(args, mount(OpenOpys(), fake_api)) == 0
+    assert len(fake_api.requests) == 2
+    assert len(_records(output.read_text(encoding='utf-8'))) == 4
+
+
+def test_read_queries_from_stdin(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO('list_popular_composers\nnot_a_query\n'))
+    from src.openopys.cli import _lines
+
+    assert [(key, error is None) for key, _, error in read_queries(_lines([]))] == [
+        ('["list_popular_composers",[]]', True), ('not_a_query', False)]
+
+
+def test_resume_requires_output():
+    with pytest.raises(SystemExit):
+        parse_args(['--resume'])
+
+
+def test_resume_skips_reported_invalid_queries(tmp_path, fake_api):
+    output = tmp_path / 'out.ndjson'
+    (tmp_path / 'queries.txt').write_text('close\nlist_popular_composers\n', encoding='utf-8')
+    args = parse_args([str(tmp_path / 'queries.txt'), '-o', str(output), '--resume'])
+
+    assert run(args, mount(OpenOpys(), fake_api)) == 1
+    assert completed_keys(output) == {'close', '["list_popular_composers",[]]'}
+    assert run(args, mount(OpenOpys(), fake_api)) == 0
+    assert len(_records(output.read_text(encoding='utf-8'))) == 2
+
+
+class _SlowSession:
+    max_workers = 2
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def list_composers_by_first_letter(self, letter):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.005)
+        with self.lock:
+            self.running -= 1
+        return [letter]
+
+
+def test_run_queries_streams_with_bounded_window():
+    pulled = []
+    first_written = threading.Event()
+
+    def lines():
+        for letter in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
+            if letter == 'D':
+                # like stdin waiting for input: earlier queries must run and stream meanwhile
+                assert first_written.wait(5)
+            pulled.append(letter)
+            # submitted queries minus finished ones stay within the window of 2 * max_workers
+            assert len(pulled) - len(output.getvalue().splitlines()) <= 2 * _SlowSession.max_workers + 1
+            yield f'list_composers_by_first_letter {letter}\n'
+
+    class Output(io.StringIO):
+        def write(self, text):
+            result = io.StringIO.write(self, text)
+            first_written.set()
+            return result
+
+    output = Output()
+    session = _SlowSession()
+    assert run_queries(session, read_queries(lines()), output) == 0
+    assert len(_records(output.getvalue())) == 26 and session.max_running <= 2
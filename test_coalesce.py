@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import OpenOpys
+from src.openopys.coalesce import AsyncSingleFlight, SingleFlight
+
+
+class BlockingAdapter(FakeOpenOpusAdapter):
+
+    def __init__(self, payloads, error=None):
+        FakeOpenOpusAdapter.__init__(self, payloads)
+        self.release = threading.Event()
+        self.error = error
+
+    def send(self, request, **kwargs):
+        self.release.wait(5)
+        response = FakeOpenOpusAdapter.send(self, request, **kwargs)
+        if self.error is not None:
+            raise self.error
+        return response
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def _call_concurrently(openopys, func, adapter, count):
+    outcomes = [None] * count
+
+    def call(index):
+        try:
+            outcomes[index] = func()
+        except Exception as error:
+            outcomes[index] = error
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: openopys.coalesced_requests == count - 1)
+    adapter.release.set()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_threaded_calls_share_one_request(fake_api):
+    adapter = BlockingAdapter(fake_api.payloads)
+    openopys = mount(OpenOpys(), adapter)
+
+    outcomes = _call_concurrently(openopys, openopys.list_popular_composers, adapter, 8)
+
+    assert len(adapter.requests) == 1
+    assert openopys.coalesced_requests == 7
+    assert all(outcome == [{'id': '87', 'name': 'Bach', 'epoch': 'Baroque'}] for outcome in outcomes)
+
+    openopys.list_popular_composers()
+    assert len(adapter.requests) == 2
+
+
+def test_threaded_calls_share_errors(fake_api):
+    adapter = BlockingAdapter(fake_api.payloads, error=ConnectionError('reset'))
+    openopys = mount(OpenOpys(), adapter)
+
+    outcomes = _call_concurrently(openopys, openopys.list_essential_composers, adapter, 4)
+
+    assert len(adapter.requests) == 1
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+
+
+def test_single_flight_distinct_keys():
+    single_flight = SingleFlight()
+    assert [single_flight.do(key, lambda: key * 2) for key in [1, 2, 1]] == [2, 4, 2]
+    assert single_flight.coalesced == 0
+
+
+@pytest.mark.parametrize('fail', [False, True])
+def test_async_single_flight(fail):
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if fail:
+            raise ValueError('failed')
+        return ['result']
+
+    async def main():
+        single_flight = AsyncSingleFlight()
+        outcomes = await asyncio.gather(*[single_flight.do('key', func) for _ in range(5)], return_exceptions=True)
+        return single_flight.coalesced, outcomes
+
+    coalesced, outcomes = asyncio.run(main())
+    assert len(calls) == 1 and coalesced == 4
+    if fail:
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    else:
+        assert outcomes == [['result']] * 5
+
+
+def test_async_single_flight_survives_cancelled_callers():
+    started = []
+
+    async def func():
+        started.append(1)
+        await asyncio.sleep(0.02)
+        return ['result']
+
+    async def main():
+        single_flight = AsyncSingleFlight()
+        leader = asyncio.ensure_future(single_flight.do('key', func))
+        follower = asyncio.ensure_future(single_flight.do('key', func))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        outcome = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        # once every caller is cancelled, so is the shared call, and the next caller starts a new one
+        abandoned = asyncio.ensure_future(single_flight.do('key', func))
+        await asyncio.sleep(0.005)
+        abandoned.cancel()
+        await asyncio.sleep(0)
+        return outcome, await single_flight.do('key', func)
+
+    assert asyncio.run(main()) == (['result'], ['result'])
+    assert len(started) == 3
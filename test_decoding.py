@@ -0,0 +1,94 @@
+import json
+from json.decoder import JSONDecodeError
+
+import pytest
+import requests
+
+from benchmarks.fake_openopus import FakeOpenOpusServer, build_fixtures
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import Metrics, OpenOpys
+from src.openopys import decoding
+from src.openopys.decoding import accept_encoding, json_loads
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_json_loads(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(decoding, 'orjson', None)
+    elif decoding.orjson is None:
+        pytest.skip('orjson is not installed')
+
+    assert json_loads('{"title": "Pièces de clavecin"}'.encode('utf-8')) == {'title': 'Pièces de clavecin'}
+    with pytest.raises(JSONDecodeError):
+        json_loads(b'{"title": ')
+
+
+def test_custom_json_loads(fake_api):
+    decoded = []
+
+    def loads(content):
+        decoded.append(content)
+        return json.loads(content)
+
+    openopys = mount(OpenOpys(json_loads=loads), fake_api)
+
+    assert openopys.list_popular_composers()[0]['name'] == 'Bach'
+    assert decoded == [json.dumps(fake_api.payloads['composer/list/pop.json']).encode('utf-8')]
+
+
+class InvalidAdapter(FakeOpenOpusAdapter):
+
+    def send(self, request, **kwargs):
+        response = FakeOpenOpusAdapter.send(self, request, **kwargs)
+        response.raw.seek(0)
+        response.raw.truncate()
+        response.raw.write(b'{"composers": [')
+        response.raw.seek(0)
+        return response
+
+
+def test_invalid_json(fake_api):
+    openopys = mount(OpenOpys(), InvalidAdapter())
+    with pytest.raises(JSONDecodeError):
+        openopys.list_popular_composers()
+
+
+def test_accept_encoding(monkeypatch):
+    assert accept_encoding() == ('gzip, deflate' if decoding.brotli is None else 'br, gzip, deflate')
+    monkeypatch.setattr(decoding, 'brotli', object())
+    assert accept_encoding() == 'br, gzip, deflate'
+    assert OpenOpys().headers['Accept-Encoding'] == 'br, gzip, deflate'
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_wire_size(compress):
+    fixtures = build_fixtures(num_composers=5, max_works=200)
+    metrics = Metrics()
+    with FakeOpenOpusServer(fixtures, compress=compress) as server:
+        works = OpenOpys(api_url=server.url, metrics=metrics).list_works_by_composer_id('5')
+
+    assert len(works) == 200
+    stats = metrics.snapshot()['works.by_composer_genre']
+    assert stats['encodings'] == {'gzip' if compress else 'identity': 1}
+    if compress:
+        assert stats['wire_bytes']['sum'] * 3 < stats['response_bytes']['sum']
+    else:
+        assert stats['wire_bytes']['sum'] == stats['response_bytes']['sum']
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_decode_errors_are_requests_errors(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(decoding, 'orjson', None)
+    elif decoding.orjson is None:
+        pytest.skip('orjson is not installed')
+
+    adapter = InvalidAdapter()
+    with pytest.raises(requests.exceptions.JSONDecodeError):
+        mount(OpenOpys(), adapter).list_popular_composers()
+
+    def loads(content):
+        raise ValueError('not json')
+
+    with pytest.raises(requests.exceptions.RequestException):
+        mount(OpenOpys(json_loads=loads), adapter).list_essential_composers()
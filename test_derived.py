@@ -0,0 +1,79 @@
+import pytest
+
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import Genre, MemoryCache, OpenOpys, ResultMode, SqliteCache, Work
+from src.openopys import derived
+from src.openopys.derived import WorkIndex, WorkIndexes
+
+works = [
+    {'title': 'Dardanus', 'subtitle': '', 'searchterms': '', 'popular': '1', 'recommended': '0', 'id': '1', 'genre': 'Stage'},
+    {'title': 'Hippolyte et Aricie', 'subtitle': '', 'searchterms': '', 'popular': '0', 'recommended': '1', 'id': '2', 'genre': 'Stage'},
+    {'title': 'Pièces de clavecin', 'subtitle': 'Suite in E minor', 'searchterms': 'Rappel', 'popular': '1', 'recommended': '1', 'id': '3', 'genre': 'Keyboard'},
+]
+
+
+def test_work_index_filter():
+    index = WorkIndex(works)
+
+    assert index.filter() == works
+    assert index.filter('Stage') == works[:2]
+    assert index.filter('Popular') == [works[0], works[2]]
+    assert index.filter('Recommended') == works[1:]
+    assert index.filter('Vocal') == []
+    assert index.filter(title='PIECES minor') == [works[2]]
+    assert index.filter(title='rappel') == [works[2]]
+    assert index.filter('Stage', title='a') == works[:2]
+    assert index.filter('Popular', title='aricie') == []
+
+
+def test_work_indexes_rebuild_and_evict():
+    indexes = WorkIndexes(max_size=1)
+    index = indexes.get('a', works)
+
+    assert indexes.get('a', works) is index
+    assert indexes.get('a', [dict(work) for work in works]) is index
+    assert indexes.get('a', works[:2]) is not index
+    index = indexes.get('a', [{**works[0], 'genre': 'Keyboard'}, *works[1:]])
+    assert index.filter('Keyboard') == [{**works[0], 'genre': 'Keyboard'}, works[2]]
+    indexes.get('b', works)
+    assert indexes.get('a', works) is not index
+
+
+@pytest.fixture
+def derived_api():
+    return FakeOpenOpusAdapter({'work/list/composer/178/genre/all.json': {'works': works}})
+
+
+def test_derived_work_lists_use_one_request(derived_api):
+    openopys = mount(OpenOpys(cache=MemoryCache(), derive_work_lists=True), derived_api)
+
+    assert openopys.list_works_by_composer_id('178') == works
+    assert openopys.list_popular_works_by_composer_id('178') == [works[0], works[2]]
+    assert openopys.list_essential_works_by_composer_id('178') == works[1:]
+    assert openopys.list_works_by_composer_id_and_genre('178', Genre.KEYBOARD) == [works[2]]
+    assert openopys.list_works_by_composer_id_and_genre('178', 'Stage') == works[:2]
+    assert openopys.search_works_by_composer_id_and_title('178', 'hippolyte') == [works[1]]
+    assert openopys.search_works_by_composer_id_title_and_genre('178', 'dardanus', Genre.KEYBOARD) == []
+    assert len(derived_api.requests) == 1
+    assert derived_api.requests[0].url.endswith('/work/list/composer/178/genre/all.json')
+
+
+def test_derived_work_lists_result_modes(derived_api):
+    openopys = mount(OpenOpys(cache=MemoryCache(), derive_work_lists=True, result_mode=ResultMode.RECORDS), derived_api)
+
+    popular = openopys.list_popular_works_by_composer_id('178')
+    assert all(isinstance(work, Work) for work in popular)
+    assert [work.id for work in popular] == [1, 3]
+
+
+def test_derived_work_lists_reuse_index_from_sqlite_cache(derived_api, tmp_path, monkeypatch):
+    built = []
+    monkeypatch.setattr(derived, 'WorkIndex', lambda works: built.append(works) or WorkIndex(works))
+    openopys = mount(OpenOpys(cache=SqliteCache(tmp_path / 'cache.sqlite', compress=True), derive_work_lists=True),
+                     derived_api)
+
+    assert openopys.list_popular_works_by_composer_id('178') == [works[0], works[2]]
+    assert openopys.list_works_by_composer_id_and_genre('178', 'Stage') == works[:2]
+    assert openopys.search_works_by_composer_id_and_title('178', 'rappel') == [works[2]]
+    assert len(built) == 1
+    assert len(derived_api.requests) == 1
@@ -0,0 +1,98 @@
+import csv
+
+import pytest
+
+from conftest import mount
+from src.openopys import CatalogExporter, CatalogMirror, OpenOpys, ResultMode
+
+
+def _exporter(catalog_api, **kwargs):
+    return CatalogExporter(mount(OpenOpys(**kwargs), catalog_api), batch_size=2)
+
+
+@pytest.mark.parametrize('result_mode', [ResultMode.DICT, ResultMode.COLUMNAR])
+def test_iter_batches(catalog_api, result_mode):
+    exporter = _exporter(catalog_api, result_mode=result_mode)
+
+    assert [list(batch['id']) for batch in exporter.iter_batches('composers')] == [[1, 87]]
+    batches = list(exporter.iter_batches('works'))
+    rows = sorted(
+        (work_id, exporter.categories['composer_id'].values[composer_code], exporter.categories['genre'].values[genre])
+        for batch in batches
+        for work_id, composer_code, genre in zip(batch['id'], batch['composer_id'], batch['genre']))
+
+    assert all(len(batch['id']) <= 2 for batch in batches)
+    assert rows == [(10, 1, 'Keyboard'), (20, 87, 'Vocal'), (21, 87, 'Keyboard')]
+
+
+def test_export_csv(tmp_path, catalog_api):
+    paths = _exporter(catalog_api).export(tmp_path, format='csv')
+
+    with open(paths['works'], encoding='utf-8', newline='') as works_file:
+        rows = sorted(csv.DictReader(works_file), key=lambda row: row['id'])
+    assert [(row['composer_id'], row['id'], row['genre'], row['popular']) for row in rows] == [
+        ('1', '10', 'Keyboard', '1'), ('87', '20', 'Vocal', '1'), ('87', '21', 'Keyboard', '0')]
+    with open(paths['composers'], encoding='utf-8', newline='') as composers_file:
+        assert [row['name'] for row in csv.DictReader(composers_file)] == ['Albéniz', 'Bach']
+
+
+def test_export_numpy(tmp_path, catalog_api):
+    numpy = pytest.importorskip('numpy')
+    paths = _exporter(catalog_api).export(tmp_path, format='numpy')
+
+    with numpy.load(paths['works']) as arrays:
+        order = numpy.argsort(arrays['id'])
+        assert list(arrays['id'][order]) == [10, 20, 21]
+        assert list(arrays['composer_id_categories'][arrays['composer_id'][order]]) == [1, 87, 87]
+        assert list(arrays['genre_categories'][arrays['genre'][order]]) == ['Keyboard', 'Vocal', 'Keyboard']
+        assert list(arrays['recommended'][order]) == [True, False, True]
+    with numpy.load(paths['composers']) as arrays:
+        assert list(arrays['epoch_categories'][arrays['epoch']]) == ['Romantic', 'Baroque']
+
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_export_arrow(tmp_path, catalog_api, format):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    paths = _exporter(catalog_api).export(tmp_path, format=format)
+    if format == 'parquet':
+        table = pyarrow.parquet.read_table(paths['works'])
+        # parquet only restores dictionary types for strings, but stores every dictionary column encoded as such
+        metadata = pyarrow.parquet.ParquetFile(paths['works']).metadata
+        assert 'RLE_DICTIONARY' in metadata.row_group(0).column(0).encodings
+    else:
+        with pyarrow.ipc.open_stream(paths['works']) as reader:
+            table = reader.read_all()
+        assert pyarrow.types.is_dictionary(table.schema.field('composer_id').type)
+
+    assert pyarrow.types.is_dictionary(table.schema.field('genre').type)
+    rows = sorted(zip(table.column('id').to_pylist(), table.column('composer_id').to_pylist(),
+                      table.column('genre').to_pylist()))
+    assert rows == [(10, 1, 'Keyboard'), (20, 87, 'Vocal'), (21, 87, 'Keyboard')]
+
+
+def test_export_unknown_format(tmp_path, catalog_api):
+    with pytest.raises(ValueError):
+        _exporter(catalog_api).export(tmp_path, format='xlsx')
+
+
+def test_export_from_mirror(tmp_path, catalog_api):
+    mirror = CatalogMirror(mount(OpenOpys(), catalog_api), tmp_path / 'catalog.json')
+    mirror.crawl()
+    catalog_api.requests.clear()
+
+    exporter = CatalogExporter(mirror)
+    assert sorted(work_id for batch in exporter.iter_batches('works') for work_id in batch['id']) == [10, 20, 21]
+    assert catalog_api.requests == []
+
+
+def test_works_fetched_through_bounded_window(catalog_api, monkeypatch):
+    openopys = mount(OpenOpys(max_workers=3), catalog_api)
+    windows = []
+    map_as_completed = openopys.map_as_completed
+    monkeypatch.setattr(openopys, 'map_as_completed', lambda *args, **kwargs: windows.append(
+        kwargs.get('window')) or map_as_completed(*args, **kwargs))
+
+    assert sum(len(batch['id']) for batch in CatalogExporter(openopys).iter_batches('works')) == 3
+    assert windows == [6]
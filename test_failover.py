@@ -0,0 +1,101 @@
+import time
+from urllib.parse import urlsplit
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import MirrorPool, OpenOpys
+
+mirror_urls = ['https://eu.example.org', 'https://us.example.org/', 'https://api.openopus.org']
+
+
+class MirrorAdapter(FakeOpenOpusAdapter):
+    """Fake adapter where hosts in failing raise, hosts in errors answer 503 and hosts in delays are slow"""
+
+    def __init__(self, payloads, failing=(), errors=(), delays=None):
+        FakeOpenOpusAdapter.__init__(self, payloads)
+        self.failing = set(failing)
+        self.errors = set(errors)
+        self.delays = dict(delays or {})
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).hostname
+        time.sleep(self.delays.get(host, 0))
+        response = FakeOpenOpusAdapter.send(self, request, **kwargs)
+        if host in self.failing:
+            raise ConnectionError('connection refused')
+        if host in self.errors:
+            response.status_code = 503
+        return response
+
+
+def _hosts(adapter):
+    return [urlsplit(request.url).hostname for request in adapter.requests]
+
+
+def test_mirror_pool_ranking():
+    pool = MirrorPool(['a', 'b', 'c'], cooldown=60)
+    assert pool.ranked() == ['a', 'b', 'c']
+
+    pool.record('a', 0.3)
+    pool.record('b', 0.1)
+    assert pool.ranked() == ['c', 'b', 'a']
+
+    pool.record('c', 0.05)
+    for _ in range(5):
+        pool.record('c', 0, failed=True)
+    assert pool.ranked() == ['b', 'a', 'c']
+    assert not pool.snapshot()['c']['healthy'] and pool.snapshot()['c']['requests'] == 6
+
+
+def test_hedge_delay():
+    pool = MirrorPool(['a'], min_samples=10)
+    for latency in range(9):
+        pool.record('a', latency / 100)
+    assert pool.hedge_delay('a') is None
+    pool.record('a', 1)
+    assert pool.hedge_delay('a') == 1
+
+
+def test_single_url_has_no_mirrors(fake_api):
+    openopys = mount(OpenOpys(), fake_api)
+    assert openopys.mirrors is None
+    openopys.list_popular_composers()
+    assert _hosts(fake_api) == ['api.openopus.org']
+
+
+def test_fails_over_to_next_mirror(fake_api):
+    adapter = MirrorAdapter(fake_api.payloads, failing=['eu.example.org'], errors=['us.example.org'])
+    openopys = mount(OpenOpys(api_url=mirror_urls), adapter)
+
+    assert openopys.list_popular_composers()[0]['name'] == 'Bach'
+    assert _hosts(adapter) == ['eu.example.org', 'us.example.org', 'api.openopus.org']
+    assert adapter.requests[-1].url.startswith('https://api.openopus.org/composer/list/')
+
+    # the failing mirrors are now unhealthy, so the next request goes straight to the working one
+    openopys.list_essential_composers()
+    assert _hosts(adapter)[3:] == ['api.openopus.org']
+
+
+def test_all_mirrors_failing(fake_api):
+    adapter = MirrorAdapter(fake_api.payloads, failing=['eu.example.org', 'us.example.org', 'api.openopus.org'])
+    openopys = mount(OpenOpys(api_url=mirror_urls), adapter)
+    with pytest.raises(ConnectionError):
+        openopys.list_popular_composers()
+    assert len(adapter.requests) == 3
+
+
+def test_hedged_request(fake_api):
+    adapter = MirrorAdapter(fake_api.payloads, delays={'eu.example.org': 0.5})
+    openopys = mount(OpenOpys(api_url=mirror_urls[:2], hedge=True), adapter)
+    openopys.mirrors = MirrorPool(mirror_urls[:2], min_samples=3)
+    for _ in range(3):
+        openopys.mirrors.record('https://eu.example.org', 0.01)
+    openopys.mirrors.record('https://us.example.org/', 0.02)
+
+    started = time.perf_counter()
+    assert openopys.list_popular_composers()[0]['name'] == 'Bach'
+    assert time.perf_counter() - started < 0.4
+    assert _hosts(adapter)[-1] == 'us.example.org'
+    openopys.close()
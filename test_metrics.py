@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import mount
+from src.openopys import MemoryCache, Metrics, OpenOpys, ResponseContentTypeError
+from src.openopys.metrics import Histogram, endpoint_name
+
+
+@pytest.mark.parametrize('endpoint, expected', [
+    ('composer/list//pop.json', 'composers.popular'),
+    ('composer/list/rec.json', 'composers.essential'),
+    ('composer/list/name/a.json', 'composers.by_letter'),
+    ('composer/list/epoch/Baroque.json', 'composers.by_period'),
+    ('composer/list/search/Rameau.json', 'composers.search'),
+    ('composer/list/ids/178,10.json', 'composers.by_id'),
+    ('genre/list/composer/178.json', 'genres.by_composer'),
+    ('work/list/composer/178/genre/Stage/search/Dard.json', 'works.search'),
+    ('work/list/composer/178/genre/all.json', 'works.by_composer_genre'),
+    ('work/detail/1.json', 'works.details'),
+    ('performer/list/all.json', 'performer.list'),
+])
+def test_endpoint_name(endpoint, expected):
+    assert endpoint_name(endpoint) == expected
+
+
+def test_histogram():
+    histogram = Histogram([1, 10])
+    for value in [0.5, 1, 5, 50]:
+        histogram.observe(value)
+
+    assert histogram.cumulative_counts() == [(1, 2), (10, 3), ('+Inf', 4)]
+    assert (histogram.sum, histogram.count) == (56.5, 4)
+
+
+def test_records_requests_cache_and_errors(fake_api, capsys):
+    metrics = Metrics()
+    openopys = mount(OpenOpys(cache=MemoryCache(), metrics=metrics), fake_api)
+    openopys.list_popular_composers()
+    openopys.list_popular_composers()
+    openopys.list_works_by_composer_id('178')
+    fake_api.content_type = 'text/html'
+    with pytest.raises(ResponseContentTypeError):
+        openopys.list_essential_composers()
+    assert capsys.readouterr().out == ''
+
+    snapshot = metrics.snapshot()
+    popular = snapshot['composers.popular']
+    assert (popular['cache_hits'], popular['cache_misses']) == (1, 1)
+    assert popular['transfer_seconds']['count'] == popular['decode_seconds']['count'] == 1
+    assert popular['response_bytes']['sum'] > 0
+    assert snapshot['works.by_composer_genre']['transfer_seconds']['count'] == 1
+    assert snapshot['composers.essential']['errors'] == {'ResponseContentTypeError': 1}
+
+    exported = metrics.to_prometheus()
+    assert 'openopys_transfer_seconds_count{endpoint="composers.popular"} 1' in exported
+    assert 'openopys_cache_requests_total{endpoint="composers.popular",result="hit"} 1' in exported
+    assert 'openopys_errors_total{endpoint="composers.essential",error="ResponseContentTypeError"} 1' in exported
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_disabled_by_default(fake_api):
+    openopys = mount(OpenOpys(), fake_api)
+    openopys.list_popular_composers()
+    assert openopys.metrics is None
@@ -0,0 +1,89 @@
+import pytest
+
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import CatalogMirror, Genre, MemoryCache, OpenOpys
+
+bach = {'id': '87', 'name': 'Bach', 'complete_name': 'Johann Sebastian Bach', 'epoch': 'Baroque'}
+rameau = {'id': '178', 'name': 'Rameau', 'complete_name': 'Jean-Philippe Rameau', 'epoch': 'Baroque'}
+ravel = {'id': '125', 'name': 'Ravel', 'complete_name': 'Maurice Ravel', 'epoch': '20th Century'}
+
+
+@pytest.fixture
+def catalog_api(fake_api):
+    return FakeOpenOpusAdapter(dict(fake_api.payloads, **{
+        'composer/list/name/B.json': {'composers': [bach]},
+        'composer/list/name/R.json': {'composers': [rameau, ravel]},
+        'composer/list/epoch/Baroque.json': {'composers': [bach, rameau]},
+        'composer/list/epoch/20th Century.json': {'composers': [ravel]},
+        'composer/list/pop.json': {'composers': [bach]},
+        'composer/list/rec.json': {'composers': [rameau, bach]},
+    }))
+
+
+def _requested_paths(adapter):
+    return [request.path_url for request in adapter.requests]
+
+
+@pytest.mark.parametrize('by', ['letter', 'period'])
+def test_crawl_and_answer_locally(tmp_path, catalog_api, by):
+    mirror = CatalogMirror(mount(OpenOpys(), catalog_api), tmp_path / 'catalog.json.gz', max_workers=4)
+    assert mirror.crawl(by=by) == {}
+    assert len(mirror) == 3
+
+    catalog_api.requests.clear()
+    assert mirror.list_popular_composers() == [bach]
+    assert mirror.list_essential_composers() == [rameau, bach]
+    assert mirror.list_composers_by_first_letter('r') == [rameau, ravel]
+    assert mirror.list_composers_by_period('Baroque') == [bach, rameau]
+    assert mirror.search_composers_by_name('philippe') == [rameau]
+    assert mirror.list_composers_by_id(['125', '87', '-1', '87']) == [ravel, bach]
+    assert mirror.list_genres_by_composer_id('178') == ['Popular', 'Recommended', 'Stage']
+    assert len(mirror.list_works_by_composer_id('178')) == 2
+    assert [work['id'] for work in mirror.list_popular_works_by_composer_id('178')] == ['1']
+    assert [work['id'] for work in mirror.list_essential_works_by_composer_id('178')] == ['2']
+    assert len(mirror.list_works_by_composer_id_and_genre('178', Genre.STAGE)) == 2
+    assert [work['id'] for work in mirror.search_works_by_composer_id_and_title('178', 'hipp')] == ['2']
+    assert mirror.list_works_by_composer_id('-1') == []
+    assert catalog_api.requests == []
+
+
+def test_snapshot_survives_restart(tmp_path, catalog_api):
+    path = tmp_path / 'catalog.json'
+    CatalogMirror(mount(OpenOpys(), catalog_api), path).crawl()
+
+    restarted = CatalogMirror(OpenOpys(), path)
+    assert restarted.list_composers_by_first_letter('B') == [bach]
+    assert len(restarted.list_works_by_composer_id('178')) == 2
+
+
+def test_refresh_fetches_only_changed_composers(tmp_path, catalog_api):
+    mirror = CatalogMirror(mount(OpenOpys(), catalog_api), tmp_path / 'catalog.json')
+    mirror.crawl()
+
+    catalog_api.requests.clear()
+    catalog_api.payloads['composer/list/name/R.json'] = {'composers': [dict(rameau, epoch='Late Baroque')]}
+    mirror.refresh()
+
+    works_and_genres = [path for path in _requested_paths(catalog_api) if not path.startswith('/composer/')]
+    assert sorted(works_and_genres) == ['/genre/list/composer/178.json', '/work/list/composer/178/genre/all.json']
+    assert mirror.list_composers_by_first_letter('R') == [dict(rameau, epoch='Late Baroque')]
+    assert mirror.list_composers_by_id('125') == []
+
+    catalog_api.requests.clear()
+    mirror.refresh(max_age=0)
+    assert len([path for path in _requested_paths(catalog_api) if path.startswith('/work/')]) == 2
+
+
+def test_refresh_bypasses_session_cache(tmp_path, catalog_api):
+    mirror = CatalogMirror(mount(OpenOpys(cache=MemoryCache()), catalog_api), tmp_path / 'catalog.json', max_workers=2)
+    mirror.crawl()
+
+    works = [{'title': 'Zoroastre', 'popular': '0', 'recommended': '0', 'id': '3', 'genre': 'Stage'}]
+    catalog_api.payloads['composer/list/name/R.json'] = {'composers': [dict(rameau, epoch='Late Baroque'), ravel]}
+    catalog_api.payloads['work/list/composer/178/genre/all.json'] = {'works': works}
+    catalog_api.payloads['composer/list/pop.json'] = {'composers': [ravel]}
+    mirror.refresh()
+
+    assert mirror.list_composers_by_first_letter('R') == [dict(rameau, epoch='Late Baroque'), ravel]
+    assert mirror.list_works_by_composer_id('178') == works
+    assert mirror.list_popular_composers() == [ravel]
@@ -1,9 +1,11 @@
+import os
 import re
+from functools import lru_cache
 
 import pytest
 from delayed_assert import expect, assert_expectations
 
-from src.openopys import OpenOpys, Genre, _urljoin
+from src.openopys import CassetteAdapter, OpenOpys, Genre, _urljoin
 
 
 """
@@ -73,12 +75,23 @@ def _result_size_in_range(size, min=None, max=None):
         return False
 
 
+# Set OPENOPYS_CASSETTE to a cassette file to run offline from recorded responses, recording them first
+# from the live API with OPENOPYS_CASSETTE_MODE=once (or record to start over)
+@lru_cache(maxsize=None)
+def _cassette_adapter():
+    return CassetteAdapter(os.environ['OPENOPYS_CASSETTE'], mode=os.environ.get('OPENOPYS_CASSETTE_MODE', 'replay'))
+
+
+def _adapter_kwargs():
+    return {'adapter': _cassette_adapter()} if os.environ.get('OPENOPYS_CASSETTE') else {}
+
+
 def default_openopys():
-    return OpenOpys()
+    return OpenOpys(**_adapter_kwargs())
 
 
 def custom_url_openopys():
-    return OpenOpys(api_url=custom_api_url)
+    return OpenOpys(api_url=custom_api_url, **_adapter_kwargs())
 
 
 @pytest.mark.parametrize('openopys_constructor, setting, expected_attr_dict', [
@@ -0,0 +1,103 @@
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import CatalogQuery, Genre, MemoryCache, OpenOpys, QueryPlanner
+
+bach = {'id': '87', 'name': 'Bach', 'complete_name': 'Johann Sebastian Bach', 'epoch': 'Baroque'}
+rameau = {'id': '178', 'name': 'Rameau', 'complete_name': 'Jean-Philippe Rameau', 'epoch': 'Baroque'}
+ravel = {'id': '125', 'name': 'Ravel', 'complete_name': 'Maurice Ravel', 'epoch': '20th Century'}
+
+bach_works = [
+    {'title': 'Musical Offering', 'popular': '1', 'recommended': '1', 'id': '10', 'genre': 'Chamber'},
+    {'title': 'Flute Sonata in E minor', 'popular': '0', 'recommended': '0', 'id': '11', 'genre': 'Chamber'},
+    {'title': 'Goldberg Variations', 'popular': '1', 'recommended': '1', 'id': '12', 'genre': 'Keyboard'},
+]
+rameau_works = [
+    {'title': 'Pièces de clavecin en concerts', 'popular': '1', 'recommended': '0', 'id': '20', 'genre': 'Chamber'},
+    {'title': 'Dardanus', 'popular': '1', 'recommended': '0', 'id': '21', 'genre': 'Stage'},
+]
+
+
+def _api():
+    return FakeOpenOpusAdapter({
+        'composer/list/epoch/Baroque.json': {'composers': [bach, rameau]},
+        'composer/list/epoch/20th Century.json': {'composers': [ravel]},
+        'composer/list/search/ra.json': {'composers': [rameau, ravel]},
+        'genre/list/composer/87.json': {'genres': ['Popular', 'Recommended', 'Chamber', 'Keyboard']},
+        'genre/list/composer/178.json': {'genres': ['Popular', 'Stage']},
+        'work/list/composer/87/genre/all.json': {'works': bach_works},
+        'work/list/composer/87/genre/Chamber.json': {'works': bach_works[:2]},
+        'work/list/composer/178/genre/all.json': {'works': rameau_works},
+        'work/list/composer/178/genre/Chamber.json': {'works': rameau_works[:1]},
+        'work/list/composer/178/genre/all/search/dard.json': {'works': rameau_works[1:]},
+    })
+
+
+def _paths(api):
+    return sorted(request.path_url for request in api.requests)
+
+
+def test_query_filters():
+    query = CatalogQuery(epochs='Baroque', genres=[Genre.CHAMBER, 'Keyboard'], popular=True, title='off')
+
+    assert query.genres == ('Chamber', 'Keyboard')
+    assert query.composer_calls() == [('list_composers_by_period', ('Baroque',))]
+    assert query.work_genre() == 'Popular'
+    assert query.matches_work(bach_works[0])
+    assert not query.matches_work(bach_works[2])
+    assert query.matches_work(bach_works[2], searched=True)
+    assert not query.allows_genres(['Chamber', 'Keyboard'])
+    assert query.allows_genres(['Popular', 'Keyboard'])
+
+    assert len(CatalogQuery().composer_calls()) == 26
+    assert CatalogQuery(epochs=['Baroque'], name='ra').composer_calls() == [('search_composers_by_name', ('ra',))]
+    assert CatalogQuery(genres='Stage').work_genre() == 'Stage'
+
+
+def test_plans_one_request_per_composer():
+    api = _api()
+    planner = QueryPlanner(mount(OpenOpys(), api))
+
+    records = list(planner.select(epochs='Baroque', genres='Chamber', popular=True))
+
+    assert sorted((record['composer']['id'], record['work']['id']) for record in records) == [('178', '20'), ('87', '10')]
+    assert _paths(api) == [
+        '/composer/list/epoch/Baroque.json', '/work/list/composer/178/genre/Chamber.json',
+        '/work/list/composer/87/genre/Chamber.json']
+    assert planner.stats == {'composer_calls': 1, 'work_calls': 2, 'cached': 0, 'skipped': 0}
+
+
+def test_reuses_cached_lists_and_genres():
+    api = _api()
+    openopys = mount(OpenOpys(cache=MemoryCache()), api)
+    openopys.list_genres_by_composer_id('178')
+    openopys.list_works_by_composer_id('87')
+    api.requests.clear()
+
+    planner = QueryPlanner(openopys)
+    records = list(planner.select(epochs='Baroque', genres='Keyboard'))
+
+    assert [record['work']['title'] for record in records] == ['Goldberg Variations']
+    assert records[0]['composer'] == bach
+    assert _paths(api) == ['/composer/list/epoch/Baroque.json']
+    assert planner.stats == {'composer_calls': 1, 'work_calls': 0, 'cached': 1, 'skipped': 1}
+
+
+def test_title_and_name_searches():
+    api = _api()
+    planner = QueryPlanner(mount(OpenOpys(), api))
+
+    records = list(planner.select(name='ra', epochs='Baroque', title='dard'))
+
+    assert records == [{'composer': rameau, 'work': rameau_works[1]}]
+    assert _paths(api) == ['/composer/list/search/ra.json', '/work/list/composer/178/genre/all/search/dard.json']
+
+
+def test_failed_work_requests_are_skipped():
+    api = _api()
+    openopys = mount(OpenOpys(), api)
+    planner = QueryPlanner(openopys)
+    api.payloads['work/list/composer/87/genre/all.json'] = []
+
+    records = list(planner.select(epochs='Baroque'))
+
+    assert [record['work']['id'] for record in records] == ['20', '21']
+    assert list(planner.errors) == ['87']
@@ -0,0 +1,71 @@
+import sys
+from datetime import date
+
+import pytest
+
+from conftest import mount
+from src.openopys import Composer, OpenOpys, ResultMode, Work, WorkList
+
+composer_dict = {
+    'id': '87', 'name': 'Bach', 'complete_name': 'Johann Sebastian Bach', 'birth': '1685-01-01', 'death': '1750-01-01',
+    'epoch': 'Baroque', 'portrait': 'https://assets.openopus.org/portraits/12091447-1568084857.jpg'
+}
+
+work_dicts = [
+    {'title': 'Dardanus', 'subtitle': '', 'searchterms': '', 'popular': '1', 'recommended': '0', 'id': '1', 'genre': 'Stage'},
+    {'title': 'Hippolyte et Aricie', 'subtitle': '', 'searchterms': '', 'popular': '0', 'recommended': '1', 'id': '2', 'genre': 'Stage'},
+    {'title': 'Pièces de clavecin', 'subtitle': '', 'searchterms': '', 'popular': '0', 'recommended': '0', 'id': '3', 'genre': 'Keyboard'},
+]
+
+
+def test_composer_record():
+    composer = Composer.from_dict(dict(composer_dict, death=None, extra='kept'))
+
+    assert (composer.id, composer.birth, composer.death) == (87, date(1685, 1, 1), None)
+    assert composer.epoch is sys.intern('Baroque')
+    assert composer['id'] == '87' and composer['birth'] == '1685-01-01' and composer['extra'] == 'kept'
+    assert composer == dict(composer_dict, death=None, extra='kept')
+    assert not hasattr(composer, '__dict__')
+    with pytest.raises(AttributeError):
+        composer.name = 'Bach'
+    with pytest.raises(KeyError):
+        composer['missing']
+
+
+def test_work_record():
+    work = Work.from_dict(work_dicts[0])
+
+    assert (work.id, work.popular, work.recommended, work.genre) == (1, True, False, 'Stage')
+    assert work.to_dict() == work_dicts[0]
+
+
+def test_work_list():
+    works = WorkList(work_dicts)
+
+    assert len(works) == 3
+    assert works[0] == work_dicts[0] and works[-1] == work_dicts[2]
+    assert list(works) == work_dicts
+    assert list(works[1:]) == work_dicts[1:]
+    assert list(works.column('id')) == [1, 2, 3]
+    assert works.column('genre') == ['Stage', 'Stage', 'Keyboard']
+    assert works.column('popular') == [True, False, False]
+    with pytest.raises(IndexError):
+        works[3]
+
+
+@pytest.mark.parametrize('result_mode, expected_type', [
+    (ResultMode.DICT, dict),
+    ('records', Work),
+    (ResultMode.COLUMNAR, Work),
+])
+def test_result_modes(fake_api, result_mode, expected_type):
+    openopys = mount(OpenOpys(result_mode=result_mode), fake_api)
+
+    works = openopys.list_works_by_composer_id('178')
+    composers = openopys.list_popular_composers()
+
+    assert isinstance(works, WorkList) == (result_mode == ResultMode.COLUMNAR)
+    assert all(type(work) == expected_type for work in works)
+    assert [work['id'] for work in works] == ['1', '2']
+    assert type(composers[0]) == (dict if expected_type == dict else Composer)
+    assert composers[0]['name'] == 'Bach'
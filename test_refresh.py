@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from conftest import FakeOpenOpusAdapter, mount
+from src.openopys import MemoryCache, OpenOpys, SqliteCache
+from src.openopys.client import Content, _escape_url
+
+
+class SlowAdapter(FakeOpenOpusAdapter):
+    """Fake adapter whose requests wait until release is set, once blocking is enabled"""
+
+    def __init__(self, *args, **kwargs):
+        FakeOpenOpusAdapter.__init__(self, *args, **kwargs)
+        self.blocking = False
+        self.release = threading.Event()
+
+    def send(self, request, **kwargs):
+        if self.blocking:
+            self.release.wait(5)
+        return FakeOpenOpusAdapter.send(self, request, **kwargs)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.mark.parametrize('make_cache', [
+    lambda tmp_path: MemoryCache(default_ttl=0.05),
+    lambda tmp_path: SqliteCache(tmp_path / 'cache.sqlite', default_ttl=0.05),
+])
+def test_get_with_expiry(tmp_path, make_cache):
+    cache = make_cache(tmp_path)
+    cache.set('a', [1], size=1)
+
+    value, expires_in = cache.get_with_expiry('a', grace=10)
+    assert value == [1] and 0 < expires_in <= 0.05
+    time.sleep(0.06)
+    value, expires_in = cache.get_with_expiry('a', grace=10)
+    assert value == [1] and expires_in < 0
+    assert cache.get_with_expiry('a', grace=0) is None
+
+
+def test_stale_while_revalidate(fake_api):
+    api = SlowAdapter(fake_api.payloads)
+    openopys = mount(OpenOpys(cache=MemoryCache(default_ttl=0.05), stale_while_revalidate=60), api)
+    first = openopys.list_popular_composers()
+    time.sleep(0.06)
+
+    # the expired entry is returned at once, without waiting on the (blocked) refresh
+    api.blocking = True
+    assert openopys.list_popular_composers() == first
+    assert openopys.list_popular_composers() == first
+    api.release.set()
+    _wait_for(lambda: not openopys._refreshing)
+    assert len(api.requests) == 2
+    assert openopys.cache.get(_escape_url(openopys._list_url(Content.COMPOSERS, items=['pop']))) is not None
+    openopys.close()
+
+
+def test_expired_beyond_grace_is_fetched(fake_api):
+    openopys = mount(OpenOpys(cache=MemoryCache(default_ttl=0.01), stale_while_revalidate=0.01), fake_api)
+    openopys.list_popular_composers()
+    time.sleep(0.03)
+    openopys.list_popular_composers()
+    assert len(fake_api.requests) == 2
+
+
+def test_refreshing_bypasses_cache(fake_api):
+    openopys = mount(OpenOpys(cache=MemoryCache()), fake_api)
+    openopys.list_popular_composers()
+    with openopys.refreshing():
+        openopys.list_popular_composers()
+    openopys.list_popular_composers()
+    assert len(fake_api.requests) == 2
+
+
+def test_refresh_ahead(fake_api):
+    openopys = mount(OpenOpys(cache=MemoryCache()), fake_api)
+    refresher = openopys.refresh_ahead(
+        [OpenOpys.list_popular_composers, lambda opys: opys.list_works_by_composer_id('178')], interval=0.01)
+
+    _wait_for(lambda: len(fake_api.requests) >= 4)
+    openopys.close()
+    requests = len(fake_api.requests)
+    assert refresher.failures == 0
+
+    # served from the cache the refresher keeps warm, and nothing is refreshed after close
+    assert openopys.list_popular_composers()[0]['name'] == 'Bach'
+    time.sleep(0.03)
+    assert len(fake_api.requests) == requests
+
+
+def test_refreshing_composers_by_id(fake_api):
+    fake_api.payloads['composer/list/ids/178.json'] = {'composers': [{'id': '178', 'name': 'Rameau'}]}
+    openopys = mount(OpenOpys(cache=MemoryCache()), fake_api)
+    openopys.list_composers_by_id(['178'])
+    openopys.list_composers_by_id(['178'])
+    with openopys.refreshing():
+        assert openopys.list_composers_by_id(['178']) == [{'id': '178', 'name': 'Rameau'}]
+    assert len(fake_api.requests) == 2
+
+
+def test_composers_by_id_within_grace(fake_api):
+    fake_api.payloads['composer/list/ids/178.json'] = {'composers': [{'id': '178', 'name': 'Rameau'}]}
+    api = SlowAdapter(fake_api.payloads)
+    cache = MemoryCache(default_ttl=0.01)
+    openopys = mount(OpenOpys(cache=cache, stale_while_revalidate=60), api)
+    openopys.list_composers_by_id(['178'])
+    time.sleep(0.02)
+
+    # the expired entry is served and kept, without waiting on the (blocked) refresh
+    api.blocking = True
+    started = time.monotonic()
+    assert openopys.list_composers_by_id(['178']) == [{'id': '178', 'name': 'Rameau'}]
+    assert time.monotonic() - started < 1 and len(cache) == 1
+    api.release.set()
+    _wait_for(lambda: not openopys._refreshing)
+    assert len(api.requests) == 2
+    openopys.close()
+
+
+def test_close_with_queued_refreshes(fake_api):
+    api = SlowAdapter(fake_api.payloads)
+    openopys = mount(OpenOpys(cache=MemoryCache(default_ttl=0.01), stale_while_revalidate=60), api)
+    queries = [OpenOpys.list_popular_composers, OpenOpys.list_essential_composers,
+               lambda opys: opys.list_works_by_composer_id('178')]
+    first = [query(openopys) for query in queries]
+    time.sleep(0.02)
+
+    # two refreshes block the two refresh threads, the third waits in the queue until close cancels it
+    api.blocking = True
+    assert [query(openopys) for query in queries] == first
+    openopys.close()
+    assert not openopys._refreshing
+    api.release.set()
+
+    # the reused session refreshes again, and reads keep being served if the executor is shut down meanwhile
+    requests = len(api.requests)
+    assert queries[2](openopys) == first[2]
+    _wait_for(lambda: len(api.requests) > requests and not openopys._refreshing)
+    openopys._refresh_executor.shutdown()
+    time.sleep(0.02)
+    assert queries[2](openopys) == first[2] and not openopys._refreshing
+    openopys.close()
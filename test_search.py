@@ -0,0 +1,69 @@
+import pytest
+
+from src.openopys import CatalogSearch, Genre, SearchIndex
+
+composers = [
+    {'id': '87', 'name': 'Bach', 'complete_name': 'Johann Sebastian Bach'},
+    {'id': '178', 'name': 'Rameau', 'complete_name': 'Jean-Philippe Rameau'},
+    {'id': '34', 'name': 'Dvořák', 'complete_name': 'Antonín Dvořák'},
+    {'id': '70', 'name': 'C. P. E. Bach', 'complete_name': 'Carl Philipp Emanuel Bach'},
+]
+
+works = {
+    '178': [
+        {'title': 'Dardanus', 'subtitle': '', 'searchterms': '', 'popular': '1', 'recommended': '0', 'id': '1', 'genre': 'Stage'},
+        {'title': 'Hippolyte et Aricie', 'subtitle': 'Tragédie', 'searchterms': '', 'popular': '0', 'recommended': '1', 'id': '2', 'genre': 'Stage'},
+        {'title': 'Pièces de clavecin en concerts', 'subtitle': '', 'searchterms': 'harpsichord', 'popular': '0', 'recommended': '0', 'id': '3', 'genre': 'Chamber'},
+    ],
+    '34': [
+        {'title': 'Symphony no. 9 in E minor', 'subtitle': 'From the New World', 'searchterms': '', 'popular': '1', 'recommended': '1', 'id': '4', 'genre': 'Orchestral'},
+    ],
+}
+
+
+@pytest.fixture(scope='module')
+def catalog_search():
+    return CatalogSearch(composers, works)
+
+
+@pytest.mark.parametrize('query, expected_ids', [
+    ('Rameau', ['178']),
+    ('rAm', ['178']),
+    ('dvorak', ['34']),
+    ('Antonín', ['34']),
+    ('philip', ['178', '70']),
+    ('bach', ['87', '70']),
+    ('bach carl', ['70']),
+    ('ach', []),
+    ('', ['87', '178', '34', '70']),
+])
+def test_search_composers_by_name(catalog_search, query, expected_ids):
+    result = catalog_search.search_composers_by_name(query)
+    assert [composer['id'] for composer in result] == expected_ids
+
+
+@pytest.mark.parametrize('composer_id, title, genre, expected_ids', [
+    ('178', 'Dard', Genre.STAGE, ['1']),
+    ('178', 'hipp', Genre.ALL, ['2']),
+    ('178', 'tragedie', Genre.ALL, ['2']),
+    ('178', 'harpsi', Genre.ALL, ['3']),
+    ('178', 'pieces', Genre.STAGE, []),
+    ('178', '', Genre.POPULAR, ['1']),
+    ('178', '', Genre.ESSENTIAL, ['2']),
+    ('34', 'new world', 'Orchestral', ['4']),
+    ('34', 'Dard', Genre.ALL, []),
+    ('-1', '', Genre.ALL, []),
+])
+def test_search_works(catalog_search, composer_id, title, genre, expected_ids):
+    result = catalog_search.search_works_by_composer_id_title_and_genre(composer_id, title, genre)
+    assert [work['id'] for work in result] == expected_ids
+
+
+def test_ranking_prefers_exact_and_leading_matches():
+    index = SearchIndex({'title': 2, 'subtitle': 1})
+    index.add({'title': 'Concerto grosso', 'subtitle': 'Op. 6'})
+    index.add({'title': 'Suite', 'subtitle': 'Concertos'})
+    index.add({'title': 'Concertos brandebourgeois'})
+
+    assert [record['title'] for record in index.search('concerto')] == ['Concerto grosso', 'Concertos brandebourgeois', 'Suite']
+    assert len(index.search('concerto', limit=1)) == 1
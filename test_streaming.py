@@ -0,0 +1,66 @@
+import json
+from datetime import date
+from json.decoder import JSONDecodeError
+
+import pytest
+
+from conftest import mount
+from src.openopys import Composer, OpenOpys, ResponseContentTypeError, ResultMode, Work
+from src.openopys.streaming import iter_json_array
+
+
+def _chunks(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+works = [{'title': f'Pièce {index} “{index}”', 'id': str(index), 'popular': '0', 'genre': 'Keyboard'} for index in range(50)]
+
+
+@pytest.mark.parametrize('payload, key, expected', [
+    ({'status': {'success': 'true'}, 'composer': {'id': '87'}, 'works': works}, 'works', works),
+    ({'works': works, 'status': {'rows': 50}}, 'works', works),
+    ({'works': [1, 22, 333, -4.5e3, None, 'x']}, 'works', [1, 22, 333, -4.5e3, None, 'x']),
+    ({'works': []}, 'works', []),
+    ({'status': {'success': 'false'}}, 'works', []),
+    ({}, 'works', []),
+    ({'works': {'not': 'a list'}}, 'works', []),
+])
+@pytest.mark.parametrize('chunk_size', [1, 3, 64, 100000])
+def test_iter_json_array(payload, key, expected, chunk_size):
+    data = json.dumps(payload, ensure_ascii=False, indent=1).encode('utf-8')
+    assert list(iter_json_array(_chunks(data, chunk_size), key)) == expected
+
+
+@pytest.mark.parametrize('data', [b'', b'[1, 2]', b'{"works": [{"id": 1}, {"id": ', b'{"works": [1 2]}'])
+def test_iter_json_array_invalid(data):
+    with pytest.raises(JSONDecodeError):
+        list(iter_json_array(_chunks(data, 4), 'works'))
+
+
+def test_iter_works_by_composer_id(fake_api):
+    openopys = mount(OpenOpys(), fake_api)
+    streamed = openopys.iter_works_by_composer_id('178')
+
+    assert next(streamed)['title'] == 'Dardanus'
+    assert [work['id'] for work in streamed] == ['2']
+    assert fake_api.requests[0].path_url == '/work/list/composer/178/genre/all.json'
+
+
+def test_iter_records(fake_api):
+    fake_api.payloads['composer/list/epoch/Baroque.json'] = {'composers': [
+        {'id': '178', 'name': 'Rameau', 'birth': '1683-09-25', 'death': None, 'epoch': 'Baroque'}]}
+    openopys = mount(OpenOpys(result_mode=ResultMode.RECORDS), fake_api)
+
+    composer, = openopys.iter_composers_by_period('Baroque')
+    assert type(composer) == Composer
+    assert (composer.id, composer.name, composer.birth, composer.death) == (178, 'Rameau', date(1683, 9, 25), None)
+    works = list(openopys.iter_works_by_composer_id('178'))
+    assert all(type(work) == Work for work in works)
+    assert [(work.id, work.title, work.popular, work.recommended) for work in works] == [
+        (1, 'Dardanus', True, False), (2, 'Hippolyte et Aricie', False, True)]
+
+
+def test_iter_keeps_content_type_check(fake_api):
+    fake_api.content_type = 'text/html'
+    with pytest.raises(ResponseContentTypeError):
+        list(mount(OpenOpys(), fake_api).iter_composers_by_period('Baroque'))
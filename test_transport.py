@@ -0,0 +1,99 @@
+import io
+import time
+
+import pytest
+from requests import PreparedRequest, Response
+from requests.exceptions import ConnectionError
+
+from src.openopys import OpenOpys, RateLimitedAdapter, TokenBucket
+
+
+class ScriptedAdapter(RateLimitedAdapter):
+    """Answers requests from a list of status codes (or exceptions to raise) instead of the network"""
+
+    def __init__(self, outcomes, **kwargs):
+        RateLimitedAdapter.__init__(self, **kwargs)
+        self.outcomes = list(outcomes)
+        self.sent_at = []
+
+    def _send(self, request, **kwargs):
+        self.sent_at.append(time.monotonic())
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        response = Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response.raw = io.BytesIO(b'{}')
+        return response
+
+
+def _request(method='GET'):
+    request = PreparedRequest()
+    request.prepare(method=method, url='https://api.openopus.org/composer/list//pop.json')
+    return request
+
+
+@pytest.mark.parametrize('outcomes, method, expected_status, expected_attempts', [
+    ([200], 'GET', 200, 1),
+    ([503, 502, 200], 'GET', 200, 3),
+    ([ConnectionError('reset'), 200], 'GET', 200, 2),
+    ([500, 500, 500, 500], 'GET', 500, 4),
+    ([503, 200], 'POST', 503, 1),
+    ([404, 200], 'GET', 404, 1),
+])
+def test_retries(outcomes, method, expected_status, expected_attempts):
+    adapter = ScriptedAdapter(outcomes, max_retries=3, backoff_factor=0.001)
+    assert adapter.send(_request(method)).status_code == expected_status
+    assert len(adapter.sent_at) == expected_attempts
+
+
+def test_retries_exhausted_raise():
+    adapter = ScriptedAdapter([ConnectionError('reset')] * 2, max_retries=1, backoff_factor=0.001)
+    with pytest.raises(ConnectionError):
+        adapter.send(_request())
+
+
+@pytest.mark.parametrize('retry_after', ['0.05', 'Thu, 01 Jan 1970 00:00:00 GMT'])
+def test_retry_after_is_respected(retry_after):
+    adapter = ScriptedAdapter([(429, {'Retry-After': retry_after}), 200], rate=1000, backoff_factor=0)
+    assert adapter.send(_request()).status_code == 200
+
+    expected_wait = 0.05 if retry_after == '0.05' else 0
+    assert adapter.sent_at[1] - adapter.sent_at[0] >= expected_wait
+
+
+@pytest.mark.parametrize('retry_after', ['86400', 'Fri, 31 Dec 9999 23:59:59 GMT'])
+def test_long_retry_after_is_returned(retry_after):
+    adapter = ScriptedAdapter([(429, {'Retry-After': retry_after}), 200], rate=1000, max_retry_after=1)
+    started = time.monotonic()
+
+    assert adapter.send(_request()).status_code == 429
+    assert len(adapter.sent_at) == 1
+    adapter.bucket.acquire()
+    assert time.monotonic() - started < 1
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.045
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.pause(0.03)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.025
+
+
+def test_default_adapter_pool_fits_workers():
+    openopys = OpenOpys(max_workers=32)
+    adapter = openopys.get_adapter('https://api.openopus.org')
+    assert isinstance(adapter, RateLimitedAdapter)
+    assert adapter._pool_maxsize == 32 and adapter.retries == 0 and adapter.bucket is None
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import pytest
+
+from benchmarks.fake_openopus import FakeOpenOpusServer, build_fixtures
+from src.openopys import OpenOpys, Typeahead
+from src.openopys.typeahead import prefix_matcher, words_matcher
+
+composers = [
+    {'id': '178', 'name': 'Rameau', 'complete_name': 'Jean-Philippe Rameau'},
+    {'id': '50', 'name': 'Rachmaninoff', 'complete_name': 'Sergei Rachmaninoff'},
+    {'id': '35', 'name': 'Dvořák', 'complete_name': 'Antonín Dvořák'},
+]
+
+
+def _search(query):
+    words = query.lower().split()
+    return [composer for composer in composers
+            if all(word in (composer['name'] + ' ' + composer['complete_name']).lower() for word in words)]
+
+
+@pytest.fixture
+def fetched():
+    return []
+
+
+@pytest.fixture
+def typeahead(fetched):
+    def fetch(query):
+        fetched.append(query)
+        return _search(query)
+
+    return Typeahead(fetch, words_matcher('name', 'complete_name'), debounce=0.01)
+
+
+def test_refines_cached_prefix(typeahead, fetched):
+    assert typeahead.search('Ra') == composers[:2]
+    assert typeahead.search('Ram') == composers[:1]
+    assert typeahead.search('rAME jean') == composers[:1]
+    assert typeahead.search('Rach') == composers[1:2]
+    assert typeahead.search('') == []
+    assert fetched == ['Ra'] and typeahead.requests == 1
+
+    assert typeahead.search('Dvo') == composers[2:]
+    assert fetched == ['Ra', 'Dvo']
+    assert typeahead.lookup('dvor') == composers[2:]
+
+
+def test_lru(fetched):
+    typeahead = Typeahead(lambda query: fetched.append(query) or [], prefix_matcher('name'), max_entries=1)
+    typeahead.search('a')
+    typeahead.search('b')
+    typeahead.search('ab')
+    assert typeahead.lookup('a') is None
+    assert fetched == ['a', 'b', 'ab']
+
+
+def test_submit_debounces(typeahead, fetched):
+    calls = []
+    finished = threading.Event()
+
+    def callback(query, results, error):
+        calls.append((query, results, error))
+        finished.set()
+
+    for query in ['R', 'Ra', 'Ram']:
+        typeahead.submit(query, callback)
+    assert finished.wait(5)
+
+    assert fetched == ['Ram']
+    assert calls == [('Ram', composers[:1], None)]
+
+    typeahead.submit('Rame', callback)
+    assert calls[-1] == ('Rame', composers[:1], None)
+
+
+def test_asearch_cancels_superseded(fetched):
+    started = []
+
+    async def fetch(query):
+        started.append(query)
+        await asyncio.sleep(0.05)
+        fetched.append(query)
+        return _search(query)
+
+    async def main():
+        typeahead = Typeahead(fetch, prefix_matcher('name'), debounce=0)
+        first = asyncio.ensure_future(typeahead.asearch('Ra'))
+        await asyncio.sleep(0.01)
+        second = await typeahead.asearch('Ram')
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return second
+
+    assert asyncio.run(main()) == composers[:1]
+    assert started == ['Ra', 'Ram'] and fetched == ['Ram']
+
+
+def test_composers_match_api_search():
+    # fixture composers Annausr (1), Anoulrt (27), Aeunlun (53), Burltos (2), Boaiils (28), Besrrll (54),
+    # Rrtlooa (18) and Reuisle (44), in API order
+    expected = {
+        'a': ['1', '27', '53'], 'an': ['1', '27'], 'ANO': ['27'], 'ae': ['53'], 'ao': [],
+        'b': ['2', '28', '54'], 'bo': ['28'], 'Be': ['54'], 'bet': [],
+        'r': ['18', '44'], 're': ['44'], 'ra': [],
+    }
+    with FakeOpenOpusServer(build_fixtures(num_composers=60, max_works=1)) as server:
+        openopys = OpenOpys(api_url=server.url)
+        typeahead = Typeahead.composers(openopys)
+        for query, ids in expected.items():
+            assert [composer['id'] for composer in typeahead.search(query)] == ids, query
+            assert [composer['id'] for composer in openopys.search_composers_by_name(query)] == ids, query
+        assert typeahead.requests == 3